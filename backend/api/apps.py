@@ -1,6 +1,24 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from api import signals  # noqa: F401
+
+        if getattr(settings, "OCR_WARMUP", False):
+            from tools.ocr import ensure_tesseract_available
+
+            try:
+                ensure_tesseract_available(settings.OCR_WARMUP_LANG)
+            except Exception as exc:
+                # Startup must not fail because OCR is misconfigured; requests report it instead
+                logger.warning("Tesseract warm-up failed: %s", exc)
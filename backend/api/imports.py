@@ -0,0 +1,84 @@
+"""
+Bulk import of filled ewyp.pdf forms.
+
+Form widgets are read in parallel on the PDF process pool (`tools.pdf_import`);
+each form is then mapped to Document (and first-witness) data and validated with
+`DocumentSerializer` / `WitnessSerializer` here. All valid forms are inserted
+with `bulk_create` in a single transaction. `bulk_create` sends no `post_save`
+signals, so the search index and the cached list counts are updated explicitly.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from api.models import Document, Witness
+from api.pagination import invalidate_counts
+from api.search import index_documents
+from api.serializers import DocumentSerializer, WitnessSerializer
+from tools.pdf_import import iter_form_sources, iter_read_forms
+from tools.pdf_mapper import map_pdf_fields_to_document_data, map_pdf_fields_to_witness_data
+
+IMPORTED = "imported"
+FAILED = "failed"
+
+
+def import_documents(uploads: Iterable, executor: Optional[Executor] = None) -> dict:
+    """Import every form in `uploads` (PDFs or ZIPs of PDFs) and report the outcome per file.
+
+    Raises `tools.pdf_import.TooManyFiles` before anything is saved when the
+    uploads hold more than `PDF_IMPORT_MAX_FILES` forms.
+    """
+    sources = iter_form_sources(
+        uploads,
+        max_files=getattr(settings, "PDF_IMPORT_MAX_FILES", 5000),
+        max_file_bytes=getattr(settings, "PDF_IMPORT_MAX_FILE_BYTES", 20 * 1024 * 1024),
+    )
+    # One serializer of each kind validates every form: DRF builds the ~80 Document fields once, not per form
+    document_serializer = DocumentSerializer()
+    witness_serializer = WitnessSerializer()
+    report = []
+    accepted = []
+    for form in iter_read_forms(sources, executor):
+        entry = {"file": form.filename, "status": FAILED}
+        report.append(entry)
+        if form.error:
+            entry["errors"] = {"file": [form.error]}
+            continue
+
+        try:
+            document_data = document_serializer.run_validation(map_pdf_fields_to_document_data(form.fields))
+        except ValidationError as exc:
+            entry["errors"] = exc.detail
+            continue
+
+        witness = None
+        witness_data = map_pdf_fields_to_witness_data(form.witness_fields)
+        if witness_data is not None:
+            try:
+                witness = Witness(**witness_serializer.run_validation(witness_data))
+            except ValidationError as exc:
+                # The document is still imported; the incomplete witness is reported instead
+                entry["warnings"] = {"witness": exc.detail}
+        accepted.append((entry, Document(**document_data), witness))
+
+    documents = [document for _, document, _ in accepted]
+    with transaction.atomic():
+        Document.objects.bulk_create(documents)
+        witnesses = []
+        for entry, document, witness in accepted:
+            entry["status"] = IMPORTED
+            entry["id"] = document.pk
+            if witness is not None:
+                witness.document = document
+                witnesses.append(witness)
+        Witness.objects.bulk_create(witnesses)
+        index_documents(documents)
+    if documents:
+        invalidate_counts()
+
+    return {"imported": len(documents), "failed": len(report) - len(documents), "files": report}
@@ -0,0 +1,476 @@
+"""
+Background jobs for the ZUS recommendation pipeline (OCR + LLM).
+
+Jobs are rows of `RecommendationJob`; the database is the queue. A job is claimed
+with a conditional UPDATE (queued -> running), so several processes can drain the
+same queue safely. Each server process runs up to JOB_WORKERS jobs on a local thread
+pool, starting with whatever was left over when it starts (`start_job_runner`);
+`manage.py run_jobs` drains the queue from a dedicated process instead.
+
+A claim leases the job for JOB_LEASE_SECONDS and a heartbeat renews the lease while
+it runs. When a worker dies, its job is reclaimed once the lease runs out (at most
+JOB_MAX_ATTEMPTS times). The uploaded PDF is cleared when the job finishes.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from typing import Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.utils import timezone
+from pytesseract import TesseractNotFoundError
+
+from api.models import RecommendationJob
+from api.serializers import DocumentContextSerializer
+from tools.chatgpt import TOKEN_USAGE
+from tools.llm_resilience import LlmUnavailableError
+from tools.ocr import extract_pdf_content
+from tools.ocr_text import ReducedText, reduce_ocr_text, reduce_page_texts
+from tools.pdf_mapper import map_pdf_fields_to_document_data
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extract", "describe", "recommend")
+
+TESSERACT_NOT_FOUND_MESSAGE = (
+    "Tesseract OCR binary not found.\n"
+    "Install Tesseract and ensure it's on PATH, or set env var TESSERACT_CMD to the binary path.\n"
+    "Examples: Ubuntu/Debian: sudo apt-get install tesseract-ocr tesseract-ocr-pol; "
+    "macOS: brew install tesseract; Windows: install from https://github.com/UB-Mannheim/tesseract/wiki"
+)
+
+
+def run_zus_recommendation(pdf, client, on_stage: Optional[Callable[[str, float], None]] = None) -> dict:
+    """Run extraction, description and recommendation for one PDF.
+
+    ``on_stage(name, duration_seconds)`` is called after each stage finishes.
+
+    OCR'd uploads are read and assessed in one structured LLM call when ZUS_SINGLE_CALL
+    is on, falling back to the two-call path (`find_desc_from_pdf` then
+    `worker_recommendation`) if that call fails or returns invalid output. A call the
+    LLM guard rejects (`LlmUnavailableError`) is raised instead: the fallback would
+    be rejected as well.
+
+    Digitally filled forms skip the description call; the answers on any other pages
+    (scanned or text attachments) are passed to `worker_recommendation` with the form data.
+
+    OCR text is trimmed to its answers and LLM_OCR_TOKEN_BUDGET before either LLM path
+    (see `tools.ocr_text`); the estimated tokens are reported as ``ocrTokens``.
+
+    Latency and token usage of the run are added to `TOKEN_USAGE` under its ``llmMode``.
+
+    Returns:
+        {"recommendation": <LLM output>, "extractionMethods": [...], "llmMode": "form" | "structured" | "two-call",
+         "ocrTokens": {"original": int, "sent": int, "saved": int} | None}
+    """
+    started = time.perf_counter()
+    with TOKEN_USAGE.track_run() as usage:
+        outcome = _run_zus_recommendation(pdf, client, on_stage)
+    TOKEN_USAGE.record_run(outcome["llmMode"], time.perf_counter() - started, usage)
+    return outcome
+
+
+async def arun_zus_recommendation(pdf, client, on_stage: Optional[Callable[[str, float], None]] = None) -> dict:
+    """`run_zus_recommendation` for async views and an `AsyncChatGPTClient`.
+
+    Extraction (OCR) runs on a worker thread; the LLM calls are awaited on the loop.
+    """
+    started = time.perf_counter()
+    with TOKEN_USAGE.track_run() as usage:
+        outcome = await _arun_zus_recommendation(pdf, client, on_stage)
+    TOKEN_USAGE.record_run(outcome["llmMode"], time.perf_counter() - started, usage)
+    return outcome
+
+
+def _run_zus_recommendation(pdf, client, on_stage) -> dict:
+    def _timed(name, func, *args):
+        started = time.perf_counter()
+        value = func(*args)
+        if on_stage:
+            on_stage(name, time.perf_counter() - started)
+        return value
+
+    content = _timed("extract", extract_pdf_content, pdf)
+    data = _describe_form_fields(content["fields"])
+    reduced = _reduce_text(content) if data is None else _reduce_attachment_text(content)
+
+    if data is None and _single_call_enabled():
+        started = time.perf_counter()
+        try:
+            assessment = client.zus_assessment(reduced.text)
+        except LlmUnavailableError:
+            raise
+        except Exception as exc:
+            logger.warning("Structured ZUS assessment failed, falling back to two calls: %s", exc)
+        else:
+            if on_stage:
+                # One call covers both LLM stages
+                on_stage("describe", 0.0)
+                on_stage("recommend", time.perf_counter() - started)
+            return _outcome(json.dumps(assessment, ensure_ascii=False), content, "structured", reduced)
+
+    mode = "form" if data is not None else "two-call"
+    attachments = None
+    if data is None:
+        data = _timed("describe", client.find_desc_from_pdf, reduced.text)
+    else:
+        attachments = reduced.text if reduced is not None else None
+        if on_stage:
+            on_stage("describe", 0.0)
+    recommendation = _timed("recommend", client.worker_recommendation, data, attachments)
+    return _outcome(recommendation, content, mode, reduced)
+
+
+async def _arun_zus_recommendation(pdf, client, on_stage) -> dict:
+    async def _timed(name, awaitable):
+        started = time.perf_counter()
+        value = await awaitable
+        if on_stage:
+            on_stage(name, time.perf_counter() - started)
+        return value
+
+    content = await _timed("extract", sync_to_async(extract_pdf_content, thread_sensitive=False)(pdf))
+    data = _describe_form_fields(content["fields"])
+    reduced = _reduce_text(content) if data is None else _reduce_attachment_text(content)
+
+    if data is None and _single_call_enabled():
+        started = time.perf_counter()
+        try:
+            assessment = await client.zus_assessment(reduced.text)
+        except LlmUnavailableError:
+            raise
+        except Exception as exc:
+            logger.warning("Structured ZUS assessment failed, falling back to two calls: %s", exc)
+        else:
+            if on_stage:
+                on_stage("describe", 0.0)
+                on_stage("recommend", time.perf_counter() - started)
+            return _outcome(json.dumps(assessment, ensure_ascii=False), content, "structured", reduced)
+
+    mode = "form" if data is not None else "two-call"
+    attachments = None
+    if data is None:
+        data = await _timed("describe", client.find_desc_from_pdf(reduced.text))
+    else:
+        attachments = reduced.text if reduced is not None else None
+        if on_stage:
+            on_stage("describe", 0.0)
+    recommendation = await _timed("recommend", client.worker_recommendation(data, attachments))
+    return _outcome(recommendation, content, mode, reduced)
+
+
+def _single_call_enabled() -> bool:
+    return getattr(settings, "ZUS_SINGLE_CALL", True)
+
+
+def _reduce_text(content: dict) -> ReducedText:
+    reduced = reduce_ocr_text(content["text"], getattr(settings, "LLM_OCR_TOKEN_BUDGET", 0))
+    logger.info(
+        "OCR text for LLM: %d -> %d estimated tokens (%d saved)",
+        reduced.original_tokens, reduced.tokens, reduced.saved_tokens,
+    )
+    return reduced
+
+
+def _reduce_attachment_text(content: dict) -> Optional[ReducedText]:
+    """Answers on the pages next to a filled form (scans are already OCR'd), or None when there are none.
+
+    The form's own unfilled pages reduce to nothing (see `tools.ocr_text.reduce_page_texts`).
+    """
+    texts = [page["text"] for page in content["pages"] if page["method"] != "acroform"]
+    reduced = reduce_page_texts(texts, getattr(settings, "LLM_OCR_TOKEN_BUDGET", 0))
+    if not reduced.text:
+        return None
+    logger.info("Attachment text for LLM: %d -> %d estimated tokens", reduced.original_tokens, reduced.tokens)
+    return reduced
+
+
+def _outcome(recommendation, content: dict, mode: str, reduced: Optional[ReducedText] = None) -> dict:
+    return {
+        "recommendation": recommendation,
+        "extractionMethods": content["methods"],
+        "llmMode": mode,
+        "ocrTokens": reduced.as_dict() if reduced is not None else None,
+    }
+
+
+def _describe_form_fields(fields) -> Optional[str]:
+    """JSON context from a digitally filled ewyp.pdf, or None when OCR text must be described by the LLM."""
+    document_data = map_pdf_fields_to_document_data(fields)
+    if not document_data:
+        return None
+    # The form values are already structured, skip the extraction prompt
+    return json.dumps(DocumentContextSerializer(document_data).data, ensure_ascii=False, cls=DjangoJSONEncoder)
+
+
+def job_to_dict(job: RecommendationJob) -> dict:
+    completed = sum(1 for stage in job.stages if stage.get("status") == "completed")
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "fileName": job.file_name,
+        "stages": job.stages,
+        "progress": completed / len(STAGES),
+        "extractionMethods": job.extraction_methods,
+        "result": job.result,
+        "error": job.error,
+        "createdAt": job.created_at,
+        "startedAt": job.started_at,
+        "finishedAt": job.finished_at,
+    }
+
+
+def enqueue_recommendation_job(pdf_file) -> RecommendationJob:
+    pdf_file.seek(0)
+    job = RecommendationJob.objects.create(
+        file_name=getattr(pdf_file, "name", "") or "",
+        pdf_data=pdf_file.read(),
+        stages=[{"name": name, "status": "pending"} for name in STAGES],
+    )
+    get_job_runner().wake()
+    return job
+
+
+def _lease_seconds() -> float:
+    return getattr(settings, "JOB_LEASE_SECONDS", 300)
+
+
+def _claimable(now) -> Q:
+    """Queued jobs, and running jobs whose worker stopped renewing the lease (died or was killed)."""
+    abandoned = Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True)
+    return Q(status=RecommendationJob.STATUS_QUEUED) | (Q(status=RecommendationJob.STATUS_RUNNING) & abandoned)
+
+
+def _fail_exhausted_jobs(now) -> None:
+    """Give up on abandoned jobs that were already claimed JOB_MAX_ATTEMPTS times (they keep killing workers)."""
+    max_attempts = getattr(settings, "JOB_MAX_ATTEMPTS", 3)
+    RecommendationJob.objects.filter(
+        _claimable(now), status=RecommendationJob.STATUS_RUNNING, attempts__gte=max_attempts
+    ).update(
+        status=RecommendationJob.STATUS_FAILED,
+        error=f"The job was interrupted {max_attempts} times and was not retried again",
+        finished_at=now,
+        lease_expires_at=None,
+        pdf_data=b"",
+    )
+
+
+def claim_next_job() -> Optional[RecommendationJob]:
+    """Atomically lease the oldest claimable job to this worker and return it (None if there is none)."""
+    while True:
+        now = timezone.now()
+        _fail_exhausted_jobs(now)
+        job_id = (
+            RecommendationJob.objects.filter(_claimable(now))
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = RecommendationJob.objects.filter(_claimable(now), pk=job_id).update(
+            status=RecommendationJob.STATUS_RUNNING,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=_lease_seconds()),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return RecommendationJob.objects.get(pk=job_id)
+        # Another worker won the race; try the next one
+
+
+def _owned(job: RecommendationJob):
+    """The job's row, as long as no other worker has reclaimed it since `job` was claimed."""
+    return RecommendationJob.objects.filter(pk=job.pk, attempts=job.attempts)
+
+
+@contextmanager
+def _lease_heartbeat(job: RecommendationJob):
+    """Renew the job's lease every third of JOB_LEASE_SECONDS while it is being processed."""
+    lease = _lease_seconds()
+    stop = threading.Event()
+
+    def _renew():
+        try:
+            while not stop.wait(lease / 3):
+                _owned(job).update(lease_expires_at=timezone.now() + timedelta(seconds=lease))
+        except Exception:
+            logger.exception("Renewing the lease of job %s failed", job.pk)
+        finally:
+            connections.close_all()
+
+    heartbeat = threading.Thread(target=_renew, name=f"job-{job.pk}-lease", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def process_job(job: RecommendationJob, client) -> None:
+    # A reclaimed job starts over
+    job.stages = [{"name": name, "status": "pending"} for name in STAGES]
+    stages = {stage["name"]: stage for stage in job.stages}
+
+    def _on_stage(name, duration):
+        stages[name].update(status="completed", durationMs=round(duration * 1000, 1))
+        following = STAGES.index(name) + 1
+        if following < len(STAGES):
+            stages[STAGES[following]].update(status="running", startedAt=timezone.now().isoformat())
+        _owned(job).update(stages=job.stages)
+
+    stages[STAGES[0]].update(status="running", startedAt=timezone.now().isoformat())
+    _owned(job).update(stages=job.stages)
+
+    try:
+        with _lease_heartbeat(job):
+            outcome = run_zus_recommendation(BytesIO(bytes(job.pdf_data)), client, on_stage=_on_stage)
+    except Exception as exc:
+        for stage in job.stages:
+            if stage.get("status") == "running":
+                stage["status"] = "failed"
+        if isinstance(exc, TesseractNotFoundError):
+            error = TESSERACT_NOT_FOUND_MESSAGE
+        elif isinstance(exc, ValueError):
+            error = str(exc)
+        else:
+            error = f"OCR failed: {exc}"
+        logger.warning("Recommendation job %s failed: %s", job.pk, exc)
+        _owned(job).update(
+            status=RecommendationJob.STATUS_FAILED,
+            stages=job.stages,
+            error=error,
+            finished_at=timezone.now(),
+            lease_expires_at=None,
+            # The upload (personal data) is not needed once the job is finished
+            pdf_data=b"",
+        )
+        return
+
+    _owned(job).update(
+        status=RecommendationJob.STATUS_COMPLETED,
+        stages=job.stages,
+        result=outcome["recommendation"],
+        extraction_methods=outcome["extractionMethods"],
+        finished_at=timezone.now(),
+        lease_expires_at=None,
+        pdf_data=b"",
+    )
+
+
+class JobRunner:
+    """Drains the job table on a local thread pool; `wake()` is cheap and idempotent."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs") if workers else None
+        self._active = 0
+        self._lock = threading.Lock()
+        self._client = None
+        self._reclaim_timer: Optional[threading.Timer] = None
+
+    def _get_client(self):
+        if self._client is None:
+            from tools.chatgpt import ChatGPTClient
+
+            self._client = ChatGPTClient()
+        return self._client
+
+    def start(self) -> None:
+        """Pick up jobs left queued or running before a restart, once Django has finished loading."""
+        if self._executor is None:
+            return
+
+        def _wake_when_ready():
+            apps.ready_event.wait()
+            self.wake()
+
+        threading.Thread(target=_wake_when_ready, name="jobs-start", daemon=True).start()
+
+    def wake(self) -> None:
+        if self._executor is None:
+            return
+        with self._lock:
+            if self._active >= self.workers:
+                return
+            self._active += 1
+        self._executor.submit(self._drain)
+
+    def _drain(self) -> None:
+        drained = False
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    drained = True
+                    break
+                process_job(job, self._get_client())
+        except Exception:
+            logger.exception("Job runner crashed")
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        # A job queued between our last claim and the decrement saw all workers busy; pick it up
+        if drained and RecommendationJob.objects.filter(status=RecommendationJob.STATUS_QUEUED).exists():
+            self.wake()
+        if drained:
+            self._schedule_reclaim()
+        close_old_connections()
+
+    def _schedule_reclaim(self) -> None:
+        """Wake up when the earliest running lease runs out, so a dead worker's job is reclaimed without a new submission."""
+        expires_at = (
+            RecommendationJob.objects.filter(status=RecommendationJob.STATUS_RUNNING, lease_expires_at__isnull=False)
+            .order_by("lease_expires_at")
+            .values_list("lease_expires_at", flat=True)
+            .first()
+        )
+        if expires_at is None:
+            return
+        with self._lock:
+            if self._reclaim_timer is not None and self._reclaim_timer.is_alive():
+                return
+            delay = max(1.0, (expires_at - timezone.now()).total_seconds() + 1)
+            self._reclaim_timer = threading.Timer(delay, self.wake)
+            self._reclaim_timer.daemon = True
+            self._reclaim_timer.start()
+
+
+_RUNNER: Optional[JobRunner] = None
+_RUNNER_LOCK = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _RUNNER
+    with _RUNNER_LOCK:
+        if _RUNNER is None:
+            _RUNNER = JobRunner(getattr(settings, "JOB_WORKERS", 2))
+        return _RUNNER
+
+
+def start_job_runner() -> None:
+    """Resume leftover jobs in a server process; called by `backend.wsgi` / `backend.asgi` (and so by runserver).
+
+    Management commands, scripts, test runners and PDF pool workers never import those
+    modules, so they never claim jobs. JOB_RUNNER_AUTOSTART=0 opts servers out as well.
+    """
+    if not getattr(settings, "JOB_RUNNER_AUTOSTART", True) or multiprocessing.parent_process() is not None:
+        return
+    get_job_runner().start()
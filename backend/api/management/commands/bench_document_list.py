@@ -0,0 +1,105 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.management.commands.bench_pdf_fill import load_fixture_document
+from api.models import Document, Witness
+from api.pagination import encode_cursor
+from api.views import _filter_documents, handle_document_list
+
+
+@contextmanager
+def throwaway_database():
+    """Swap the default database for a fresh test database (like the test runner does) for the block."""
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_documents(rows: int, witnesses_per_document: int = 0) -> float:
+    """Insert `rows` copies of the fixture document (varied surname/date); returns the seconds taken."""
+    template = load_fixture_document()
+    values = {field.attname: getattr(template, field.attname) for field in Document._meta.concrete_fields}
+    values.pop("id")
+    started = time.perf_counter()
+    with transaction.atomic():
+        for offset in range(0, rows, 2000):
+            batch = []
+            for index in range(offset, min(rows, offset + 2000)):
+                document = Document(**values)
+                document.nazwisko = f"{template.nazwisko}{index % 997}"
+                document.data_wypadku = date(2020 + index % 6, 1 + index % 12, 1 + index % 28)
+                batch.append(document)
+            Document.objects.bulk_create(batch)
+            Witness.objects.bulk_create(
+                Witness(
+                    imie="Anna", nazwisko=f"Nowak{number}", ulica="Lipowa", nr_domu="4",
+                    miejscowosc="Łódź", kod_pocztowy="90-001", document=document,
+                )
+                for document in batch
+                for number in range(witnesses_per_document)
+            )
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page/pageSize and cursor pagination of the documents list at page 1 and a deep page, "
+        "and full rows vs sparse fieldsets, on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="Documents to insert")
+        parser.add_argument("--page-size", type=int, default=10, help="Rows per page")
+        parser.add_argument("--deep-page", type=int, default=10_000, help="Page number to compare against page 1")
+        parser.add_argument("--sort", default="data_wypadku", help="Sort key (id, nazwisko, data_wypadku, ...)")
+        parser.add_argument("--repeat", type=int, default=20, help="Requests per measurement; the median is reported")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            seconds = seed_documents(max(1, options["rows"]))
+            self.stdout.write(f"seeded {options['rows']} documents in {seconds:.1f}s")
+            self._compare(options)
+
+    def _compare(self, options) -> None:
+        page_size = options["page_size"]
+        deep_page = options["deep_page"]
+        params = {"action": "list", "sort": options["sort"], "pageSize": page_size}
+
+        # The cursor a client would hold after walking to the page before `deep_page`
+        queryset = _filter_documents(params)
+        skip = min((deep_page - 1) * page_size, queryset.count() - 1)
+        ordering = [str(name) for name in queryset.query.order_by]
+        deep_cursor = encode_cursor(ordering, queryset[skip - 1]) if skip > 0 else ""
+
+        cases = [
+            ("offset  page 1", {**params, "page": 1}),
+            (f"offset  page {deep_page}", {**params, "page": deep_page}),
+            ("cursor  page 1", {**params, "pagination": "cursor"}),
+            (f"cursor  page {deep_page}", {**params, "cursor": deep_cursor}),
+            (f"cursor  page {deep_page} + total", {**params, "cursor": deep_cursor, "includeTotal": "true"}),
+        ]
+        for label, request_data in cases:
+            self._measure(label, request_data, options["repeat"])
+
+        # Full DocumentSerializer rows vs sparse fieldsets, on a 100-row page
+        for fields in ("", "summary", "summary,witnesses"):
+            label = f"fields={fields or '(all)'}  100 rows"
+            self._measure(label, {**params, "pageSize": 100, "fields": fields}, options["repeat"])
+
+    def _measure(self, label: str, request_data: dict, repeat: int) -> None:
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            response = handle_document_list(request_data)
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.content
+        self.stdout.write(
+            f"{label:<32} {statistics.median(timings) * 1000:8.2f} ms  {len(response.content) / 1024:8.1f} KiB"
+        )
@@ -0,0 +1,52 @@
+import io
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from api.imports import import_documents
+from api.management.commands.bench_document_list import seed_documents, throwaway_database
+from api.models import Document
+from tools.pdf_batch import TEMPLATE_PATH, get_executor
+from tools.pdf_mapper import map_document_to_pdf_fields
+from tools.pdf_writer import PDFWriter
+
+
+class Command(BaseCommand):
+    help = (
+        "Forms per minute of the bulk PDF import (action=import) from one ZIP, reading forms on the "
+        "process pool vs one at a time, on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", type=int, default=500, help="Filled forms in the ZIP")
+        parser.add_argument("--distinct", type=int, default=50, help="Distinct forms rendered (repeated up to --files)")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            seed_documents(options["distinct"], witnesses_per_document=1)
+            writer = PDFWriter()
+            forms = [
+                writer.fill_template(TEMPLATE_PATH, map_document_to_pdf_fields(document)).getvalue()
+                for document in Document.objects.prefetch_related("witnesses").order_by("id")
+            ]
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zipped:
+                for index in range(options["files"]):
+                    zipped.writestr(f"form-{index}.pdf", forms[index % len(forms)])
+            data = archive.getvalue()
+            self.stdout.write(f"{options['files']} forms, ZIP {len(data) / 1024 / 1024:.1f} MiB")
+
+            get_executor()  # start the pool outside the measurement
+            with ThreadPoolExecutor(max_workers=1) as serial:
+                for label, executor in (("process pool", None), ("one at a time", serial)):
+                    upload = SimpleUploadedFile("forms.zip", data, content_type="application/zip")
+                    started = time.perf_counter()
+                    report = import_documents([upload], executor=executor)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"  {label:<14} {report['imported'] / elapsed * 60:10.0f} forms/min  {elapsed:6.2f} s  "
+                        f"imported {report['imported']}, failed {report['failed']}"
+                    )
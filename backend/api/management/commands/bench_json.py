@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from api import renderers
+from api.management.commands.bench_document_list import seed_documents, throwaway_database
+from api.models import Document
+from api.serializers import DocumentSerializer
+from api.views import handle_document_detail, handle_document_list
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests per second for list pages and detail responses: DocumentSerializer + JsonResponse "
+        "vs .values() + the fast JSON encoder (orjson, or the stdlib fallback), on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Documents to insert")
+        parser.add_argument("--page-size", type=int, default=100, help="Rows per list page")
+        parser.add_argument("--witnesses", type=int, default=2, help="Witnesses per document")
+        parser.add_argument("--seconds", type=float, default=2.0, help="Measuring time per case")
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with throwaway_database():
+            seed_documents(max(page_size, options["rows"]), options["witnesses"])
+            document_id = Document.objects.values_list("id", flat=True).first()
+            list_request = {"action": "list", "pageSize": page_size}
+            detail_request = {"action": "detail", "id": document_id}
+
+            def serializer_list():
+                rows = Document.objects.prefetch_related("witnesses").order_by("-id")[:page_size]
+                items = DocumentSerializer(rows, many=True).data
+                return JsonResponse({"items": items, "totalCount": Document.objects.count()})
+
+            def serializer_detail():
+                document = Document.objects.filter(pk=document_id).prefetch_related("witnesses").first()
+                return JsonResponse(DocumentSerializer(document).data, safe=False)
+
+            cases = [
+                (f"list {page_size} rows  DocumentSerializer", serializer_list),
+                (f"list {page_size} rows  fast", lambda: handle_document_list(list_request)),
+                ("detail          DocumentSerializer", serializer_detail),
+                ("detail          fast", lambda: handle_document_detail(detail_request)),
+            ]
+            encoders = [("orjson", renderers.orjson)] if renderers.orjson is not None else []
+            encoders.append(("stdlib json", None))
+
+            for encoder, module in encoders:
+                renderers.orjson = module
+                self.stdout.write(f"fast encoder: {encoder}")
+                for label, func in cases:
+                    self._measure(label, func, options["seconds"])
+            renderers.orjson = encoders[0][1]
+
+    def _measure(self, label: str, func, seconds: float) -> None:
+        func()  # warm-up
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            response = func()
+            count += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"  {label:<36} {count / elapsed:8.1f} req/s  ({elapsed / count * 1000:.2f} ms, "
+            f"{len(response.content) / 1024:.1f} KiB)"
+        )
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible `/chat/completions` endpoint.
+
+    A completion takes `latency` seconds; with `"stream": true` it is sent as
+    `STREAM_TOKENS` SSE chunks spread evenly over that time.
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.5
+    # Fraction of requests answered with an injected 429/500/503 (after the latency)
+    error_rate = 0.0
+    STREAM_TOKENS = 10
+    # Mimics provider prefix caching: a system message seen before counts as cached tokens
+    seen_prefixes: set = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        model = body.get("model", "fake")
+        if self.error_rate and random.random() < self.error_rate:
+            time.sleep(self.latency)
+            self._error(random.choice((429, 500, 503)))
+            return
+        usage = self._usage(body.get("messages") or [])
+        if body.get("stream"):
+            self._stream(model, usage if (body.get("stream_options") or {}).get("include_usage") else None)
+            return
+
+        time.sleep(self.latency)
+        content = "{}"
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            content = json.dumps(schema_example(response_format["json_schema"]["schema"]), ensure_ascii=False)
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int):
+        payload = json.dumps({"error": {"message": f"injected {status}", "type": "fake_error"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _usage(self, messages) -> dict:
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4 + 1
+        system = next((message["content"] for message in messages if message.get("role") == "system"), "")
+        cached = len(system) // 4 if system in self.seen_prefixes else 0
+        if system:
+            self.seen_prefixes.add(system)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": self.STREAM_TOKENS,
+            "total_tokens": prompt_tokens + self.STREAM_TOKENS,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+    def _stream(self, model, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for index in range(self.STREAM_TOKENS):
+            time.sleep(self.latency / self.STREAM_TOKENS)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": f"t{index} "}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        if usage:
+            final = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def schema_example(schema: dict):
+    """Smallest instance of a (strict) JSON schema, so structured-output calls validate."""
+    if "enum" in schema:
+        return schema["enum"][0]
+    types = schema.get("type")
+    kind = types if isinstance(types, str) else types[0]
+    if kind == "object":
+        return {name: schema_example(item) for name, item in schema.get("properties", {}).items()}
+    return {"array": [], "string": "", "boolean": False, "integer": 0, "number": 0, "null": None}[kind]
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # listen() backlog; the default of 5 drops bursts of concurrent connections
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients hitting their deadline hang up mid-response; that is expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_fake_server(latency: float, error_rate: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("Handler", (FakeOpenAIHandler,), {
+        "latency": latency,
+        "error_rate": error_rate,
+        "seen_prefixes": set(),
+    })
+    server = _FakeServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _bench_messages():
+    from tools.chatgpt import WORKER_RECOMMENDATION_SYSTEM_PROMPT
+
+    return [
+        {"role": "system", "content": WORKER_RECOMMENDATION_SYSTEM_PROMPT},
+        {"role": "user", "content": "Dane znajdujące się w formularzu:\n{}"},
+    ]
+
+
+SAMPLE_OCR_TEXT = (
+    "ZAWIADOMIENIE O WYPADKU\nData wypadku 2025-12-06 Godzina wypadku 20:30\n"
+    "Miejsce wypadku Plac budowy, ul. Przemysłowa 12, Kraków\n"
+    "Rodzaj doznanych urazów Złamanie przedramienia\n"
+    "Szczegółowy opis okoliczności Poślizgnięcie na mokrym rusztowaniu podczas montażu\n"
+)
+
+
+class Command(BaseCommand):
+    help = "Compare sync vs async ChatGPTClient throughput against an OpenAI-compatible server (a local fake by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Number of chat completions to send")
+        parser.add_argument("--concurrency", type=int, default=200, help="In-flight calls for the async client")
+        parser.add_argument("--sync-threads", type=int, default=8, help="Threads for the sync client (WSGI-like)")
+        parser.add_argument("--latency", type=float, default=0.5, help="Response delay of the local fake server in seconds")
+        parser.add_argument("--base-url", help="Use this OpenAI-compatible endpoint instead of the local fake server")
+        parser.add_argument("--stream", action="store_true", help="Also measure time to first token when streaming")
+        parser.add_argument("--zus", action="store_true",
+                            help="Also compare the two-call and single structured-call ZUS assessment")
+        parser.add_argument("--error-rate", type=float, default=0.0,
+                            help="Fraction of fake-server responses replaced by 429/500/503 errors")
+        parser.add_argument("--retries", type=int, default=2, help="LLM guard retries per call")
+        parser.add_argument("--breaker-threshold", type=int, default=5,
+                            help="Consecutive transient failures before the circuit opens")
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = options["base_url"]
+        if not base_url:
+            server = start_fake_server(options["latency"], options["error_rate"])
+            base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+            os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ["OPENAI_BASE_URL"] = base_url
+
+        # Imported after OPENAI_BASE_URL is set; both clients read it on construction
+        from tools.chatgpt import TOKEN_USAGE, AsyncChatGPTClient, ChatGPTClient
+        from tools.llm_resilience import LlmGuard
+
+        messages = _bench_messages()
+        total = max(1, options["requests"])
+        concurrency = max(1, options["concurrency"])
+        # A bench-local guard, so the process-wide caps from settings do not throttle the comparison
+        guard = LlmGuard(
+            concurrency=max(concurrency, options["sync_threads"]),
+            max_retries=options["retries"],
+            breaker_threshold=options["breaker_threshold"],
+            backoff_base=0.05,
+            backoff_max=0.5,
+        )
+        try:
+            sync_client = ChatGPTClient(cache=None, guard=guard)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, options["sync_threads"])) as pool:
+                failures = sum(pool.map(lambda _: self._attempt(sync_client.chat_completion, messages), range(total)))
+            self._report(f"sync   threads={options['sync_threads']}", total, time.perf_counter() - started, failures)
+
+            make_async_client = lambda: AsyncChatGPTClient(cache=None, guard=guard)
+            elapsed, failures = asyncio.run(self._run_async(make_async_client, messages, total, concurrency))
+            self._report(f"async  concurrency={concurrency}", total, elapsed, failures)
+
+            if options["stream"]:
+                first, full = asyncio.run(self._run_stream(make_async_client, messages))
+                self.stdout.write(f"{'stream time to first token':<28} {first * 1000:8.1f} ms  (full response {full * 1000:.1f} ms)")
+
+            self._report_usage("all calls", TOKEN_USAGE.snapshot())
+
+            if options["zus"]:
+                self._compare_zus_paths(ChatGPTClient(cache=None, guard=guard), TOKEN_USAGE, max(1, min(total, 20)))
+
+            stats = guard.stats()
+            self.stdout.write(f"guard: breaker {stats['breaker']['state']} (opened {stats['breaker']['opened']}x)")
+            for name, counters in stats["endpoints"].items():
+                self.stdout.write(f"  {name:<24} " + ", ".join(f"{key}={value}" for key, value in counters.items()))
+        finally:
+            if server:
+                server.shutdown()
+
+    @staticmethod
+    def _attempt(func, *args) -> int:
+        """1 when the call failed (after the guard's retries), else 0."""
+        try:
+            func(*args)
+        except Exception:
+            return 1
+        return 0
+
+    @staticmethod
+    async def _run_async(make_client, messages, total: int, concurrency: int) -> tuple[float, int]:
+        client = make_client()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one():
+            async with semaphore:
+                await client.chat_completion(messages)
+
+        try:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(_one() for _ in range(total)), return_exceptions=True)
+            return time.perf_counter() - started, sum(isinstance(result, Exception) for result in results)
+        finally:
+            await client.close()
+
+    @staticmethod
+    async def _run_stream(make_client, messages) -> tuple[float, float]:
+        client = make_client()
+        try:
+            started = time.perf_counter()
+            first = None
+            async for _delta in client.stream_chat(messages):
+                if first is None:
+                    first = time.perf_counter() - started
+            return first or 0.0, time.perf_counter() - started
+        finally:
+            await client.close()
+
+    def _compare_zus_paths(self, client, usage, runs: int) -> None:
+        text = SAMPLE_OCR_TEXT
+        paths = {
+            "two-call": lambda: client.worker_recommendation(client.find_desc_from_pdf(text)),
+            "structured": lambda: client.zus_assessment(text),
+        }
+        for name, run in paths.items():
+            usage.reset()
+            started = time.perf_counter()
+            for _ in range(runs):
+                run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"zus {name:<24} {elapsed / runs * 1000:8.1f} ms per assessment")
+            self._report_usage(f"zus {name}", usage.snapshot(), runs)
+
+    def _report_usage(self, label: str, usage: dict, runs: int = 1) -> None:
+        self.stdout.write(
+            f"{label:<28} {usage['requests'] / runs:.0f} calls, {usage['promptTokens'] // runs} prompt tokens "
+            f"({usage['cachedRatio']:.0%} cached), {usage['completionTokens'] // runs} completion tokens"
+            + (" per run" if runs > 1 else "")
+        )
+
+    def _report(self, label: str, total: int, elapsed: float, failures: int = 0) -> None:
+        self.stdout.write(
+            f"{label:<28} {total / elapsed:8.1f} req/s  ({elapsed:.2f}s for {total} requests"
+            + (f", {failures} failed)" if failures else ")")
+        )
@@ -0,0 +1,47 @@
+import time
+from pathlib import Path
+
+import fitz
+from django.core.management.base import BaseCommand, CommandError
+from pytesseract import TesseractNotFoundError
+
+from tools.ocr import ocr_pdf
+
+
+SAMPLE_PDF = Path(__file__).resolve().parents[2] / "fixtures" / "zaw1.pdf"
+
+
+class Command(BaseCommand):
+    help = "Measure ocr_pdf pages per second for different worker counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pdf", default=str(SAMPLE_PDF), help="PDF to OCR (default: api/fixtures/zaw1.pdf)")
+        parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare")
+        parser.add_argument("--lang", default="pol", help="Tesseract language (default: pol)")
+        parser.add_argument("--dpi", type=int, default=300, help="Rendering DPI (default: 300)")
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per worker count; the best run is reported")
+
+    def handle(self, *args, **options):
+        data = Path(options["pdf"]).read_bytes()
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+
+        try:
+            worker_counts = [int(part) for part in options["workers"].split(",") if part.strip()]
+        except ValueError:
+            raise CommandError("--workers must be a comma-separated list of integers")
+
+        for workers in worker_counts:
+            best = None
+            for _ in range(max(1, options["repeat"])):
+                started = time.perf_counter()
+                try:
+                    ocr_pdf(data, lang=options["lang"], dpi=options["dpi"], workers=workers)
+                except TesseractNotFoundError:
+                    raise CommandError("Tesseract binary not found; install it or set TESSERACT_CMD")
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            self.stdout.write(
+                f"workers={workers:<3} {page_count / best:6.2f} pages/s  ({best:.2f}s for {page_count} pages)"
+            )
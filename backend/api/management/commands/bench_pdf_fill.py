@@ -0,0 +1,46 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from api.models import Document
+from tools.pdf_mapper import map_document_to_pdf_fields
+from tools.pdf_writer import TEMPLATE_CACHE, PDFWriter
+
+
+FIXTURE_PATH = Path(__file__).resolve().parents[2] / "fixtures" / "documents.json"
+TEMPLATE_PATH = Path("tools/ewyp.pdf")
+
+
+def load_fixture_document() -> Document:
+    """Build an unsaved Document from the sample generate-pdf payload."""
+    payload = json.loads(FIXTURE_PATH.read_text(encoding="utf-8"))
+    payload.pop("action", None)
+    return Document(**payload)
+
+
+class Command(BaseCommand):
+    help = "Measure ewyp.pdf fills per second with and without the parsed-template cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Fills per measured run")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options["iterations"])
+        field_data = map_document_to_pdf_fields(load_fixture_document())
+
+        for label, use_cache in (("uncached", False), ("cached", True)):
+            TEMPLATE_CACHE.clear()
+            writer = PDFWriter(use_cache=use_cache)
+            # Warm-up fill so the cached run measures steady state, not the first parse
+            writer.fill_template(TEMPLATE_PATH, field_data)
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                writer.fill_template(TEMPLATE_PATH, field_data)
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{label:>9}: {iterations / elapsed:8.2f} fills/s  ({elapsed / iterations * 1000:.1f} ms/fill)"
+            )
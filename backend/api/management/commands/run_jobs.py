@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.jobs import claim_next_job, process_job
+from tools.chatgpt import ChatGPTClient
+
+
+class Command(BaseCommand):
+    help = "Process queued ZUS recommendation jobs from a dedicated worker process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls of an empty queue")
+
+    def handle(self, *args, **options):
+        client = ChatGPTClient()
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"Processing job {job.pk} ({job.file_name})")
+            process_job(job, client)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_recommendationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['pesel'], name='document_pesel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['data_wypadku', 'id'], name='document_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['nazwisko', 'id'], name='document_surname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['czy_udzielona_pomoc', 'id'], name='document_help_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['czy_udzielona_pomoc', 'data_wypadku', 'id'], name='document_help_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['czy_wypadek_podczas_uzywania_maszyny', 'id'], name='document_machine_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['czy_wypadek_podczas_uzywania_maszyny', 'data_wypadku', 'id'], name='document_machine_date_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+from tools.text_folding import fold
+
+SEARCH_TABLE = "api_document_search"
+SEARCH_FIELDS = ("nazwisko", "imie", "pesel", "miejsce_wypadku", "rodzaj_urazow", "szczegoly_okolicznosci")
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the icontains fallback in api.search
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    columns = ", ".join(SEARCH_FIELDS)
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({columns}, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+    Document = apps.get_model("api", "Document")
+    placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 1))
+    rows = (
+        [values[0]] + [fold(str(value or "")) for value in values[1:]]
+        for values in Document.objects.values_list("id", *SEARCH_FIELDS).iterator(chunk_size=1000)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})", list(rows))
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_document_list_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
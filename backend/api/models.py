@@ -97,6 +97,22 @@ class Document(models.Model):
     czy_maszyna_posiada_atest = models.BooleanField(default=False, null=True, blank=True)
     czy_maszyna_w_ewidencji = models.BooleanField(default=False, null=True, blank=True)
 
+    class Meta:
+        # Dashboard list (api.views._filter_documents): PESEL prefix search, sorting by date or
+        # surname, and the two boolean filters combined with the default (-id) and date sorts.
+        # `id` is the tiebreaker of every ordering; `api.tests.DocumentListQueryPlanTests` verifies the plans.
+        indexes = [
+            models.Index(fields=["pesel"], name="document_pesel_idx"),
+            models.Index(fields=["data_wypadku", "id"], name="document_date_idx"),
+            models.Index(fields=["nazwisko", "id"], name="document_surname_idx"),
+            models.Index(fields=["czy_udzielona_pomoc", "id"], name="document_help_idx"),
+            models.Index(fields=["czy_udzielona_pomoc", "data_wypadku", "id"], name="document_help_date_idx"),
+            models.Index(fields=["czy_wypadek_podczas_uzywania_maszyny", "id"], name="document_machine_idx"),
+            models.Index(
+                fields=["czy_wypadek_podczas_uzywania_maszyny", "data_wypadku", "id"], name="document_machine_date_idx"
+            ),
+        ]
+
 
 class Witness(models.Model):
     imie = models.CharField(max_length=255)
@@ -108,3 +124,32 @@ class Witness(models.Model):
     kod_pocztowy = models.CharField(max_length=6)
     nazwa_panstwa = models.CharField(max_length=255, null=True, blank=True)
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="witnesses")
+
+
+class RecommendationJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    pdf_data = models.BinaryField()
+    # [{"name": "extract", "status": "completed", "startedAt": "...", "durationMs": 12.3}, ...]
+    stages = models.JSONField(default=list, blank=True)
+    extraction_methods = models.JSONField(default=list, blank=True)
+    result = models.TextField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # A running job whose lease ran out (its worker died) is reclaimed by the next claim;
+    # `attempts` counts claims and tells a worker whether the job is still its own
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
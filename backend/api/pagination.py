@@ -0,0 +1,103 @@
+"""
+Keyset (cursor) pagination for the documents list.
+
+A cursor holds the ordering of the list and the sort values of the last row sent,
+signed with SECRET_KEY so clients treat it as opaque and cannot tamper with it.
+The next page is `WHERE (sort key, id) is after the cursor ... LIMIT n`: it reads
+from the matching index (see `Document.Meta.indexes`) no matter how deep the
+client is, unlike `OFFSET`, which walks every skipped row.
+
+Totals are optional in this mode and served from the cache for
+DOCUMENT_COUNT_CACHE_TTL seconds; saving or deleting a document in this process
+invalidates them.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime, time
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+CURSOR_SALT = "api.documents.cursor"
+_COUNT_GENERATION_KEY = "api:documents:count-generation"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _jsonable(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def _sort_value(row, name: str):
+    # Rows are model instances, or dicts from `.values()` (sparse fieldsets)
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def encode_cursor(ordering: Sequence[str], row) -> str:
+    values = [_jsonable(_sort_value(row, name.lstrip("-"))) for name in ordering]
+    return signing.dumps({"o": list(ordering), "v": values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor: str, ordering: Sequence[str]) -> list:
+    """Sort values stored in `cursor`; raises InvalidCursor if it is forged or was made for another ordering."""
+    try:
+        payload = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+    if payload.get("o") != list(ordering) or len(payload.get("v") or ()) != len(ordering):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return payload["v"]
+
+
+def keyset_filter(ordering: Sequence[str], values: Sequence) -> Q:
+    """Rows strictly after `values` in `ordering` (e.g. ["-data_wypadku", "-id"])."""
+    after = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        field = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        after |= equal & Q(**{f"{field}__{lookup}": value})
+        equal &= Q(**{field: value})
+    # The OR above alone is not a usable index range; bound the leading key as well
+    first = ordering[0]
+    bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+    return bound & after
+
+
+def paginate_by_cursor(queryset, cursor: Optional[str], page_size: int):
+    """One page of `queryset` (which must be ordered, ending in a unique key) and the cursor of the next page."""
+    ordering = [str(name) for name in queryset.query.order_by]
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, ordering)))
+    rows = list(queryset[: page_size + 1])
+    next_cursor = encode_cursor(ordering, rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+def cached_count(queryset) -> int:
+    """`queryset.count()`, reused for DOCUMENT_COUNT_CACHE_TTL seconds across page turns."""
+    generation = cache.get_or_set(_COUNT_GENERATION_KEY, 0, None)
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha256(repr((sql, params)).encode("utf-8")).hexdigest()
+    key = f"api:documents:count:{generation}:{digest}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, "DOCUMENT_COUNT_CACHE_TTL", 60))
+    return count
+
+
+def invalidate_counts() -> None:
+    try:
+        cache.incr(_COUNT_GENERATION_KEY)
+    except ValueError:
+        # Not cached yet: nothing to invalidate
+        pass
@@ -0,0 +1,91 @@
+"""
+Sparse fieldsets for the documents list.
+
+`DocumentSerializer` renders all ~80 columns plus nested witnesses for every row.
+With `fields=summary` (the dashboard table columns), `fields=id,nazwisko,...` or both
+the list selects just those columns with `.values()`, skips DRF, and loads
+witnesses only when `witnesses` is one of the requested fields. The values match
+what `DocumentSerializer` would output for the same fields, so the full
+representation (`full_fields()`) is rendered the same way, without per-row DRF
+overhead.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from api.models import Document, Witness
+from api.serializers import DocumentSerializer, WitnessSerializer
+
+WITNESSES = "witnesses"
+SUMMARY = "summary"
+
+LIST_SUMMARY_FIELDS = (
+    "id",
+    "imie",
+    "nazwisko",
+    "pesel",
+    "data_wypadku",
+    "godzina_wypadku",
+    "miejsce_wypadku",
+    "czy_udzielona_pomoc",
+    "czy_wypadek_podczas_uzywania_maszyny",
+)
+
+DOCUMENT_FIELDS = frozenset(field.name for field in Document._meta.concrete_fields)
+
+
+class UnknownFields(ValueError):
+    pass
+
+
+def parse_fields(value) -> Optional[List[str]]:
+    """Requested fields (always starting with "id"), or None for the full representation."""
+    if value in (None, "", []):
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    names = []
+    for name in (str(name).strip() for name in value):
+        # "summary" stands for the dashboard table columns and can be combined, e.g. "summary,witnesses"
+        if name == SUMMARY:
+            names.extend(LIST_SUMMARY_FIELDS)
+        elif name:
+            names.append(name)
+    unknown = [name for name in names if name not in DOCUMENT_FIELDS and name != WITNESSES]
+    if unknown:
+        raise UnknownFields(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *names]))
+
+
+def project(queryset, fields: Iterable[str]):
+    """`queryset` as dicts of the requested columns (plus its sort keys, needed for cursors)."""
+    sort_keys = [str(name).lstrip("-") for name in queryset.query.order_by]
+    columns = dict.fromkeys([name for name in fields if name != WITNESSES] + sort_keys)
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def _witnesses_by_document(document_ids) -> dict:
+    columns = [name for name in WitnessSerializer.Meta.fields if name != "documentId"]
+    grouped = defaultdict(list)
+    for witness in Witness.objects.filter(document_id__in=document_ids).order_by("id").values(*columns, "document_id"):
+        witness["documentId"] = witness["document_id"]
+        grouped[witness["document_id"]].append({name: witness[name] for name in WitnessSerializer.Meta.fields})
+    return grouped
+
+
+def render_rows(rows, fields: Iterable[str]) -> list:
+    """Rows from `project` trimmed to `fields` (in that order), with witnesses attached when requested."""
+    rows = list(rows)
+    witnesses = _witnesses_by_document([row["id"] for row in rows]) if WITNESSES in fields else {}
+    return [
+        {name: witnesses.get(row["id"], []) if name == WITNESSES else row[name] for name in fields}
+        for row in rows
+    ]
+
+
+@lru_cache(maxsize=None)
+def full_fields() -> tuple:
+    """`DocumentSerializer`'s fields in its order: rendering them gives the same JSON as the serializer."""
+    return tuple(DocumentSerializer().fields)
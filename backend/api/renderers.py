@@ -0,0 +1,61 @@
+"""
+Fast JSON encoding for API responses.
+
+`orjson` (a compiled encoder) serializes dicts/lists of model values straight to
+bytes and handles date, time, datetime and UUID natively; Decimal and lazy
+translation strings go through `_default`. Without orjson installed the same
+helpers fall back to `json` + `DjangoJSONEncoder`.
+
+Use `FastJsonResponse` in plain Django views and `FastJSONRenderer` for DRF views
+(it is the default renderer in REST_FRAMEWORK).
+"""
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        # Same as DjangoJSONEncoder: keep the exact digits
+        return str(value)
+    if isinstance(value, Promise):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJsonResponse(HttpResponse):
+    """`JsonResponse` with the fast encoder (same `safe` rule: only dicts unless safe=False)."""
+
+    def __init__(self, data, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=json_dumps(data), **kwargs)
+
+
+class FastJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json_dumps(data)
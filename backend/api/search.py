@@ -0,0 +1,103 @@
+"""
+Full-text search for the employee dashboard.
+
+On SQLite the searchable `Document` columns are copied, diacritic-folded
+(`tools.text_folding`), into the FTS5 table `api_document_search` (migration 0006,
+`rowid` = document id). `api.signals` keeps it in sync on save/delete; code that
+writes with `bulk_create` or raw SQL must call `index_documents` itself.
+
+Every word of a query must match the start of a word in one of the columns
+("kowal krak" finds "Kowalski, Kraków"); results are ranked with bm25, weighting
+names and PESEL above the accident description. Other databases fall back to
+`icontains`.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from api.models import Document
+from tools.text_folding import fold, folded_words
+
+SEARCH_TABLE = "api_document_search"
+SEARCH_FIELDS = ("nazwisko", "imie", "pesel", "miejsce_wypadku", "rodzaj_urazow", "szczegoly_okolicznosci")
+# bm25 column weights, in SEARCH_FIELDS order
+SEARCH_WEIGHTS = (10.0, 8.0, 10.0, 4.0, 2.0, 1.0)
+
+_available = set()
+
+
+def search_available(using: str = "default") -> bool:
+    """True when the database has the FTS5 search table (checked once per connection alias)."""
+    if using in _available:
+        return True
+    connection = connections[using]
+    if connection.vendor != "sqlite" or SEARCH_TABLE not in connection.introspection.table_names():
+        return False
+    _available.add(using)
+    return True
+
+
+def match_expression(term: str) -> Optional[str]:
+    """FTS5 query requiring a prefix match for every folded word of `term` (None if it has none)."""
+    words = folded_words(term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_documents(queryset, term: str, ranked: bool = True):
+    """Restrict `queryset` to documents matching `term`; with `ranked`, annotate `search_rank` (lower is better)."""
+    if not search_available(queryset.db):
+        return queryset.filter(
+            Q(imie__icontains=term)
+            | Q(nazwisko__icontains=term)
+            | Q(pesel__icontains=term)
+            | Q(miejsce_wypadku__icontains=term)
+            | Q(rodzaj_urazow__icontains=term)
+            | Q(szczegoly_okolicznosci__icontains=term)
+        )
+
+    expression = match_expression(term)
+    if expression is None:
+        return queryset.none()
+
+    queryset = queryset.filter(
+        pk__in=RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", (expression,))
+    )
+    if ranked:
+        weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f"SELECT bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {Document._meta.db_table}.id",
+            (expression,),
+        ))
+    return queryset
+
+
+def _row(document) -> list:
+    return [document.pk] + [fold(str(getattr(document, name) or "")) for name in SEARCH_FIELDS]
+
+
+def index_documents(documents: Iterable, using: str = "default") -> None:
+    """Insert or refresh the search rows of `documents` (model instances with a primary key)."""
+    if not search_available(using):
+        return
+    rows = [_row(document) for document in documents]
+    if not rows:
+        return
+    columns = ", ".join(SEARCH_FIELDS)
+    placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 1))
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [row[:1] for row in rows])
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})", rows)
+
+
+def remove_documents(document_ids: Iterable[int], using: str = "default") -> None:
+    if not search_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk in document_ids])
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import Document, Witness
+from api.pagination import invalidate_counts
+from api.search import index_documents, remove_documents
+from tools.pdf_cache import get_rendered_pdf_cache
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_document_pdfs(sender, instance, **kwargs):
+    get_rendered_pdf_cache().invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Witness)
+def invalidate_witness_document_pdfs(sender, instance, **kwargs):
+    if instance.document_id:
+        get_rendered_pdf_cache().invalidate(instance.document_id)
+
+
+@receiver(post_save, sender=Document)
+def index_document(sender, instance, using, **kwargs):
+    index_documents([instance], using=using)
+
+
+@receiver(post_delete, sender=Document)
+def unindex_document(sender, instance, using, **kwargs):
+    remove_documents([instance.pk], using=using)
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_document_counts(sender, **kwargs):
+    invalidate_counts()
@@ -0,0 +1,880 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+
+import fitz  # type: ignore
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.jobs import arun_zus_recommendation, claim_next_job, process_job, run_zus_recommendation, start_job_runner
+from api.management.commands.bench_pdf_fill import load_fixture_document
+from api.models import Document, RecommendationJob, Witness
+from api.projections import LIST_SUMMARY_FIELDS
+from api.serializers import DocumentSerializer
+from api.views import _filter_documents
+from tools.chatgpt import TOKEN_USAGE, ChatPrompts
+from tools.llm_cache import get_llm_response_cache
+from tools.llm_resilience import CircuitBreaker, LlmGuard, LlmUnavailableError
+from tools.ocr import TesserocrEngine, extract_pdf_content
+from tools.ocr_cache import get_ocr_cache
+from tools.pdf_anonymizer import DEFAULT_REDACTED_FIELDS
+from tools.pdf_batch import TEMPLATE_PATH
+from tools.pdf_cache import RenderedPdfCache
+from tools.pdf_mapper import map_document_to_pdf_fields, map_pdf_fields_to_document_data
+from tools.pdf_writer import PDFWriter, TemplateCache
+
+FORM_VALUES = {
+    "PESEL[0]": "90010112345",
+    "Imię[0]": "Jan",
+    "Nazwisko[0]": "Kowalski",
+    "Datawyp[0]": "2025-01-02",
+    "Godzina[0]": "08:30",
+    "Miejscewyp[0]": "Hala produkcyjna",
+}
+
+
+def make_document(**fields) -> Document:
+    """Saved copy of the sample generate-pdf document (indexed for search by `api.signals`)."""
+    template = load_fixture_document()
+    values = {field.attname: getattr(template, field.attname) for field in Document._meta.concrete_fields}
+    values.pop("id")
+    return Document.objects.create(**{**values, **fields})
+
+
+def viewer_filled_form(values=FORM_VALUES) -> bytes:
+    """ewyp.pdf filled the way a PDF viewer does it: values set on the template's own (qualified) fields."""
+    with fitz.open(TEMPLATE_PATH) as document:
+        filled = set()
+        for page in document:
+            for widget in page.widgets():
+                name = widget.field_name.rsplit(".", 1)[-1]
+                if name in values and name not in filled:
+                    widget.field_value = values[name]
+                    widget.update()
+                    filled.add(name)
+        return document.tobytes()
+
+
+class ExtractPdfContentFormFieldsTests(SimpleTestCase):
+    def assert_form_read_without_ocr(self, data: bytes):
+        content = extract_pdf_content(data)
+        self.assertNotIn("ocr", content["methods"])
+        for name, value in FORM_VALUES.items():
+            self.assertEqual(content["fields"][name], value)
+        document = map_pdf_fields_to_document_data(content["fields"])
+        self.assertEqual(document["pesel"], "90010112345")
+        self.assertEqual(document["nazwisko"], "Kowalski")
+        self.assertEqual(str(document["data_wypadku"]), "2025-01-02")
+
+    def test_viewer_filled_form(self):
+        data = viewer_filled_form()
+        with fitz.open(stream=data, filetype="pdf") as document:
+            names = [widget.field_name for page in document for widget in page.widgets()]
+        # The fixture keeps the template's qualified names, like a real viewer-filled form
+        self.assertIn("topmostSubform[0].Page1[0].PESEL[0]", names)
+        self.assert_form_read_without_ocr(data)
+
+    def test_form_written_by_pdf_writer(self):
+        self.assert_form_read_without_ocr(PDFWriter().fill_template(TEMPLATE_PATH, FORM_VALUES).getvalue())
+
+
+@override_settings(JOB_LEASE_SECONDS=60, JOB_MAX_ATTEMPTS=2)
+class RecommendationJobLeaseTests(TestCase):
+    def make_job(self, **fields):
+        return RecommendationJob.objects.create(file_name="form.pdf", pdf_data=b"%PDF-", **fields)
+
+    def test_claim_leases_the_job(self):
+        job = self.make_job()
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, RecommendationJob.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertGreater(claimed.lease_expires_at, timezone.now())
+        self.assertIsNone(claim_next_job())
+
+    def test_running_job_with_expired_lease_is_reclaimed(self):
+        job = self.make_job(
+            status=RecommendationJob.STATUS_RUNNING, attempts=1, lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_job_is_failed_after_max_attempts(self):
+        job = self.make_job(
+            status=RecommendationJob.STATUS_RUNNING, attempts=2, lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecommendationJob.STATUS_FAILED)
+        self.assertEqual(bytes(job.pdf_data), b"")
+
+    def test_finished_job_drops_the_upload(self):
+        self.make_job()
+        job = claim_next_job()
+        outcome = {"recommendation": "ok", "extractionMethods": ["acroform"]}
+        with mock.patch("api.jobs.run_zus_recommendation", return_value=outcome):
+            process_job(job, client=None)
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecommendationJob.STATUS_COMPLETED)
+        self.assertEqual(bytes(job.pdf_data), b"")
+        self.assertIsNone(job.lease_expires_at)
+
+    @mock.patch("api.jobs.get_job_runner")
+    def test_runner_starts_only_in_server_processes(self, get_job_runner):
+        with mock.patch("multiprocessing.parent_process", return_value=mock.Mock()):
+            start_job_runner()  # a PDF pool worker
+        with self.settings(JOB_RUNNER_AUTOSTART=False):
+            start_job_runner()
+        get_job_runner.assert_not_called()
+        start_job_runner()
+        get_job_runner.return_value.start.assert_called_once_with()
+
+    def test_stale_worker_does_not_overwrite_a_reclaimed_job(self):
+        self.make_job()
+        stale = claim_next_job()
+        RecommendationJob.objects.filter(pk=stale.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        current = claim_next_job()
+        with mock.patch("api.jobs.run_zus_recommendation", side_effect=RuntimeError("worker lost")):
+            process_job(stale, client=None)
+        current.refresh_from_db()
+        self.assertEqual(current.status, RecommendationJob.STATUS_RUNNING)
+        self.assertEqual(current.attempts, 2)
+
+
+class HealthTests(SimpleTestCase):
+    def test_reports_llm_cache_and_token_usage(self):
+        get_llm_response_cache.cache_clear()
+        self.addCleanup(get_llm_response_cache.cache_clear)
+        self.addCleanup(TOKEN_USAGE.reset)
+        usage = mock.Mock(prompt_tokens=1200, completion_tokens=50, prompt_tokens_details=mock.Mock(cached_tokens=1024))
+        TOKEN_USAGE.reset()
+        TOKEN_USAGE.record(usage, 0.2)
+        with self.settings(LLM_CACHE_MAX_ENTRIES=8):
+            cache = get_llm_response_cache()
+            cache.get("missing")
+            llm = self.client.get("/api/health/").json()["llm"]
+        self.assertIn("breaker", llm)
+        self.assertEqual(llm["responseCache"], {"hits": 0, "misses": 1, "size": 0})
+        self.assertEqual(llm["tokenUsage"]["cachedTokens"], 1024)
+        self.assertEqual(llm["tokenUsage"]["avgLatencyMsCached"], 200.0)
+
+    def test_reports_tesseract_probe_stats(self):
+        ocr = self.client.get("/api/health/").json()["ocr"]
+        self.assertEqual(
+            set(ocr["tesseractProbe"]), {"probes", "hits", "totalProbeMs", "lastProbeMs", "cachedBinaries"}
+        )
+
+
+OCR_CONTENT = {"fields": {}, "text": "Data wypadku: 2025-01-02", "methods": ["ocr"]}
+
+
+def llm_usage(prompt_tokens):
+    return mock.Mock(prompt_tokens=prompt_tokens, completion_tokens=10, prompt_tokens_details=None)
+
+
+class FakeZusClient:
+    """Answers like `ChatGPTClient`; `assessment_error` makes the structured call fail."""
+
+    def __init__(self, assessment_error=None):
+        self.assessment_error = assessment_error
+        self.calls = []
+
+    def _call(self, name, prompt_tokens):
+        self.calls.append(name)
+        TOKEN_USAGE.record(llm_usage(prompt_tokens), 0.01)
+
+    def zus_assessment(self, text):
+        self._call("zus_assessment", 500)
+        if self.assessment_error:
+            raise self.assessment_error
+        return {"ok": True}
+
+    def find_desc_from_pdf(self, text):
+        self._call("find_desc_from_pdf", 400)
+        return "{}"
+
+    def worker_recommendation(self, data, attachments=None):
+        self._call("worker_recommendation", 300)
+        self.attachments = attachments
+        return "recommendation"
+
+
+class AsyncFakeZusClient(FakeZusClient):
+    async def zus_assessment(self, text):
+        return FakeZusClient.zus_assessment(self, text)
+
+    async def find_desc_from_pdf(self, text):
+        return FakeZusClient.find_desc_from_pdf(self, text)
+
+    async def worker_recommendation(self, data, attachments=None):
+        return FakeZusClient.worker_recommendation(self, data, attachments)
+
+
+@override_settings(ZUS_SINGLE_CALL=True)
+@mock.patch("api.jobs.extract_pdf_content", return_value=OCR_CONTENT)
+class ZusRecommendationModeTests(SimpleTestCase):
+    def setUp(self):
+        TOKEN_USAGE.reset()
+        self.addCleanup(TOKEN_USAGE.reset)
+
+    def run_both(self, make_client):
+        sync_client, async_client = make_client(FakeZusClient), make_client(AsyncFakeZusClient)
+        stages = []
+        outcomes = [
+            run_zus_recommendation(b"%PDF-", sync_client),
+            asyncio.run(arun_zus_recommendation(b"%PDF-", async_client, lambda name, _: stages.append(name))),
+        ]
+        return outcomes, stages
+
+    def test_usage_and_latency_are_recorded_per_mode(self, _extract):
+        outcomes, stages = self.run_both(lambda cls: cls())
+        self.assertEqual([outcome["llmMode"] for outcome in outcomes], ["structured", "structured"])
+        self.assertEqual(stages, ["extract", "describe", "recommend"])
+        self.run_both(lambda cls: cls(assessment_error=ValueError("invalid output")))
+        modes = TOKEN_USAGE.snapshot()["modes"]
+        self.assertEqual(modes["structured"]["runs"], 2)
+        self.assertEqual(modes["structured"]["avgPromptTokens"], 500)
+        # The failed structured call is part of the fallback run it delayed
+        self.assertEqual(modes["two-call"]["runs"], 2)
+        self.assertEqual(modes["two-call"]["avgCalls"], 3)
+        self.assertEqual(modes["two-call"]["avgPromptTokens"], 1200)
+        self.assertGreater(modes["two-call"]["avgLlmLatencyMs"], 0)
+
+    def test_rejected_call_is_not_retried_on_the_two_call_path(self, _extract):
+        error = LlmUnavailableError("LLM circuit open", retry_after=5)
+        sync_client, async_client = FakeZusClient(error), AsyncFakeZusClient(error)
+        with self.assertRaises(LlmUnavailableError):
+            run_zus_recommendation(b"%PDF-", sync_client)
+        with self.assertRaises(LlmUnavailableError):
+            asyncio.run(arun_zus_recommendation(b"%PDF-", async_client))
+        self.assertEqual(sync_client.calls, ["zus_assessment"])
+        self.assertEqual(async_client.calls, ["zus_assessment"])
+
+
+class CircuitBreakerProbeTests(SimpleTestCase):
+    def setUp(self):
+        self.guard = LlmGuard(max_retries=0, breaker_threshold=1, breaker_cooldown=0.0)
+        self.guard.breaker.record_failure()
+        self.assertEqual(self.guard.breaker.state, CircuitBreaker.OPEN)
+
+    def assert_next_probe_closes_the_breaker(self):
+        self.assertEqual(self.guard.call("chat", lambda timeout: "ok"), "ok")
+        self.assertEqual(self.guard.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled_async_probe_is_released(self):
+        async def cancel_probe():
+            started = asyncio.Event()
+
+            async def hang(timeout):
+                started.set()
+                await asyncio.sleep(60)
+
+            probe = asyncio.create_task(self.guard.acall("chat", hang))
+            await started.wait()
+            self.assertEqual(self.guard.breaker.state, CircuitBreaker.HALF_OPEN)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+        asyncio.run(cancel_probe())
+        self.assertEqual(self.guard.stats()["endpoints"]["chat"]["cancelled"], 1)
+        self.assert_next_probe_closes_the_breaker()
+
+    def test_interrupted_sync_probe_is_released(self):
+        def interrupted(timeout):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.guard.call("chat", interrupted)
+        self.assert_next_probe_closes_the_breaker()
+
+
+# (label, dashboard request parameters, index the page query must use or None for the primary key,
+#  whether rows must come out of the index already sorted)
+LIST_QUERIES = [
+    ("default (-id)", {}, None),
+    ("sort data_wypadku asc", {"sort": "data_wypadku", "direction": "asc"}, "document_date_idx"),
+    ("sort data_wypadku desc", {"sort": "data_wypadku", "direction": "desc"}, "document_date_idx"),
+    ("sort nazwisko asc", {"sort": "nazwisko"}, "document_surname_idx"),
+    # A full PESEL matches few rows; sorting them afterwards is cheap
+    ("pesel search", {"search": "90010112345"}, "document_pesel_idx", False),
+    # Matches come from the FTS5 table (api.search) and are fetched by primary key, then ranked
+    ("full-text search", {"search": "kowal"}, None, False),
+    ("helpProvided", {"helpProvided": "true"}, "document_help_idx"),
+    ("helpProvided + date sort", {"helpProvided": "false", "sort": "data_wypadku"}, "document_help_date_idx"),
+    ("machineInvolved", {"machineInvolved": "true"}, "document_machine_idx"),
+    (
+        "machineInvolved + date sort",
+        {"machineInvolved": "true", "sort": "data_wypadku", "direction": "desc"},
+        "document_machine_date_idx",
+    ),
+]
+
+_FULL_SCAN_RE = re.compile(r"\bSCAN api_document\b(?! USING)")
+
+
+class DocumentListQueryPlanTests(TestCase):
+    """EXPLAIN the common dashboard list queries: each must use its index (migration 0005) and not sort in memory."""
+
+    PAGE_SIZE = 10
+
+    def test_list_queries_use_their_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest(f"Plan checks are written for SQLite, not {connection.vendor}")
+        for label, params, index, *presorted in LIST_QUERIES:
+            with self.subTest(label):
+                plan = _filter_documents(params)[: self.PAGE_SIZE].explain()
+                if presorted[0] if presorted else True:
+                    self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, "sorts in a temporary b-tree")
+                if index is not None:
+                    self.assertIn(f"INDEX {index}", plan, f"does not use {index}")
+                if params:
+                    self.assertNotRegex(plan, _FULL_SCAN_RE, "scans the whole table")
+
+
+class SlowStreamClient(ChatPrompts):
+    """Sends one delta, then holds the stream open until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.finished = False
+
+    def stream_chat(self, messages, use_cache=False, endpoint="chat"):
+        yield "Dzień dobry"
+        self.release.wait(5)
+        yield ", proszę o dokumenty."
+        self.finished = True
+
+
+class SuggestedResponseStreamTests(SimpleTestCase):
+    def test_first_delta_is_sent_before_the_upstream_finishes(self):
+        upstream = SlowStreamClient()
+        with mock.patch("api.views.get_chat_client", return_value=upstream):
+            response = self.client.post(
+                "/api/suggested-response/?stream=1", {"sectionLabel": "Nagłość"}, content_type="application/json"
+            )
+            chunks = iter(response.streaming_content)
+            first = next(chunks).decode()
+            self.assertFalse(upstream.finished)
+            upstream.release.set()
+            rest = b"".join(chunks).decode()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(json.loads(first.removeprefix("data: ")), {"delta": "Dzień dobry"})
+        self.assertTrue(upstream.finished)
+        self.assertTrue(rest.endswith("event: done\ndata: {}\n\n"))
+
+
+class OcrCacheOutsideDjangoTests(SimpleTestCase):
+    def test_no_cache_without_django_settings(self):
+        env = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"}
+        result = subprocess.run(
+            [sys.executable, "-c", "from tools.ocr_cache import get_ocr_cache; print(get_ocr_cache())"],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "None")
+
+    def test_unreadable_settings_disable_the_cache(self):
+        with mock.patch("tools.ocr_cache._configured_ocr_cache", side_effect=ImproperlyConfigured("OCR_CACHE_PATH")):
+            with self.assertLogs("tools.ocr_cache", "WARNING"):
+                self.assertIsNone(get_ocr_cache())
+
+
+class DigitsSearchTests(TestCase):
+    def setUp(self):
+        self.hall = make_document(pesel="90000000001", miejsce_wypadku="Hala produkcyjna")
+        self.street = make_document(pesel="85050523456", miejsce_wypadku="ul. Lipowa 17, 90-001 Łódź")
+
+    def search(self, term):
+        return set(_filter_documents({"search": term}).values_list("pk", flat=True))
+
+    def test_full_pesel(self):
+        self.assertEqual(self.search("90000000001"), {self.hall.pk})
+
+    def test_pesel_fragment_anywhere(self):
+        self.assertEqual(self.search("0000000001"), {self.hall.pk})
+        self.assertEqual(self.search("23456"), {self.street.pk})
+
+    def test_numbers_in_the_accident_place(self):
+        self.assertEqual(self.search("17"), {self.street.pk})
+        # PESEL prefix of one document, postcode of the other
+        self.assertEqual(self.search("90"), {self.hall.pk, self.street.pk})
+
+
+# Plain ASCII: the built-in Helvetica of the test page cannot encode Polish letters
+ATTACHMENT_TEXT = (
+    "Zaswiadczenie lekarskie. Pacjent Jan Kowalski zglosil sie na SOR 2 stycznia 2025 r. "
+    "Rozpoznanie: zlamanie kosci promieniowej prawej. Zalecono unieruchomienie w gipsie przez 6 tygodni."
+)
+
+
+class FormWithAttachmentsTests(SimpleTestCase):
+    def test_attachment_pages_reach_the_recommendation(self):
+        with fitz.open(stream=viewer_filled_form(), filetype="pdf") as document:
+            page = document.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 550, 300), ATTACHMENT_TEXT, fontname="helv")
+            data = document.tobytes()
+        client = FakeZusClient()
+        outcome = run_zus_recommendation(data, client)
+        self.assertEqual(outcome["llmMode"], "form")
+        self.assertEqual(client.calls, ["worker_recommendation"])
+        self.assertIn("zlamanie kosci promieniowej", client.attachments)
+        # The form's own unfilled pages (labels, the instructions page) are not sent along
+        self.assertNotIn("Adres do korespondencji", client.attachments)
+        self.assertNotIn("Co załatwisz tym formularzem", client.attachments)
+
+    def test_form_without_attachments(self):
+        client = FakeZusClient()
+        outcome = run_zus_recommendation(viewer_filled_form(), client)
+        self.assertIsNone(client.attachments)
+        self.assertIsNone(outcome["ocrTokens"])
+
+
+@mock.patch("tools.ocr.tesserocr")
+class TesserocrEnginePoolTests(SimpleTestCase):
+    def test_handle_is_reused(self, tesserocr):
+        engine = TesserocrEngine(size=1)
+        engine.image_to_string(mock.Mock(), "pol")
+        engine.image_to_string(mock.Mock(), "pol")
+        tesserocr.PyTessBaseAPI.assert_called_once_with(lang="pol")
+
+    def test_close_during_recognition_ends_the_handle(self, tesserocr):
+        engine = TesserocrEngine(size=1)
+        api = tesserocr.PyTessBaseAPI.return_value
+        api.GetUTF8Text.side_effect = lambda: engine.close() or "tekst"
+        self.assertEqual(engine.image_to_string(mock.Mock(), "pol"), "tekst")
+        api.End.assert_called_once_with()
+        # A new pool is started after close
+        api.GetUTF8Text.side_effect = None
+        engine.image_to_string(mock.Mock(), "pol")
+        self.assertEqual(tesserocr.PyTessBaseAPI.call_count, 2)
+
+
+class RedactedFillTests(SimpleTestCase):
+    def setUp(self):
+        self.data = map_document_to_pdf_fields(load_fixture_document())
+        # Short values (house numbers, checkbox states) would match object numbers and operators
+        self.redacted = {name for name in DEFAULT_REDACTED_FIELDS if len(self.data.get(name, "").strip()) > 3}
+
+    def test_no_redacted_value_or_widget_left(self):
+        output = PDFWriter().fill_template(TEMPLATE_PATH, self.data, redacted_fields=DEFAULT_REDACTED_FIELDS).getvalue()
+        self.assertIn("PESEL[0]", self.redacted)
+        with fitz.open(stream=output, filetype="pdf") as document:
+            widgets = {widget.field_name.rsplit(".", 1)[-1] for page in document for widget in page.widgets()}
+            self.assertFalse(widgets & DEFAULT_REDACTED_FIELDS)
+            for xref in range(1, document.xref_length()):
+                source = document.xref_object(xref) + (document.xref_stream(xref) or b"").decode("latin-1")
+                for name in self.redacted:
+                    self.assertNotIn(self.data[name], source, name)
+
+    def test_removed_widgets_are_not_written(self):
+        filled = PDFWriter().fill_template(TEMPLATE_PATH, self.data).getvalue()
+        redacted = PDFWriter().fill_template(TEMPLATE_PATH, self.data, redacted_fields=DEFAULT_REDACTED_FIELDS)
+        self.assertLess(len(redacted.getvalue()), len(filled))
+
+
+def text_form(field_name: str) -> bytes:
+    """One-page PDF with a single text field."""
+    with fitz.open() as document:
+        page = document.new_page()
+        widget = fitz.Widget()
+        widget.field_name = field_name
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.rect = fitz.Rect(50, 50, 250, 70)
+        page.add_widget(widget)
+        return document.tobytes()
+
+
+class TemplateCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "template.pdf"
+        self.path.write_bytes(text_form("Stare[0]"))
+        self.cache = TemplateCache()
+
+    def set_mtime(self, seconds):
+        os.utime(self.path, ns=(seconds * 10**9, seconds * 10**9))
+
+    def test_unchanged_file_reuses_the_reader(self):
+        entry = self.cache.get(self.path)
+        self.assertIs(self.cache.get(str(self.path)), entry)
+
+    def test_touched_file_with_same_content_is_not_reparsed(self):
+        self.set_mtime(1_000)
+        reader = self.cache.get(self.path).reader
+        self.set_mtime(2_000)
+        entry = self.cache.get(self.path)
+        self.assertIs(entry.reader, reader)
+        self.assertEqual(entry.mtime_ns, 2_000 * 10**9)
+
+    def test_rewritten_file_is_reparsed(self):
+        self.set_mtime(1_000)
+        self.assertIn("Stare[0]", self.cache.get(self.path).field_index)
+        self.path.write_bytes(text_form("Nowe[0]"))
+        self.set_mtime(2_000)
+        field_index = self.cache.get(self.path).field_index
+        self.assertIn("Nowe[0]", field_index)
+        self.assertNotIn("Stare[0]", field_index)
+
+
+def widget_states(pdf: bytes) -> dict:
+    """(page, field name, rect) -> value for every widget of ``pdf``."""
+    with fitz.open(stream=pdf, filetype="pdf") as document:
+        return {
+            (page.number, widget.field_name, tuple(widget.rect)): widget.field_value
+            for page in document
+            for widget in page.widgets()
+        }
+
+
+class IndexedFillTests(SimpleTestCase):
+    def test_matches_the_uncached_fill(self):
+        data = map_document_to_pdf_fields(load_fixture_document())
+        cached = widget_states(PDFWriter().fill_template(TEMPLATE_PATH, data).getvalue())
+        uncached = widget_states(PDFWriter(use_cache=False).fill_template(TEMPLATE_PATH, data).getvalue())
+        self.assertEqual(cached, uncached)
+        self.assertIn(data["PESEL[0]"], cached.values())
+
+
+@mock.patch("tools.pdf_batch.get_executor", lambda: ThreadPoolExecutor(max_workers=2))
+class PdfBatchTests(TestCase):
+    def post(self, **data):
+        return self.client.post(
+            "/api/documents/", {"action": "generate-pdf-batch", **data}, content_type="application/json"
+        )
+
+    def test_zip_holds_filled_and_anonymized_copies_in_id_order(self):
+        first, second = make_document(pesel="90000000001"), make_document(pesel="85050523456")
+        response = self.post(ids=[second.pk, first.pk], includeAnonymized=True)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [
+                    f"zgloszenie-{first.pk}.pdf",
+                    f"zgloszenie-{first.pk}-anon.pdf",
+                    f"zgloszenie-{second.pk}.pdf",
+                    f"zgloszenie-{second.pk}-anon.pdf",
+                ],
+            )
+            filled = widget_states(archive.read(f"zgloszenie-{second.pk}.pdf"))
+            anonymized = widget_states(archive.read(f"zgloszenie-{second.pk}-anon.pdf"))
+        self.assertIn("85050523456", filled.values())
+        self.assertNotIn("85050523456", anonymized.values())
+
+    def test_list_filters_without_ids(self):
+        make_document(miejsce_wypadku="Hala produkcyjna")
+        make_document(miejsce_wypadku="ul. Lipowa 17")
+        response = self.post(search="Lipowa")
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(len(archive.namelist()), 1)
+
+    def test_unknown_ids(self):
+        self.assertEqual(self.post(ids=[999_999]).status_code, 404)
+
+
+class RenderedPdfEtagTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = RenderedPdfCache(directory.name)
+        for target in ("api.views.get_rendered_pdf_cache", "api.signals.get_rendered_pdf_cache"):
+            patcher = mock.patch(target, return_value=self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.document = make_document()
+        self.url = f"/api/documents/{self.document.pk}/anonymized/"
+
+    def cached_files(self):
+        return list((self.cache.root / str(self.document.pk)).glob("*.pdf"))
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b"%PDF"))
+        etag = response["ETag"]
+        key = etag.strip('"')
+        self.assertEqual([path.name for path in self.cached_files()], [f"{key}.pdf"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_save_invalidates_the_render(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.document.miejsce_wypadku = "ul. Lipowa 17"
+        self.document.save()
+        self.assertEqual(self.cached_files(), [])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(self.cached_files()), 1)
+
+
+class CursorPaginationTests(TestCase):
+    PAGE_SIZE = 3
+
+    def setUp(self):
+        days = [2, 2, 1, 3, 2, 1, 3]
+        names = ["Nowak", "Kowalski", "Nowak", "Adamczyk", "Zieliński", "Kowalski", "Nowak"]
+        for day, name in zip(days, names):
+            make_document(data_wypadku=date(2025, 1, day), nazwisko=name)
+
+    def fetch(self, **params):
+        return self.client.post(
+            "/api/documents/", {"action": "list", "pageSize": self.PAGE_SIZE, **params}, content_type="application/json"
+        )
+
+    def offset_ids(self, **params):
+        ids, page = [], 1
+        while True:
+            payload = self.fetch(page=page, **params).json()
+            ids += [item["id"] for item in payload["items"]]
+            if page >= payload["totalPages"]:
+                return ids
+            page += 1
+
+    def cursor_ids(self, **params):
+        ids, cursor = [], ""
+        while True:
+            payload = self.fetch(cursor=cursor, **params).json()
+            self.assertLessEqual(len(payload["items"]), self.PAGE_SIZE)
+            ids += [item["id"] for item in payload["items"]]
+            cursor = payload["nextCursor"]
+            if cursor is None:
+                return ids
+
+    def test_cursor_walk_matches_offset_order(self):
+        for params in ({}, {"sort": "data_wypadku", "direction": "desc"}, {"sort": "nazwisko"}):
+            with self.subTest(**params):
+                ids = self.cursor_ids(**params)
+                self.assertEqual(ids, self.offset_ids(**params))
+                self.assertEqual(len(ids), 7)
+
+    def test_total_on_request(self):
+        payload = self.fetch(pagination="cursor", includeTotal=True).json()
+        self.assertEqual(payload["totalCount"], 7)
+        self.assertNotIn("totalCount", self.fetch(pagination="cursor").json())
+
+    def test_forged_cursor(self):
+        cursor = self.fetch(pagination="cursor").json()["nextCursor"]
+        tampered = cursor[:-1] + ("A" if cursor[-1] != "A" else "B")
+        for bad, params in ((tampered, {}), ("not-a-cursor", {}), (cursor, {"sort": "nazwisko"})):
+            with self.subTest(cursor=bad, **params):
+                response = self.fetch(cursor=bad, **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response["Content-Type"], "text/plain")
+
+
+def serializer_json(document: Document) -> dict:
+    """What `DocumentSerializer` + DRF's stock JSONRenderer give for ``document``."""
+    return json.loads(JSONRenderer().render(DocumentSerializer(document).data))
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.document = make_document(nazwisko="Nowak")
+        for name in ("Anna", "Piotr"):
+            Witness.objects.create(
+                document=self.document,
+                imie=name,
+                nazwisko="Lis",
+                ulica="Lipowa",
+                nr_domu="17",
+                miejscowosc="Łódź",
+                kod_pocztowy="90-001",
+            )
+        self.expected = serializer_json(Document.objects.get(pk=self.document.pk))
+
+    def fetch(self, **params):
+        return self.client.post("/api/documents/", params, content_type="application/json")
+
+    def test_full_representation_matches_the_serializer(self):
+        self.assertEqual(self.fetch(action="detail", id=self.document.pk).json(), self.expected)
+        self.assertEqual(self.fetch(action="list").json()["items"], [self.expected])
+
+    def test_requested_fields_in_order(self):
+        with self.assertNumQueries(2):
+            items = self.fetch(action="list", fields="nazwisko,pesel").json()["items"]
+        self.assertEqual(items, [{name: self.expected[name] for name in ("id", "nazwisko", "pesel")}])
+
+    def test_summary_with_witnesses(self):
+        with self.assertNumQueries(3):
+            items = self.fetch(action="list", fields=["summary", "witnesses"]).json()["items"]
+        self.assertEqual(list(items[0]), [*LIST_SUMMARY_FIELDS, "witnesses"])
+        self.assertEqual(items[0], {name: self.expected[name] for name in items[0]})
+        self.assertEqual([witness["imie"] for witness in items[0]["witnesses"]], ["Anna", "Piotr"])
+
+    def test_unknown_field(self):
+        response = self.fetch(action="list", fields="nazwisko,haslo")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content.decode(), "Unknown fields: haslo")
+
+
+XLSX_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def xlsx_rows(workbook: zipfile.ZipFile, index: int = 1) -> list:
+    """Cell values of one sheet: inline strings as text, everything else as the raw <v> number."""
+    sheet = ElementTree.fromstring(workbook.read(f"xl/worksheets/sheet{index}.xml"))
+    return [
+        [cell.findtext("x:is/x:t", namespaces=XLSX_NS) or cell.findtext("x:v", namespaces=XLSX_NS) for cell in row]
+        for row in sheet.iterfind("x:sheetData/x:row", XLSX_NS)
+    ]
+
+
+class DocumentExportTests(TestCase):
+    FIELDS = "nazwisko,data_wypadku,godzina_wypadku,czy_udzielona_pomoc,czy_maszyna_posiada_atest"
+
+    def setUp(self):
+        self.first = make_document(
+            nazwisko="Nowak, Jan",
+            data_wypadku=date(2025, 1, 2),
+            godzina_wypadku=time(8, 30),
+            czy_udzielona_pomoc=True,
+            czy_maszyna_posiada_atest=None,
+        )
+        self.second = make_document(
+            nazwisko="Żak",
+            data_wypadku=date(2025, 1, 3),
+            godzina_wypadku=time(8, 30),
+            czy_udzielona_pomoc=False,
+            czy_maszyna_posiada_atest=False,
+        )
+
+    def export(self, export_format, **params):
+        response = self.client.post(
+            "/api/documents/",
+            {"action": "export", "format": export_format, "fields": self.FIELDS, "sort": "nazwisko", **params},
+            content_type="application/json",
+        )
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_rows(self):
+        response, content = self.export("csv")
+        self.assertEqual(response["Content-Disposition"], "attachment; filename=zgloszenia.csv")
+        self.assertTrue(content.startswith("\ufeff".encode("utf-8")))
+        rows = list(csv.reader(StringIO(content.decode("utf-8-sig"))))
+        self.assertEqual(
+            rows,
+            [
+                ["id", *self.FIELDS.split(",")],
+                [str(self.first.pk), "Nowak, Jan", "2025-01-02", "08:30:00", "true", ""],
+                [str(self.second.pk), "Żak", "2025-01-03", "08:30:00", "false", "false"],
+            ],
+        )
+
+    def test_xlsx_rows(self):
+        response, content = self.export("xlsx", search="Nowak")
+        self.assertEqual(response["Content-Disposition"], "attachment; filename=zgloszenia.xlsx")
+        with zipfile.ZipFile(BytesIO(content)) as workbook:
+            self.assertIn('name="Zgłoszenia"', workbook.read("xl/workbook.xml").decode())
+            rows = xlsx_rows(workbook)
+        self.assertEqual(
+            rows,
+            [["id", *self.FIELDS.split(",")], [str(self.first.pk), "Nowak, Jan", "45659", repr(8.5 / 24), "1", None]],
+        )
+
+    @mock.patch("tools.xlsx_stream.MAX_SHEET_ROWS", 2)
+    def test_xlsx_rows_spill_into_further_sheets(self):
+        _, content = self.export("xlsx", fields="nazwisko")
+        with zipfile.ZipFile(BytesIO(content)) as workbook:
+            sheets = [xlsx_rows(workbook, index) for index in (1, 2)]
+            self.assertNotIn("xl/worksheets/sheet3.xml", workbook.namelist())
+        header = ["id", "nazwisko"]
+        self.assertEqual(sheets, [[header, [str(self.first.pk), "Nowak, Jan"]], [header, [str(self.second.pk), "Żak"]]])
+
+    def test_unsupported_format(self):
+        response = self.client.post(
+            "/api/documents/", {"action": "export", "format": "ods"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch("tools.pdf_batch.get_executor", lambda: ThreadPoolExecutor(max_workers=2))
+class DocumentImportTests(TestCase):
+    # Fields `map_document_to_pdf_fields` writes and `map_pdf_fields_to_document_data` reads back
+    ROUND_TRIP_FIELDS = (
+        "pesel",
+        "imie",
+        "nazwisko",
+        "data_urodzenia",
+        "data_wypadku",
+        "godzina_wypadku",
+        "miejsce_wypadku",
+        "rodzaj_urazow",
+        "szczegoly_okolicznosci",
+        "czy_udzielona_pomoc",
+        "imie_zglaszajacego",
+        "nazwisko_zglaszajacego",
+    )
+
+    def setUp(self):
+        self.source = make_document(nazwisko="Importowany", pesel="85050523456")
+        self.form = PDFWriter().fill_template(TEMPLATE_PATH, map_document_to_pdf_fields(self.source)).getvalue()
+
+    def upload(self, *files):
+        return self.client.post("/api/documents/", {"action": "import", "files": list(files)})
+
+    def test_round_trip_with_per_file_errors(self):
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zipped:
+            zipped.writestr("forms/b.pdf", self.form)
+            zipped.writestr("forms/notes.txt", "not a form")
+        report = self.upload(
+            SimpleUploadedFile("a.pdf", self.form),
+            SimpleUploadedFile("forms.zip", archive.getvalue()),
+            SimpleUploadedFile("broken.pdf", b"%PDF-1.7 truncated"),
+            SimpleUploadedFile("blank.pdf", TEMPLATE_PATH.read_bytes()),
+        ).json()
+
+        self.assertEqual((report["imported"], report["failed"]), (2, 3))
+        files = {entry["file"]: entry for entry in report["files"]}
+        self.assertEqual(
+            list(files), ["a.pdf", "forms.zip/forms/b.pdf", "forms.zip/forms/notes.txt", "broken.pdf", "blank.pdf"]
+        )
+        self.assertEqual(files["forms.zip/forms/notes.txt"]["errors"], {"file": ["Not a PDF file"]})
+        self.assertEqual(files["broken.pdf"]["errors"], {"file": ["Not a readable PDF"]})
+        self.assertEqual(files["blank.pdf"]["errors"]["pesel"], ["This field is required."])
+
+        expected = serializer_json(self.source)
+        for name in ("a.pdf", "forms.zip/forms/b.pdf"):
+            self.assertEqual(files[name]["status"], "imported")
+            imported = serializer_json(Document.objects.get(pk=files[name]["id"]))
+            self.assertEqual(
+                {field: imported[field] for field in self.ROUND_TRIP_FIELDS},
+                {field: expected[field] for field in self.ROUND_TRIP_FIELDS},
+            )
+        # bulk_create sends no post_save: the import indexes the new rows itself
+        self.assertEqual(
+            set(_filter_documents({"search": "Importowany"}).values_list("pk", flat=True)),
+            {self.source.pk, files["a.pdf"]["id"], files["forms.zip/forms/b.pdf"]["id"]},
+        )
+
+    @override_settings(PDF_IMPORT_MAX_FILES=1)
+    def test_too_many_files_saves_nothing(self):
+        response = self.upload(SimpleUploadedFile("a.pdf", self.form), SimpleUploadedFile("b.pdf", self.form))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content.decode(), "Too many files: at most 1 forms per import")
+        self.assertEqual(Document.objects.count(), 1)
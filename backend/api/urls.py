@@ -9,8 +9,10 @@ urlpatterns = [
     # path("upload-pdf/", views.upload_pdf_view, name="upload-pdf"),
     path("user-recommendation/", views.user_recommendation_view, name="user-recommendation"),
     path("zus-recommendation/", views.zus_recommendation_view, name="zus-recommendation"),
+    path("zus-recommendation/jobs/", views.zus_recommendation_jobs_view, name="zus-recommendation-jobs"),
+    path("zus-recommendation/jobs/<int:pk>/", views.zus_recommendation_job_detail_view, name="zus-recommendation-job-detail"),
     path("suggested-response/", views.suggested_response_view, name="suggested-response"),
+    path("read-pdf/", views.read_document_from_pdf_view, name="read-pdf"),
     path("accident-card/pdf/", views.accident_card_pdf_view, name="accident-card-pdf"),
     # path("generate-pdf/", views.generate_pdf_view, name="generate-pdf"),
-    # path("read-pdf/", views.read_document_from_pdf_view, name="read-pdf"),
 ]
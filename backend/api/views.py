@@ -2,31 +2,52 @@ from pathlib import Path
 from io import BytesIO
 import json
 
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from api.models import Document
+from api.jobs import TESSERACT_NOT_FOUND_MESSAGE, arun_zus_recommendation, enqueue_recommendation_job, job_to_dict
+from api.models import Document, RecommendationJob
+from api.pagination import InvalidCursor, cached_count, paginate_by_cursor
+from api.exports import EXPORT_FORMATS, export_documents
+from api.imports import import_documents
+from api.projections import WITNESSES, UnknownFields, full_fields, parse_fields, project, render_rows
+from api.renderers import FastJsonResponse
+from api.search import search_documents
 from api.serializers import DocumentSerializer
 from tools.accident_card_pdf import render_accident_card_pdf
-from tools.chatgpt import ChatGPTClient
-from tools.pdf_mapper import map_pdf_fields_to_document_data, map_document_to_pdf_fields
-from tools.pdf_reader import PDFReader
-from tools.pdf_writer import PDFWriter
-from tools.ocr import ocr_img, ocr_pdf
+from tools.chatgpt import TOKEN_USAGE, get_chat_client, request_chat_client
+from tools.llm_cache import get_llm_response_cache
+from tools.llm_resilience import LlmUnavailableError, get_llm_guard
+from tools.pdf_batch import PdfJob, iter_rendered_pdfs, stream_zip
+from tools.pdf_cache import RenderedPdfCache, get_rendered_pdf_cache
+from tools.pdf_import import FormSource, TooManyFiles, read_form
+from tools.pdf_mapper import map_document_to_pdf_fields, map_pdf_fields_to_document_data, map_pdf_fields_to_witness_data
+from tools.pdf_writer import TEMPLATE_CACHE, PDFWriter
+from tools.ocr import ocr_img, ocr_pdf, tesseract_probe_stats
 from tools.pdf_anonymizer import PDFAnonymizer
 from pytesseract import TesseractNotFoundError
 
 
-chat_client = ChatGPTClient()
 pdf_anonymizer = PDFAnonymizer()
+TEMPLATE_PATH = Path("tools/ewyp.pdf")
 
 @api_view(["GET"])
 def health(request):
-    return Response({"status": "ok"})
+    response_cache = get_llm_response_cache()
+    llm = {
+        **get_llm_guard().stats(),
+        # None when the response cache is disabled (LLM_CACHE_MAX_ENTRIES=0)
+        "responseCache": response_cache.stats() if response_cache else None,
+        "tokenUsage": TOKEN_USAGE.snapshot(),
+    }
+    return Response({"status": "ok", "llm": llm, "ocr": {"tesseractProbe": tesseract_probe_stats()}})
 
 
 # class DocumentViewSet(ListCreateAPIView):
@@ -77,38 +98,26 @@ def documents_view(request):
         filename = "filled-anon.pdf" if anonymized else "filled.pdf"
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
-    return HttpResponse("Invalid action", status=400, content_type="text/plain")
-
 
-def handle_document_list(request_data):
-    queryset = Document.objects.all().prefetch_related("witnesses")
+    if action == "generate-pdf-batch":
+        return handle_document_pdf_batch(request_data)
 
-    search_term = request_data.get("search") or request_data.get("q")
-    if search_term:
-        trimmed = str(search_term).strip()
-        if trimmed:
-            queryset = queryset.filter(
-                Q(imie__icontains=trimmed)
-                | Q(nazwisko__icontains=trimmed)
-                | Q(pesel__icontains=trimmed)
-                | Q(miejsce_wypadku__icontains=trimmed)
-            )
+    if action == "export":
+        return handle_document_export(request_data)
 
-    help_param = request_data.get("helpProvided") or request_data.get("help_provided")
-    if help_param is not None and str(help_param).strip() != "":
-        queryset = queryset.filter(czy_udzielona_pomoc=_parse_bool(help_param))
+    if action == "import":
+        return handle_document_import(request.FILES.getlist("files"))
+    return HttpResponse("Invalid action", status=400, content_type="text/plain")
 
-    machine_param = request_data.get("machineInvolved") or request_data.get("machine_involved")
-    if machine_param is not None and str(machine_param).strip() != "":
-        queryset = queryset.filter(czy_wypadek_podczas_uzywania_maszyny=_parse_bool(machine_param))
 
-    sort_param = request_data.get("sort") or request_data.get("orderBy")
-    direction_param = request_data.get("direction") or request_data.get("order")
-    order_by_fields = _resolve_ordering(sort_param, direction_param)
-    if order_by_fields:
-        queryset = queryset.order_by(*order_by_fields)
-    else:
-        queryset = queryset.order_by("-id")
+def handle_document_list(request_data):
+    queryset = _filter_documents(request_data)
+    try:
+        fields = parse_fields(request_data.get("fields"))
+    except UnknownFields as exc:
+        return HttpResponse(str(exc), status=400, content_type="text/plain")
+    fields = fields or full_fields()
+    queryset = project(queryset, fields)
 
     page_number = _parse_positive_int(request_data.get("page") or request_data.get("pageNumber"), default=1)
     page_size = _parse_positive_int(
@@ -120,6 +129,10 @@ def handle_document_list(request_data):
         maximum=100,
     )
 
+    cursor = request_data.get("cursor")
+    if cursor is not None or request_data.get("pagination") == "cursor":
+        return _document_list_by_cursor(request_data, queryset, cursor, page_size, fields)
+
     paginator = Paginator(queryset, page_size)
     try:
         page = paginator.page(page_number)
@@ -128,16 +141,137 @@ def handle_document_list(request_data):
     except EmptyPage:
         page = paginator.page(paginator.num_pages or 1)
 
-    serializer = DocumentSerializer(page.object_list, many=True)
     payload = {
-        "items": serializer.data,
+        "items": render_rows(page.object_list, fields),
         "totalCount": paginator.count,
         "totalPages": paginator.num_pages or 1,
         "page": page.number,
         "pageSize": page.paginator.per_page,
     }
 
-    return JsonResponse(payload)
+    return FastJsonResponse(payload)
+
+
+def _document_list_by_cursor(request_data, queryset, cursor, page_size, fields):
+    """Keyset-paginated list: `nextCursor` fetches the following page; `includeTotal` adds a cached count."""
+    try:
+        rows, next_cursor = paginate_by_cursor(queryset, cursor or None, page_size)
+    except InvalidCursor as exc:
+        return HttpResponse(str(exc), status=400, content_type="text/plain")
+
+    payload = {
+        "items": render_rows(rows, fields),
+        "nextCursor": next_cursor,
+        "pageSize": page_size,
+    }
+    if _parse_bool(request_data.get("includeTotal") or request_data.get("include_total") or False):
+        payload["totalCount"] = cached_count(queryset)
+    return FastJsonResponse(payload)
+
+
+def handle_document_pdf_batch(request_data):
+    """Render filled (and optionally anonymized) PDFs for many documents into one streamed ZIP."""
+    document_ids = _parse_id_list(request_data.get("ids") or request_data.get("documentIds"))
+    if document_ids:
+        queryset = Document.objects.filter(pk__in=document_ids).prefetch_related("witnesses").order_by("id")
+    else:
+        queryset = _filter_documents(request_data)
+
+    if not queryset.exists():
+        return HttpResponse("No documents found", status=404, content_type="text/plain")
+
+    include_anonymized = _parse_bool(
+        request_data.get("includeAnonymized") or request_data.get("include_anonymized") or False
+    )
+
+    def _jobs():
+        for document in queryset.iterator(chunk_size=100):
+            yield PdfJob(
+                basename=f"zgloszenie-{document.pk}",
+                field_data=map_document_to_pdf_fields(document),
+                include_anonymized=include_anonymized,
+            )
+
+    response = StreamingHttpResponse(stream_zip(iter_rendered_pdfs(_jobs())), content_type="application/zip")
+    response["Content-Disposition"] = "attachment; filename=zgloszenia.zip"
+    return response
+
+
+def handle_document_export(request_data):
+    """Stream every document matching the list filters and sort as CSV or XLSX (`format`, default csv)."""
+    export_format = str(request_data.get("format") or "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse("Unsupported export format", status=400, content_type="text/plain")
+
+    try:
+        fields = parse_fields(request_data.get("fields"))
+    except UnknownFields as exc:
+        return HttpResponse(str(exc), status=400, content_type="text/plain")
+    fields = [name for name in fields or full_fields() if name != WITNESSES]
+
+    return export_documents(_filter_documents(request_data), fields, export_format)
+
+
+def handle_document_import(uploads):
+    """Import filled forms uploaded as `files` (PDFs and/or ZIPs of PDFs); returns a per-file report."""
+    if not uploads:
+        return HttpResponse("No files uploaded", status=400, content_type="text/plain")
+    try:
+        report = import_documents(uploads)
+    except TooManyFiles as exc:
+        return HttpResponse(str(exc), status=400, content_type="text/plain")
+    return FastJsonResponse(report)
+
+
+def _filter_documents(request_data):
+    """Apply the dashboard search, filters and ordering shared by the list and batch actions."""
+    queryset = Document.objects.all().prefetch_related("witnesses")
+
+    ranked = False
+    search_term = request_data.get("search") or request_data.get("q")
+    if search_term:
+        trimmed = str(search_term).strip()
+        if trimmed.isdigit():
+            queryset = queryset.filter(_digits_search(trimmed))
+        elif trimmed:
+            queryset = search_documents(queryset, trimmed, ranked=True)
+            # Only the full-text path can rank; the icontains fallback keeps the default order
+            ranked = "search_rank" in queryset.query.annotations
+
+    help_param = request_data.get("helpProvided") or request_data.get("help_provided")
+    if help_param is not None and str(help_param).strip() != "":
+        # `__in` renders `= 1`; a bare boolean (`WHERE "czy_udzielona_pomoc"`) is not matched to an index by SQLite
+        queryset = queryset.filter(czy_udzielona_pomoc__in=[_parse_bool(help_param)])
+
+    machine_param = request_data.get("machineInvolved") or request_data.get("machine_involved")
+    if machine_param is not None and str(machine_param).strip() != "":
+        queryset = queryset.filter(czy_wypadek_podczas_uzywania_maszyny__in=[_parse_bool(machine_param)])
+
+    sort_param = request_data.get("sort") or request_data.get("orderBy")
+    direction_param = request_data.get("direction") or request_data.get("order")
+    order_by_fields = _resolve_ordering(sort_param, direction_param)
+    if order_by_fields:
+        queryset = queryset.order_by(*order_by_fields)
+    elif ranked:
+        # Searches without an explicit sort list the best matches first
+        queryset = queryset.order_by("search_rank", "-id")
+    else:
+        queryset = queryset.order_by("-id")
+
+    return queryset
+
+
+PESEL_LENGTH = 11
+
+
+def _digits_search(digits):
+    """Documents whose PESEL contains `digits`, or whose other columns match them (house numbers, postcodes).
+
+    A complete PESEL can only be the whole column, so it is looked up with `=` on
+    document_pesel_idx; shorter fragments may sit anywhere in the PESEL (`contains`).
+    """
+    pesel = Q(pesel=digits) if len(digits) == PESEL_LENGTH else Q(pesel__contains=digits)
+    return pesel | Q(pk__in=search_documents(Document.objects.all(), digits, ranked=False).values("pk"))
 
 
 def handle_document_detail(request_data):
@@ -145,16 +279,11 @@ def handle_document_detail(request_data):
     if document_id is None:
         return HttpResponse("Invalid document id", status=400, content_type="text/plain")
 
-    document = (
-        Document.objects.filter(pk=document_id)
-        .prefetch_related("witnesses")
-        .first()
-    )
-    if not document:
+    rows = render_rows(project(Document.objects.filter(pk=document_id), full_fields()), full_fields())
+    if not rows:
         return HttpResponse("Document not found", status=404, content_type="text/plain")
 
-    serializer = DocumentSerializer(document)
-    return JsonResponse(serializer.data, safe=False)
+    return FastJsonResponse(rows[0])
 
 
 def _parse_positive_int(value, default=None, minimum=1, maximum=None):
@@ -173,6 +302,22 @@ def _parse_positive_int(value, default=None, minimum=1, maximum=None):
     return parsed
 
 
+def _parse_id_list(value):
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+
+    ids = []
+    for item in value:
+        parsed = _parse_positive_int(item)
+        if parsed is not None:
+            ids.append(parsed)
+    return ids
+
+
 def _parse_bool(value):
     if isinstance(value, bool):
         return value
@@ -186,23 +331,55 @@ def _parse_bool(value):
 
 @api_view(["GET"])
 def document_anonymized_view(request, pk: int):
-    try:
-        document = Document.objects.get(pk=pk)
-    except Document.DoesNotExist:
+    document = Document.objects.filter(pk=pk).prefetch_related("witnesses").first()
+    if not document:
         return HttpResponse("Document not found", status=404, content_type="text/plain")
 
-    pdf_io = _render_document_pdf(document, anonymized=True)
+    field_data = map_document_to_pdf_fields(document)
+    cache_key = _rendered_pdf_key(field_data, anonymized=True)
+    etag = quote_etag(cache_key)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    pdf_io = _render_document_pdf(document, anonymized=True, field_data=field_data, cache_key=cache_key)
     response = HttpResponse(pdf_io.getvalue(), content_type="application/pdf")
     response["Content-Disposition"] = f"attachment; filename=zgloszenie-{pk}-anon.pdf"
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
     return response
 
 
-def _render_document_pdf(document: Document, *, anonymized: bool = False) -> BytesIO:
-    template_path = Path("tools/ewyp.pdf")
+def _rendered_pdf_key(field_data, *, anonymized: bool) -> str:
+    template_sha256 = TEMPLATE_CACHE.get(TEMPLATE_PATH).sha256
+    return RenderedPdfCache.make_key(field_data, template_sha256, anonymized)
+
+
+def _render_document_pdf(document: Document, *, anonymized: bool = False, field_data=None, cache_key=None) -> BytesIO:
+    """Render a stored document, reusing the rendered-PDF cache when a ``cache_key`` is supplied."""
+    if field_data is None:
+        field_data = map_document_to_pdf_fields(document)
+
+    pdf_cache = get_rendered_pdf_cache()
+    if cache_key:
+        cached = pdf_cache.get(document.pk, cache_key)
+        if cached is not None:
+            return cached
+
     writer = PDFWriter()
-    pdf_io = writer.fill_template(template_path, map_document_to_pdf_fields(document))
-    if anonymized:
-        return pdf_anonymizer.redact(pdf_io)
+    # Anonymized renders skip sensitive values and cover their widgets in the same single pass
+    redacted_fields = pdf_anonymizer.redacted_fields if anonymized else None
+    pdf_io = writer.fill_template(
+        TEMPLATE_PATH,
+        field_data,
+        redacted_fields=redacted_fields,
+        redaction_padding=pdf_anonymizer.padding,
+    )
+
+    if cache_key:
+        pdf_cache.set(document.pk, cache_key, pdf_io.getvalue())
     return pdf_io
 
 
@@ -224,17 +401,28 @@ def _resolve_ordering(sort_param, direction_param):
     if direction not in {"asc", "desc"}:
         direction = "asc" if field_name != "id" else "desc"
 
+    # id breaks ties so pages are stable and every sort matches an (<field>, id) index
     if direction == "desc":
-        return [f"-{field_name}"]
-    return [field_name]
+        return [f"-{field_name}", "-id"] if field_name != "id" else ["-id"]
+    return [field_name, "id"] if field_name != "id" else ["id"]
 
 
+@csrf_exempt
 def read_document_from_pdf_view(request):
-    pdf = request.FILES["pdf"]
-    reader = PDFReader()
-    document = map_pdf_fields_to_document_data(reader.read_input_fields(pdf))
-    serializer = DocumentSerializer(document)
-    return JsonResponse(serializer.data, safe=False)
+    """Document data read from one filled form (`pdf`), without saving it."""
+    if request.method != "POST":
+        return HttpResponse("Only POST allowed", status=405, content_type="text/plain")
+    pdf = request.FILES.get("pdf")
+    if pdf is None:
+        return HttpResponse("No PDF uploaded", status=400, content_type="text/plain")
+
+    form = read_form(FormSource(pdf.name, pdf.read()))
+    if form.error:
+        return HttpResponse(form.error, status=400, content_type="text/plain")
+    document = map_pdf_fields_to_document_data(form.fields)
+    witness = map_pdf_fields_to_witness_data(form.witness_fields)
+    document["witnesses"] = [witness] if witness else []
+    return FastJsonResponse(document)
 
 
 @csrf_exempt
@@ -361,25 +549,25 @@ def accident_card_pdf_view(request):
 
 
 @csrf_exempt
-def zus_recommendation_view(request):
+async def zus_recommendation_view(request):
     pdf_file = request.FILES.get("pdf")
     if not pdf_file:
         return HttpResponse("No PDF uploaded. Use field 'pdf' with a PDF file.",
                             status=400, content_type="text/plain")
     try:
-        text = ocr_pdf(pdf_file)
-        data = chat_client.find_desc_from_pdf(text)
-        recommendation = chat_client.worker_recommendation(data)
-        return JsonResponse(data=recommendation, safe=False)
+        async with _chat_client(request) as client:
+            outcome = await arun_zus_recommendation(pdf_file, client)
+        response = JsonResponse(data=outcome["recommendation"], safe=False)
+        response["X-Extraction-Methods"] = ",".join(outcome["extractionMethods"])
+        response["X-LLM-Mode"] = outcome["llmMode"]
+        if outcome["ocrTokens"]:
+            response["X-OCR-Tokens-Saved"] = str(outcome["ocrTokens"]["saved"])
+        return response
 
     except TesseractNotFoundError:
-        msg = (
-            "Tesseract OCR binary not found.\n"
-            "Install Tesseract and ensure it's on PATH, or set env var TESSERACT_CMD to the binary path.\n"
-            "Examples: Ubuntu/Debian: sudo apt-get install tesseract-ocr tesseract-ocr-pol; "
-            "macOS: brew install tesseract; Windows: install from https://github.com/UB-Mannheim/tesseract/wiki"
-        )
-        return HttpResponse(msg, status=500, content_type="text/plain")
+        return HttpResponse(TESSERACT_NOT_FOUND_MESSAGE, status=500, content_type="text/plain")
+    except LlmUnavailableError as e:
+        return _llm_unavailable_response(e)
     except ValueError as e:
         return HttpResponse(str(e), status=500, content_type="text/plain")
     except Exception as e:
@@ -387,7 +575,30 @@ def zus_recommendation_view(request):
 
 
 @csrf_exempt
-def user_recommendation_view(request):
+def zus_recommendation_jobs_view(request):
+    """Queue the OCR + LLM pipeline for an uploaded PDF and return the job id immediately."""
+    if request.method != "POST":
+        return HttpResponse("Only POST allowed", status=405, content_type="text/plain")
+
+    pdf_file = request.FILES.get("pdf")
+    if not pdf_file:
+        return HttpResponse("No PDF uploaded. Use field 'pdf' with a PDF file.",
+                            status=400, content_type="text/plain")
+
+    job = enqueue_recommendation_job(pdf_file)
+    return JsonResponse(job_to_dict(job), status=202)
+
+
+@api_view(["GET"])
+def zus_recommendation_job_detail_view(request, pk: int):
+    job = RecommendationJob.objects.filter(pk=pk).defer("pdf_data").first()
+    if not job:
+        return HttpResponse("Job not found", status=404, content_type="text/plain")
+    return JsonResponse(job_to_dict(job))
+
+
+@csrf_exempt
+async def user_recommendation_view(request):
     if request.method != "POST":
         return HttpResponse("Only POST allowed", status=405, content_type="text/plain")
 
@@ -405,11 +616,22 @@ def user_recommendation_view(request):
     if data is None or field_name is None:
         return HttpResponse("Missing required fields: 'data' and 'field_name' must be provided.", status=400, content_type="text/plain")
 
-    return JsonResponse(chat_client.user_recommendation(data, field_name), safe=False)
+    # Re-focusing a field without edits repeats the exact prompt; `Cache-Control: no-cache` forces a fresh answer
+    use_cache = "no-cache" not in request.headers.get("Cache-Control", "")
+    if _wants_event_stream(request):
+        return _event_stream_response(request, lambda client: client.stream_chat(
+            client.user_recommendation_messages(data, field_name), use_cache=use_cache, endpoint="user_recommendation"
+        ))
+    try:
+        async with _chat_client(request) as client:
+            recommendation = await client.user_recommendation(data, field_name, use_cache=use_cache)
+    except LlmUnavailableError as e:
+        return _llm_unavailable_response(e)
+    return JsonResponse(recommendation, safe=False)
 
 
 @csrf_exempt
-def suggested_response_view(request):
+async def suggested_response_view(request):
     if request.method != "POST":
         return HttpResponse("Only POST allowed", status=405, content_type="text/plain")
 
@@ -432,7 +654,7 @@ def suggested_response_view(request):
     if isinstance(extra_context, (dict, list)):
         extra_context = json.dumps(extra_context, ensure_ascii=False)
 
-    message = chat_client.suggested_response(
+    context = dict(
         section_label=section_label,
         status_label=status_label,
         summary=summary,
@@ -440,5 +662,79 @@ def suggested_response_view(request):
         previous_recommendation=previous_recommendation,
         extra_context=extra_context,
     )
+    if _wants_event_stream(request):
+        return _event_stream_response(request, lambda client: client.stream_chat(
+            client.suggested_response_messages(**context), endpoint="suggested_response"
+        ))
 
+    try:
+        async with _chat_client(request) as client:
+            message = await client.suggested_response(**context)
+    except LlmUnavailableError as e:
+        return _llm_unavailable_response(e)
     return JsonResponse({"message": message.strip()}, status=200)
+
+
+def _llm_unavailable_response(error: LlmUnavailableError) -> HttpResponse:
+    """503 for calls the LLM guard rejected (breaker open, too many in flight, deadline spent)."""
+    response = HttpResponse(str(error), status=503, content_type="text/plain")
+    if error.retry_after:
+        response["Retry-After"] = str(max(1, round(error.retry_after)))
+    return response
+
+
+def _chat_client(request):
+    """LLM client for `request`: the loop's pooled client under ASGI, a per-request one (closed afterwards) under WSGI."""
+    return request_chat_client(shared=isinstance(request, ASGIRequest))
+
+
+def _wants_event_stream(request) -> bool:
+    return "text/event-stream" in request.headers.get("Accept", "") or _parse_bool(request.GET.get("stream"))
+
+
+def _sse_delta(delta: str) -> str:
+    return f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+
+
+def _sse_error(error: Exception) -> str:
+    return f"event: error\ndata: {json.dumps({'error': str(error)}, ensure_ascii=False)}\n\n"
+
+
+_SSE_DONE = "event: done\ndata: {}\n\n"
+
+
+def _event_stream_response(request, stream) -> StreamingHttpResponse:
+    """Forward the LLM text deltas of `stream(client)` as server-sent events.
+
+    Each token arrives as `data: {"delta": "..."}`; the stream ends with `event: done`,
+    or with `event: error` carrying `{"error": "..."}` when the upstream call fails.
+
+    Under ASGI the body is an async generator on the request's `AsyncChatGPTClient`.
+    A WSGI server (`runserver`, Gunicorn) would drain an async body completely before
+    sending a byte, so there the body is a plain generator on the sync `ChatGPTClient`.
+    """
+    if isinstance(request, ASGIRequest):
+        async def _events():
+            try:
+                async with _chat_client(request) as client:
+                    async for delta in stream(client):
+                        yield _sse_delta(delta)
+            except Exception as e:
+                yield _sse_error(e)
+                return
+            yield _SSE_DONE
+    else:
+        def _events():
+            try:
+                for delta in stream(get_chat_client()):
+                    yield _sse_delta(delta)
+            except Exception as e:
+                yield _sse_error(e)
+                return
+            yield _SSE_DONE
+
+    response = StreamingHttpResponse(_events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop reverse proxies (nginx) from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -4,3 +4,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_asgi_application()
+
+# Only server processes resume and run background jobs
+from api.jobs import start_job_runner  # noqa: E402
+
+start_job_runner()
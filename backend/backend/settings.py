@@ -89,12 +89,63 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST framework basic config (can be extended later)
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "api.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
     ],
 }
 
+# Rendered PDF cache (tools/pdf_cache.py); set PDF_CACHE_MAX_BYTES=0 to disable
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", BASE_DIR / "pdf_cache"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# OCR: probe Tesseract once at startup instead of on the first upload
+OCR_WARMUP = os.getenv("OCR_WARMUP", "0") == "1"
+OCR_WARMUP_LANG = os.getenv("OCR_WARMUP_LANG", "pol")
+
+# OCR result cache (tools/ocr_cache.py); set OCR_CACHE_MAX_BYTES=0 to disable
+OCR_CACHE_PATH = Path(os.getenv("OCR_CACHE_PATH", BASE_DIR / "ocr_cache.sqlite3"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# LLM response cache (tools/llm_cache.py); set LLM_CACHE_MAX_ENTRIES=0 to disable
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+
+# LLM call resilience (tools/llm_resilience.py). LLM_DEADLINE bounds queueing + retries per call;
+# LLM_ENDPOINT_CONCURRENCY overrides the per-endpoint cap, e.g. "user_recommendation=8,zus_assessment=4"
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+LLM_ENDPOINT_CONCURRENCY = os.getenv("LLM_ENDPOINT_CONCURRENCY", "")
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# ZUS recommendation: read and assess OCR text in one structured LLM call (two-call path stays as fallback)
+ZUS_SINGLE_CALL = os.getenv("ZUS_SINGLE_CALL", "1") == "1"
+
+# OCR text sent to the LLM: printed ewyp.pdf text and noise are dropped, then capped at this many tokens (0 = no cap)
+LLM_OCR_TOKEN_BUDGET = int(os.getenv("LLM_OCR_TOKEN_BUDGET", "4000"))
+
+# Documents list in cursor mode: seconds a `totalCount` is reused across page turns
+DOCUMENT_COUNT_CACHE_TTL = int(os.getenv("DOCUMENT_COUNT_CACHE_TTL", "60"))
+
+# Documents export (action=export): rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Bulk PDF import (action=import): forms per request (PDFs or inside ZIPs) and size cap per form.
+# Django rejects multipart requests with more than DATA_UPLOAD_MAX_NUMBER_FILES files (default 100)
+PDF_IMPORT_MAX_FILES = int(os.getenv("PDF_IMPORT_MAX_FILES", "5000"))
+PDF_IMPORT_MAX_FILE_BYTES = int(os.getenv("PDF_IMPORT_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+DATA_UPLOAD_MAX_NUMBER_FILES = PDF_IMPORT_MAX_FILES
+
+# Background recommendation jobs (api/jobs.py): threads per process; 0 = only `manage.py run_jobs`
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A running job whose worker stops renewing its lease for this long is picked up again, up to JOB_MAX_ATTEMPTS claims
+# Server processes (backend.wsgi / backend.asgi, runserver) resume leftover jobs at startup; commands and scripts never do
+JOB_RUNNER_AUTOSTART = os.getenv("JOB_RUNNER_AUTOSTART", "1") != "0"
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
 # CORS settings: allow all origins per request
 CORS_ALLOW_ALL_ORIGINS = True
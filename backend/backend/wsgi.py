@@ -4,3 +4,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Only server processes resume and run background jobs; runserver loads this module too
+from api.jobs import start_job_runner  # noqa: E402
+
+start_job_runner()
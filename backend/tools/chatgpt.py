@@ -1,20 +1,449 @@
-from typing import List, Dict, Optional
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
 from dotenv import load_dotenv as loadenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from api.serializers import DocumentContextSerializer
+from tools.llm_cache import ResponseCache, get_llm_response_cache
+from tools.llm_resilience import LlmError, LlmGuard, LlmUnavailableError, get_llm_guard
+from tools.zus_assessment import ZUS_ASSESSMENT_RESPONSE_FORMAT, parse_zus_assessment
 
 loadenv()
 
+logger = logging.getLogger(__name__)
 
-class ChatGPTClient:
-    def __init__(self, api_key: Optional[str] = None):
-        self.client = OpenAI()
+DEFAULT_MODEL = "gpt-5.1"
+# Part of every response-cache key; bump when a prompt's meaning changes without its text changing
+PROMPT_VERSION = "2"
+
+_DEFAULT_CACHE = object()
+
+# Static instructions go into the system message, byte-identical on every call, so the
+# provider can serve them from its prompt (prefix) cache. Only the user message varies.
+
+FIND_DESC_SYSTEM_PROMPT = """\
+Masz podany tekst ze strony formularza PDF. Tekst został odczytany poprzez ocr, zawiera nazwy rubryk, a następnie odpowiedzi na pytania.
+Jeśli nie jesteś w stanie znaleźć jakiegoś tekstu, ponieważ jest na przykład nieczytelny, zwróć pustą odpowiedź. 
+Zwróć następujące dane w formacie json:
+```json
+{
+    "czy_poszkodowany_jest_osobą_zgłaszającą": true/false,
+    "data_wypadku": "Wartość z pola Data wypadku",
+    "godzina_wypadku": "Wartość z pola Godzina wypadku",
+    "miejsce_wypadku": "Wartość z pola Miejsce wypadku",
+    "planowana_godzina_rozpoczecia_pracy": "Wartość z pola Planowana godzina rozpoczęcia pracy w dniu wypadku",
+    "planowana_godzina_zakonczenia_pracy": "Wartość z pola Planowana godzina zakończenia pracy w dniu wypadku",
+    "rodzaj_urazow": "Wartość z pola Rodzaj doznanych urazów",
+    "szczegoly_okolicznosci": "Wartość z pola Szczegółowy opis okoliczności, miejsca i przyczyn wypadku",
+    "czy_udzielona_została_pomoc": "Wartość z pola Czy była udzielona pierwszej pomoc medyczna",
+    "miejsce_udzielenia_pomocy": "Wartość z pola Czy była udzielona pierwszej pomoc medyczna",
+    "organ_postępowania": "Wartość z pola Organ, który prowadził psotępowanie w sprawie wypadku",
+    "czy_wypadku_podczas_uzywania_maszyny": "Wartość bool z pola Czy wypadek powstał podczas obsługi maszyn, urządzeń",
+    "opis_maszyny": "Wartość z pola Czy wypadek powstał podczas obsługi maszyn, urządzeń",
+    "czy_maszyna_posiada_atest": "Wartość bool z pola Czy maszyna posiada atest",
+    "czy_maszyna_w_ewidencji": "Wartość bool z pola Czy maszyna, urządzenie zostało wpisane do ewidencji środków trwałych",
+    "liczba_świadków": "Liczba świadków w sprawie (z wypełnionymi danymi)",
+    "lista_załączników": []
+}
+```
+"""
+
+FIND_DESC_USER_TEMPLATE = "Oto tekst ze strony:\n{text}"
+
+USER_RECOMMENDATION_SYSTEM_PROMPT = """\
+Twoją rolą jest weryfikacja i doprecyzowanie odpowiedzi użytkownika w pytaniach otwartych. Chodzi o zgłoszenie wypadku przy pracy osoby prowadzącej pozarolniczą działalność gospodarczą.
+
+Nie wolno Ci sugerować treści odpowiedzi. Nie twórz faktów za użytkownika.
+
+Twoim celem jest zadawanie pytań pogłębiających. Oceń kompletność dotychczasowego opisu. Twoim zadaniem jest uzyskanie jak największej informacji na temat "Informacji o Wypadku".
+
+Na podstawie tego, co użytkownik napisze, musisz stworzyć opis odpowiadający na dane pole w formularzu.
+
+### Zakres merytoryczny (Co masz ustalać)
+
+Na podstawie odpowiedzi użytkownika staraj się ustalić, czy opis zawiera:
+
+* **Okoliczności i przebieg zdarzenia:**
+    * Jakie czynności związane z działalnością wykonywał Pan/Pani do momentu wypadku?
+    * Jak wyglądała sekwencja zdarzeń krok po kroku?
+    * Gdzie dokładnie doszło do wypadku?
+    * Jakie były warunki otoczenia (np. śliska podłoga, przeszkody, narzędzia, maszyny)?
+
+* **Przyczyna zewnętrzna i nagłość zdarzenia:**
+    * Czy zdarzenie miało charakter jednorazowy i nagły? (Pamiętaj, nagłość zdarzenia jest kluczowa!)
+    * Co konkretnie spowodowało uraz (np. poślizgnięcie, uderzenie, zadziałanie maszyny)?
+
+* **Uraz i konsekwencje zdrowotne:**
+    * Jaki konkretny uraz powstał (np. złamanie, skręcenie, stłuczenie, rana)?
+    * Czy udzielono pierwszej pomocy? Czy była hospitalizacja lub zwolnienie lekarskie?
+
+* **Związek z prowadzoną działalnością:**
+    * Jaka dokładnie czynność zawodowa była wykonywana?
+    * Dlaczego ta czynność była związana z działalnością gospodarczą (np. realizacja usługi, montaż, naprawa)?
+
+* **Czas, świadkowie, BHP, urządzenia:**
+    * Jaka była data i godzina wypadku? Jaki był planowany czas pracy tego dnia?
+    * Czy byli świadkowie? Jeśli tak, podaj imię i nazwisko.
+    * Czy używał Pan/Pani środków ochrony indywidualnej (np. rękawice, kask, obuwie)?
+    * Jaki był rodzaj urządzeń/maszyn? Czy były sprawne? Czy używał ich Pan/Pani zgodnie z instrukcją?
+
+### Styl zadawania pytań (Jak masz pytać)
+
+Zawsze odwołuj się do tego, co użytkownik już napisał. Pytaj o brakujące szczegóły.
+
+**Zadawaj pytania typu:**
+
+* "Co dokładnie robił Pan/Pani tuż przed wypadkiem?"
+* "Jak krok po kroku wyglądało to zdarzenie?"
+* "Gdzie dokładnie to się wydarzyło?"
+* "Jakie obrażenia powstały w wyniku tego zdarzenia?"
+
+**Nie sugeruj odpowiedzi.** Unikaj pytań typu: "Czy na pewno poślizgnął się Pan/Pani na mokrej podłodze?".
+
+Możesz korzystać z metody drzewa przyczyn, aby pomóc w sformułowaniu odpowiedzi na pytanie.
+
+### Prostota i komunikacja
+
+Generuj wszystko w **prostym języku**.
+
+* Używaj zrozumiałych, codziennych słów.
+* Pisz krótkimi zdaniami – jedna myśl to jedno zdanie.
+* Zachowaj naturalny szyk: podmiot + orzeczenie + dopełnienie.
+* Unikaj imiesłowów i trudnych rzeczowników odczasownikowych.
+* Pisz aktywnie i zwracaj się bezpośrednio do odbiorcy.
+* Unikaj trudnych i specjalistycznych słów (jeśli używasz – wyjaśnij).
+* Porządkuj tekst: nagłówki, akapity, wypunktowania.
+* Ograniczaj zbędne szczegóły.
+* Unikaj strony biernej, form bezosobowych i czasu przeszłego.
+
+**Twoja rola to:** doprecyzować opis i wskazać braki, **nie oceniać prawnie zdarzenia.**
+
+Będziesz pomagał użytkownikowi przy wypełnieniu następujących pól:
+* rodzaj_urazow (opis jakich urazów doznał pracownik)
+* szczegoly_okolicznosci (szczegółowy opis okoliczności, miejsca i przyczyn wypadku)
+* opis_maszyny (opis maszyny, jeśli wypadek powstał przy obsłudze maszyny)
+* review_summary (podsumowanie zgłoszenia, które wskazuje brakujące informacje przed finalnym wygenerowaniem formularza)
+
+Jeśli pole to "review_summary", przygotuj 2-3 zdania prostego podsumowania. Najpierw pochwal kompletne elementy, a następnie jasno wypunktuj, których informacji brakuje (np. świadków, miejsca udzielenia pomocy, czasu zdarzenia). Wskaż, co użytkownik powinien sprawdzić przed złożeniem dokumentów. Użyj bezpośrednich sformułowań typu: "Sprawdź, czy dopisałeś...".
+
+Zwróć informację w postaci json:
+
+```json
+{
+    "wartosc_pola": "Nowa wartość aktualnie edytowanego przez użytkownika pola (jeśli jest gotowe)",
+    "wiadomosc": "Wiadomość do użytkownika, która pomoże mu wypełnić pole (jeśli dane nie są pełne lub wymagają doprecyzowania)"
+}
+```
+"""
+
+USER_RECOMMENDATION_USER_TEMPLATE = (
+    "Aktualne dane znajdujące się w formularzu:\n{data}\n\n"
+    "Użytkownik aktualnie edytuje pole:\n{field_name}\n"
+    "{history_section}"
+)
+
+WORKER_RECOMMENDATION_SYSTEM_PROMPT = """\
+Jesteś pracownikiem Zakładu Ubezpieczeń Społecznych (ZUS). Twoją rolą jest krytyczna ocena jakości i kompletności wstępnego wniosku „Zawiadomienie o wypadku”.
+
+Nie rozstrzygasz prawnie sprawy. Twoim głównym celem jest **ocena jakości wniosku** poprzez wskazanie braków i elementów wymagających doprecyzowania.
+
+### Zasady Pracy
+
+* Sprawdzasz, czy informacje są **konkretne i pełne**.
+* Wskazujesz nieścisłości i miejsca, które wymagają doprecyzowania.
+* Jeśli informacja wygląda na prywatną, **pytasz o związek z prowadzoną działalnością gospodarczą**.
+* Pytania pogłębiające muszą **zawsze odnosić się do treści podanej przez użytkownika**.
+* **Nie proponujesz i nie sugerujesz własnej wersji zdarzeń.**
+* Masz obowiązek wskazać, jeśli któregokolwiek elementu brakuje. Masz zapytać użytkownika o brakujące informacje, ale bez sugerowania odpowiedzi.
+
+### Zakres Merytoryczny (Weryfikacja Przesłanek Definicji Wypadku)
+
+Weryfikujesz, czy opis spełnia cztery podstawowe przesłanki definicji wypadku przy pracy:
+
+a) **Nagłość zdarzenia:** Zdarzenie musi być **jednorazowe, natychmiastowe**, bez długotrwałych dolegliwości poprzedzających uraz.
+b) **Przyczyna zewnętrzna:** Uraz musi wynikać z działania **czynnika spoza organizmu** (np. maszyna, poślizgnięcie, uderzenie, śliska powierzchnia).
+c) **Uraz:** Musi wystąpić **konkretne uszkodzenie ciała lub narządu** (np. złamanie, rana, stłuczenie). Brak urazu oznacza brak spełnienia definicji.
+d) **Związek z pracą:** Zdarzenie musi mieć związek z **wykonywaniem zwykłych czynności** związanych z prowadzoną działalnością gospodarczą.
+
+* **Wątpliwości merytoryczne:** Jeśli masz wątpliwości odnośnie któregokolwiek z tych elementów, wskaż, że należy pozyskać **dokumentację** od poszkodowanego (w ramach postępowania wyjaśniającego).
+* **Wątpliwości dotyczące urazu:** Jeśli masz wątpliwości, czy doznany uraz spełnia kryteria definicyjne, wskaż na konieczność pozyskania **opinii Głównego Lekarza Orzecznika ZUS**.
+
+### Zakres Kompletności Danych (Co musi być we wniosku)
+
+Sprawdzasz, czy w opisie zawarto następujące dane:
+
+1.  Dokładna data i godzina wypadku.
+2.  Miejsce zdarzenia.
+3.  Opis czynności wykonywanych tuż przed zdarzeniem.
+4.  Przebieg zdarzenia krok po kroku.
+5.  Opis przyczyny zewnętrznej i powstałego urazu.
+6.  Informacja o udzieleniu pierwszej pomocy lub leczeniu.
+7.  Dane świadków (jeśli byli).
+8.  Dane dotyczące używanych maszyn/narzędzi oraz przestrzegania BHP.
+9.  Dokumenty potwierdzające związek czynności z działalnością gospodarczą.
+
+### Styl Komunikacji
+
+Używaj **prostego języka** i **krótkich zdań** (jedna myśl = jedno zdanie). Stosuj **formę bezpośrednią** (np. „Proszę podać…”). Unikaj specjalistycznego słownictwa lub je wyjaśniaj. Pisz aktywnie i porządkuj treść w logicznych punktach. Unikaj strony biernej i zawiłych konstrukcji.
+
+### Misja
+
+Pomagam uzupełnić i poprawić wniosek tak, aby był kompletny, jasny i zgodny z wymaganiami ZUS oraz umożliwiał dalszą obsługę sprawy.
+
+### Format Odpowiedzi
+
+Zawsze zwracaj odpowiedź w formacie **JSON** zgodnie z poniższą strukturą.
+
+#### Zasady Scoringu Kompletności
+
+| Wartość | Opis |
+| :--- | :--- |
+| **0** | Brak informacji |
+| **1** | Częściowa informacja (wymaga doprecyzowania) |
+| **2** | Informacja kompletna i klarowna |
+
+**Wynik Całościowy (Suma punktów):** 0–18 (9 elementów x 2 punkty)
+
+* **0–6:** Niski poziom kompletności
+* **7–12:** Średni poziom kompletności
+* **13–18:** Wysoki poziom kompletności
+
+#### Wymagany Format JSON
+
+```json
+{
+"ocena_przeslanek": {
+    "naglosc": {"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."},
+    "przyczyna_zewnetrzna": {"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."},
+    "uraz": {"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."},
+    "zwiazek_z_praca": {"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."}
+},
+"kompletnosc_wniosku": {
+    "wynik_calkowity": 0,
+    "poziom_kompletnosci": "niski/sredni/wysoki",
+    "braki": [
+        "Wypunktuj wszystkie brakujące informacje (elementy z zakresu kompletności danych, które mają wynik 0)."
+    ],
+    "elementy_do_weryfikacji": [
+        "Wypunktuj elementy, które mają wynik 1 lub wymagają dodatkowych dokumentów (zgodnie z sekcją Wątpliwości merytoryczne)."
+    ]
+},
+"rekomendacje_poprawy": [
+    "Wskaż, jaką dokumentację należy pozyskać lub jaką opinię należy wystąpić (np. Opinia Głównego Lekarza Orzecznika ZUS). Zgodnie z zasadami z sekcji 'Wątpliwości merytoryczne'."
+],
+"pytania_poglebiajace": [
+    "Zadaj 1 do 3 konkretnych pytań. Pytania te muszą odnosić się do treści użytkownika i dążyć do uzupełnienia braków lub doprecyzowania elementu."
+]
+}
+```
+"""
+
+WORKER_RECOMMENDATION_USER_TEMPLATE = "Dane znajdujące się w formularzu:\n{data}"
+# Pages uploaded along with a filled form (scanned statements, medical records), when there are any
+WORKER_RECOMMENDATION_ATTACHMENTS_TEMPLATE = "\n\nTekst pozostałych stron dokumentu (załączniki, odczytany przez OCR):\n{text}"
+
+# Single structured call: read the form from OCR text and assess it (see tools/zus_assessment.py)
+ZUS_ASSESSMENT_SYSTEM_PROMPT = WORKER_RECOMMENDATION_SYSTEM_PROMPT + """
+### Dane wejściowe
+
+Zamiast danych z formularza otrzymujesz tekst zgłoszenia odczytany przez OCR. Tekst zawiera nazwy rubryk, a następnie odpowiedzi na pytania.
+Najpierw odczytaj z niego dane formularza i zwróć je w polu `dane_formularza`. Jeśli jakiegoś tekstu nie da się odczytać, wpisz null.
+Następnie oceń te dane zgodnie z powyższymi zasadami. Zwróć jeden obiekt JSON zgodny z podanym schematem: `dane_formularza` oraz pola oceny opisane wyżej.
+"""
+
+SUGGESTED_RESPONSE_SYSTEM_PROMPT = "\n".join([
+    "Jesteś pracownikiem Zakładu Ubezpieczeń Społecznych (ZUS).",
+    "Musisz napisać krótką, uprzejmą odpowiedź do osoby, która zgłosiła wypadek przy pracy.",
+    "Jeśli prosisz o dodatkowe informacje, wskaż konkretnie czego potrzebujesz.",
+    "Używaj języka polskiego, tonu profesjonalnego i wspierającego.",
+    "W wiadomości: (1) podziękuj za przesłane informacje, (2) odnieś się do ocenianej przesłanki,",
+    "(3) poproś o brakujące dane lub poinformuj o kolejnym kroku, (4) zakończ uprzejmą formułą z kontaktem.",
+    "Zwróć jedną wiadomość gotową do wysłania, w maksymalnie 5-6 zdaniach.",
+])
+
+
+def _messages(system: str, user: str) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+# Usage of the pipeline run (see `TokenUsage.track_run`) the current call belongs to
+_RUN_USAGE: ContextVar[Optional[dict]] = ContextVar("llm_run_usage", default=None)
+
+_RUN_COUNTERS = ("calls", "promptTokens", "cachedTokens", "completionTokens", "llmSeconds")
+
+
+class TokenUsage:
+    """Process-wide token counters, split by whether the provider served part of the prompt from cache.
+
+    Pipeline runs made of several calls (the ZUS recommendation) are also totalled
+    per mode with `track_run` / `record_run`, so the modes can be compared.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._latency = {True: [0, 0.0], False: [0, 0.0]}
+        self._modes: Dict[str, dict] = {}
+
+    def record(self, usage, duration: float) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        run = _RUN_USAGE.get()
+        if run is not None:
+            run["calls"] += 1
+            run["promptTokens"] += usage.prompt_tokens or 0
+            run["cachedTokens"] += cached
+            run["completionTokens"] += usage.completion_tokens or 0
+            run["llmSeconds"] += duration
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.cached_tokens += cached
+            self.completion_tokens += usage.completion_tokens or 0
+            bucket = self._latency[cached > 0]
+            bucket[0] += 1
+            bucket[1] += duration
+        logger.debug("LLM call: %s prompt tokens (%s cached), %s completion tokens, %.0f ms",
+                     usage.prompt_tokens, cached, usage.completion_tokens, duration * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            def _avg_ms(bucket):
+                return round(bucket[1] / bucket[0] * 1000, 1) if bucket[0] else None
+
+            return {
+                "requests": self.requests,
+                "promptTokens": self.prompt_tokens,
+                "cachedTokens": self.cached_tokens,
+                "completionTokens": self.completion_tokens,
+                "cachedRatio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+                "avgLatencyMsCached": _avg_ms(self._latency[True]),
+                "avgLatencyMsUncached": _avg_ms(self._latency[False]),
+                "modes": {
+                    mode: {
+                        "runs": totals["runs"],
+                        "avgLatencyMs": round(totals["seconds"] / totals["runs"] * 1000, 1),
+                        "avgLlmLatencyMs": round(totals["llmSeconds"] / totals["runs"] * 1000, 1),
+                        "avgCalls": round(totals["calls"] / totals["runs"], 2),
+                        "avgPromptTokens": round(totals["promptTokens"] / totals["runs"], 1),
+                        "avgCachedTokens": round(totals["cachedTokens"] / totals["runs"], 1),
+                        "avgCompletionTokens": round(totals["completionTokens"] / totals["runs"], 1),
+                    }
+                    for mode, totals in self._modes.items()
+                },
+            }
+
+    @contextmanager
+    def track_run(self) -> Iterator[dict]:
+        """Collect the usage of every call made inside the block (in this context) into the yielded dict."""
+        run = dict.fromkeys(_RUN_COUNTERS, 0)
+        token = _RUN_USAGE.set(run)
+        try:
+            yield run
+        finally:
+            _RUN_USAGE.reset(token)
+
+    def record_run(self, mode: str, duration: float, run: dict) -> None:
+        """Add one finished run (collected by `track_run`) that took `duration` seconds to the totals of `mode`."""
+        with self._lock:
+            totals = self._modes.setdefault(mode, {"runs": 0, "seconds": 0.0, **dict.fromkeys(_RUN_COUNTERS, 0)})
+            totals["runs"] += 1
+            totals["seconds"] += duration
+            for key in _RUN_COUNTERS:
+                totals[key] += run[key]
+
+
+TOKEN_USAGE = TokenUsage()
+
+
+class ChatPrompts:
+    """Message builders and response-cache plumbing shared by the sync and async clients."""
+
+    cache: Optional[ResponseCache] = None
+
+    def _init_cache(self, cache) -> None:
+        self.cache = get_llm_response_cache() if cache is _DEFAULT_CACHE else cache
+
+    def _cache_key(self, messages: List[Dict[str, str]], model: str = DEFAULT_MODEL,
+                   response_format: Optional[dict] = None) -> str:
+        return ResponseCache.make_key(
+            model,
+            PROMPT_VERSION,
+            json.dumps(messages, ensure_ascii=False),
+            json.dumps(response_format, sort_keys=True) if response_format else "",
+        )
+
+    def find_desc_messages(self, text: str) -> List[Dict[str, str]]:
+        return _messages(FIND_DESC_SYSTEM_PROMPT, FIND_DESC_USER_TEMPLATE.format(text=text))
+
+    def user_recommendation_messages(self, data, field_name: str, history: Optional[str] = None) -> List[Dict[str, str]]:
+        history_section = ""
+        if history:
+            history_section = f"\nDotychczasowe odpowiedzi użytkownika:{history}\n"
+        user = USER_RECOMMENDATION_USER_TEMPLATE.format(
+            data=DocumentContextSerializer(data).data,
+            field_name=field_name,
+            history_section=history_section,
+        )
+        return _messages(USER_RECOMMENDATION_SYSTEM_PROMPT, user)
+
+    def worker_recommendation_messages(self, data, attachments: Optional[str] = None) -> List[Dict[str, str]]:
+        user = WORKER_RECOMMENDATION_USER_TEMPLATE.format(data=data)
+        if attachments:
+            user += WORKER_RECOMMENDATION_ATTACHMENTS_TEMPLATE.format(text=attachments)
+        return _messages(WORKER_RECOMMENDATION_SYSTEM_PROMPT, user)
+
+    def zus_assessment_messages(self, text: str) -> List[Dict[str, str]]:
+        return _messages(ZUS_ASSESSMENT_SYSTEM_PROMPT, FIND_DESC_USER_TEMPLATE.format(text=text))
+
+    def suggested_response_messages(self, *, section_label: str, status_label: str, summary: str,
+                                    incident_description: Optional[str] = None,
+                                    previous_recommendation: Optional[str] = None,
+                                    extra_context: Optional[str] = None) -> List[Dict[str, str]]:
+        prompt_lines = ["Dane kontekstowe:"]
+
+        prompt_lines.append(f"- Nazwa przesłanki: {section_label or 'brak danych'}")
+        prompt_lines.append(f"- Status oceny: {status_label or 'brak danych'}")
+        prompt_lines.append(f"- Podsumowanie oceny: {summary or 'brak danych'}")
+        if incident_description:
+            prompt_lines.append(f"- Opis zdarzenia: {incident_description}")
+        if previous_recommendation:
+            prompt_lines.append(f"- Poprzednia rekomendacja: {previous_recommendation}")
+        if extra_context:
+            prompt_lines.append(f"- Dodatkowe informacje: {extra_context}")
+
+        return _messages(SUGGESTED_RESPONSE_SYSTEM_PROMPT, "\n".join(prompt_lines))
+
+
+class ChatGPTClient(ChatPrompts):
+    def __init__(self, api_key: Optional[str] = None, cache=_DEFAULT_CACHE, guard: Optional[LlmGuard] = None):
+        # Retries, deadlines and concurrency caps are handled by the guard, not the SDK
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        self.guard = guard or get_llm_guard()
+        self._init_cache(cache)
 
     def chat_completion(
             self,
             messages: List[Dict[str, str]],
-            model: str = "gpt-5.1"
+            model: str = DEFAULT_MODEL,
+            response_format: Optional[dict] = None,
+            endpoint: str = "chat",
     ) -> str:
         """
         Send a chat completion request to OpenAI API.
@@ -22,18 +451,33 @@ class ChatGPTClient:
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             model: OpenAI model to use
+            response_format: Optional structured-output spec (e.g. a strict JSON schema)
+            endpoint: Name of the concurrency bucket in the LLM guard
 
         Returns:
             Generated response text
+
+        Raises:
+            LlmUnavailableError: rejected by the guard (circuit open, no free slot, deadline spent)
+            LlmError: the provider call failed after retries
         """
-        try:
-            response = self.client.chat.completions.create(
+        def _create(timeout):
+            return self.client.chat.completions.create(
                 model=model,
                 messages=messages,
+                timeout=timeout,
+                **({"response_format": response_format} if response_format else {}),
             )
+
+        try:
+            started = time.perf_counter()
+            response = self.guard.call(endpoint, _create)
+            TOKEN_USAGE.record(response.usage, time.perf_counter() - started)
             return response.choices[0].message.content
+        except LlmError:
+            raise
         except Exception as e:
-            raise Exception(f"Error in chat completion: {str(e)}")
+            raise LlmError(f"Error in chat completion: {str(e)}") from e
 
     def simple_chat(self, prompt: str) -> str:
         """
@@ -48,267 +492,268 @@ class ChatGPTClient:
         messages = [{"role": "user", "content": prompt}]
         return self.chat_completion(messages)
 
-    def find_desc_from_pdf(self, text: str):
-        prompt = f"""
-        Masz podany tekst ze strony formularza PDF. Tekst został odczytany poprzez ocr, zawiera nazwy rubryk, a następnie odpowiedzi na pytania.
-        Jeśli nie jesteś w stanie znaleźć jakiegoś tekstu, ponieważ jest na przykład nieczytelny, zwróć pustą odpowiedź. 
-        Zwróć następujące dane w formacie json:
-        ```json
-        {{
-            "czy_poszkodowany_jest_osobą_zgłaszającą": true/false,
-            "data_wypadku": "Wartość z pola Data wypadku",
-            "godzina_wypadku": "Wartość z pola Godzina wypadku",
-            "miejsce_wypadku": "Wartość z pola Miejsce wypadku",
-            "planowana_godzina_rozpoczecia_pracy": "Wartość z pola Planowana godzina rozpoczęcia pracy w dniu wypadku",
-            "planowana_godzina_zakonczenia_pracy": "Wartość z pola Planowana godzina zakończenia pracy w dniu wypadku",
-            "rodzaj_urazow": "Wartość z pola Rodzaj doznanych urazów",
-            "szczegoly_okolicznosci": "Wartość z pola Szczegółowy opis okoliczności, miejsca i przyczyn wypadku",
-            "czy_udzielona_została_pomoc": "Wartość z pola Czy była udzielona pierwszej pomoc medyczna",
-            "miejsce_udzielenia_pomocy": "Wartość z pola Czy była udzielona pierwszej pomoc medyczna",
-            "organ_postępowania": "Wartość z pola Organ, który prowadził psotępowanie w sprawie wypadku",
-            "czy_wypadku_podczas_uzywania_maszyny": "Wartość bool z pola Czy wypadek powstał podczas obsługi maszyn, urządzeń",
-            "opis_maszyny": "Wartość z pola Czy wypadek powstał podczas obsługi maszyn, urządzeń",
-            "czy_maszyna_posiada_atest": "Wartość bool z pola Czy maszyna posiada atest",
-            "czy_maszyna_w_ewidencji": "Wartość bool z pola Czy maszyna, urządzenie zostało wpisane do ewidencji środków trwałych",
-            "liczba_świadków": "Liczba świadków w sprawie (z wypełnionymi danymi)",
-            "lista_załączników": []
-        }}
-        ```
-        
-        
-        Oto tekst ze strony:
-        {text}
+    def chat_completion_stream(
+            self,
+            messages: List[Dict[str, str]],
+            model: str = DEFAULT_MODEL,
+            endpoint: str = "chat",
+    ) -> Iterator[str]:
         """
-        return self.simple_chat(prompt)
+        Like `chat_completion`, but yield text deltas as the model produces them.
 
-    def user_recommendation(self, data, field_name: str, history: Optional[str] = None):
-        history_section = ""
-        if history:
-            history_section = f"\nDotychczasowe odpowiedzi użytkownika:{history}\n"
-        prompt = f"""
-        Twoją rolą jest weryfikacja i doprecyzowanie odpowiedzi użytkownika w pytaniach otwartych. Chodzi o zgłoszenie wypadku przy pracy osoby prowadzącej pozarolniczą działalność gospodarczą.
-
-        Nie wolno Ci sugerować treści odpowiedzi. Nie twórz faktów za użytkownika.
-
-        Twoim celem jest zadawanie pytań pogłębiających. Oceń kompletność dotychczasowego opisu. Twoim zadaniem jest uzyskanie jak największej informacji na temat "Informacji o Wypadku".
-
-        Na podstawie tego, co użytkownik napisze, musisz stworzyć opis odpowiadający na dane pole w formularzu.
-
-        ### Zakres merytoryczny (Co masz ustalać)
-
-        Na podstawie odpowiedzi użytkownika staraj się ustalić, czy opis zawiera:
-
-        * **Okoliczności i przebieg zdarzenia:**
-            * Jakie czynności związane z działalnością wykonywał Pan/Pani do momentu wypadku?
-            * Jak wyglądała sekwencja zdarzeń krok po kroku?
-            * Gdzie dokładnie doszło do wypadku?
-            * Jakie były warunki otoczenia (np. śliska podłoga, przeszkody, narzędzia, maszyny)?
-
-        * **Przyczyna zewnętrzna i nagłość zdarzenia:**
-            * Czy zdarzenie miało charakter jednorazowy i nagły? (Pamiętaj, nagłość zdarzenia jest kluczowa!)
-            * Co konkretnie spowodowało uraz (np. poślizgnięcie, uderzenie, zadziałanie maszyny)?
-
-        * **Uraz i konsekwencje zdrowotne:**
-            * Jaki konkretny uraz powstał (np. złamanie, skręcenie, stłuczenie, rana)?
-            * Czy udzielono pierwszej pomocy? Czy była hospitalizacja lub zwolnienie lekarskie?
-
-        * **Związek z prowadzoną działalnością:**
-            * Jaka dokładnie czynność zawodowa była wykonywana?
-            * Dlaczego ta czynność była związana z działalnością gospodarczą (np. realizacja usługi, montaż, naprawa)?
-
-        * **Czas, świadkowie, BHP, urządzenia:**
-            * Jaka była data i godzina wypadku? Jaki był planowany czas pracy tego dnia?
-            * Czy byli świadkowie? Jeśli tak, podaj imię i nazwisko.
-            * Czy używał Pan/Pani środków ochrony indywidualnej (np. rękawice, kask, obuwie)?
-            * Jaki był rodzaj urządzeń/maszyn? Czy były sprawne? Czy używał ich Pan/Pani zgodnie z instrukcją?
-
-        ### Styl zadawania pytań (Jak masz pytać)
-
-        Zawsze odwołuj się do tego, co użytkownik już napisał. Pytaj o brakujące szczegóły.
-
-        **Zadawaj pytania typu:**
-
-        * "Co dokładnie robił Pan/Pani tuż przed wypadkiem?"
-        * "Jak krok po kroku wyglądało to zdarzenie?"
-        * "Gdzie dokładnie to się wydarzyło?"
-        * "Jakie obrażenia powstały w wyniku tego zdarzenia?"
-
-        **Nie sugeruj odpowiedzi.** Unikaj pytań typu: "Czy na pewno poślizgnął się Pan/Pani na mokrej podłodze?".
-
-        Możesz korzystać z metody drzewa przyczyn, aby pomóc w sformułowaniu odpowiedzi na pytanie.
-
-        ### Prostota i komunikacja
-
-        Generuj wszystko w **prostym języku**.
-
-        * Używaj zrozumiałych, codziennych słów.
-        * Pisz krótkimi zdaniami – jedna myśl to jedno zdanie.
-        * Zachowaj naturalny szyk: podmiot + orzeczenie + dopełnienie.
-        * Unikaj imiesłowów i trudnych rzeczowników odczasownikowych.
-        * Pisz aktywnie i zwracaj się bezpośrednio do odbiorcy.
-        * Unikaj trudnych i specjalistycznych słów (jeśli używasz – wyjaśnij).
-        * Porządkuj tekst: nagłówki, akapity, wypunktowania.
-        * Ograniczaj zbędne szczegóły.
-        * Unikaj strony biernej, form bezosobowych i czasu przeszłego.
-
-        **Twoja rola to:** doprecyzować opis i wskazać braki, **nie oceniać prawnie zdarzenia.**
-        
-        Będziesz pomagał użytkownikowi przy wypełnieniu następujących pól:
-        * rodzaj_urazow (opis jakich urazów doznał pracownik)
-        * szczegoly_okolicznosci (szczegółowy opis okoliczności, miejsca i przyczyn wypadku)
-        * opis_maszyny (opis maszyny, jeśli wypadek powstał przy obsłudze maszyny)
-        * review_summary (podsumowanie zgłoszenia, które wskazuje brakujące informacje przed finalnym wygenerowaniem formularza)
-
-        Jeśli pole to "review_summary", przygotuj 2-3 zdania prostego podsumowania. Najpierw pochwal kompletne elementy, a następnie jasno wypunktuj, których informacji brakuje (np. świadków, miejsca udzielenia pomocy, czasu zdarzenia). Wskaż, co użytkownik powinien sprawdzić przed złożeniem dokumentów. Użyj bezpośrednich sformułowań typu: "Sprawdź, czy dopisałeś...".
-        
-        Aktualne dane znajdujące się w formularzu:
-        {DocumentContextSerializer(data).data}
-        
-        Użytkownik aktualnie edytuje pole: 
-        {field_name}
-
-        {history_section}
-        
-        
-        Zwróć informację w postaci json:
-        
-        ```json
-        {{
-            "wartosc_pola": "Nowa wartość aktualnie edytowanego przez użytkownika pola (jeśli jest gotowe)",
-            "wiadomosc": "Wiadomość do użytkownika, która pomoże mu wypełnić pole (jeśli dane nie są pełne lub wymagają doprecyzowania)"
-        }}
-        ```
+        Only opening the stream is retried; the concurrency slot is held until it ends.
         """
 
-        return self.simple_chat(prompt)
-
-    def worker_recommendation(self, data):
-        prompt = f"""
-        Jesteś pracownikiem Zakładu Ubezpieczeń Społecznych (ZUS). Twoją rolą jest krytyczna ocena jakości i kompletności wstępnego wniosku „Zawiadomienie o wypadku”.
-
-        Nie rozstrzygasz prawnie sprawy. Twoim głównym celem jest **ocena jakości wniosku** poprzez wskazanie braków i elementów wymagających doprecyzowania.
-
-        ### Zasady Pracy
-
-        * Sprawdzasz, czy informacje są **konkretne i pełne**.
-        * Wskazujesz nieścisłości i miejsca, które wymagają doprecyzowania.
-        * Jeśli informacja wygląda na prywatną, **pytasz o związek z prowadzoną działalnością gospodarczą**.
-        * Pytania pogłębiające muszą **zawsze odnosić się do treści podanej przez użytkownika**.
-        * **Nie proponujesz i nie sugerujesz własnej wersji zdarzeń.**
-        * Masz obowiązek wskazać, jeśli któregokolwiek elementu brakuje. Masz zapytać użytkownika o brakujące informacje, ale bez sugerowania odpowiedzi.
-
-        ### Zakres Merytoryczny (Weryfikacja Przesłanek Definicji Wypadku)
-
-        Weryfikujesz, czy opis spełnia cztery podstawowe przesłanki definicji wypadku przy pracy:
-
-        a) **Nagłość zdarzenia:** Zdarzenie musi być **jednorazowe, natychmiastowe**, bez długotrwałych dolegliwości poprzedzających uraz.
-        b) **Przyczyna zewnętrzna:** Uraz musi wynikać z działania **czynnika spoza organizmu** (np. maszyna, poślizgnięcie, uderzenie, śliska powierzchnia).
-        c) **Uraz:** Musi wystąpić **konkretne uszkodzenie ciała lub narządu** (np. złamanie, rana, stłuczenie). Brak urazu oznacza brak spełnienia definicji.
-        d) **Związek z pracą:** Zdarzenie musi mieć związek z **wykonywaniem zwykłych czynności** związanych z prowadzoną działalnością gospodarczą.
-
-        * **Wątpliwości merytoryczne:** Jeśli masz wątpliwości odnośnie któregokolwiek z tych elementów, wskaż, że należy pozyskać **dokumentację** od poszkodowanego (w ramach postępowania wyjaśniającego).
-        * **Wątpliwości dotyczące urazu:** Jeśli masz wątpliwości, czy doznany uraz spełnia kryteria definicyjne, wskaż na konieczność pozyskania **opinii Głównego Lekarza Orzecznika ZUS**.
-
-        ### Zakres Kompletności Danych (Co musi być we wniosku)
-
-        Sprawdzasz, czy w opisie zawarto następujące dane:
-
-        1.  Dokładna data i godzina wypadku.
-        2.  Miejsce zdarzenia.
-        3.  Opis czynności wykonywanych tuż przed zdarzeniem.
-        4.  Przebieg zdarzenia krok po kroku.
-        5.  Opis przyczyny zewnętrznej i powstałego urazu.
-        6.  Informacja o udzieleniu pierwszej pomocy lub leczeniu.
-        7.  Dane świadków (jeśli byli).
-        8.  Dane dotyczące używanych maszyn/narzędzi oraz przestrzegania BHP.
-        9.  Dokumenty potwierdzające związek czynności z działalnością gospodarczą.
-
-        ### Styl Komunikacji
-
-        Używaj **prostego języka** i **krótkich zdań** (jedna myśl = jedno zdanie). Stosuj **formę bezpośrednią** (np. „Proszę podać…”). Unikaj specjalistycznego słownictwa lub je wyjaśniaj. Pisz aktywnie i porządkuj treść w logicznych punktach. Unikaj strony biernej i zawiłych konstrukcji.
-
-        ### Misja
-
-        Pomagam uzupełnić i poprawić wniosek tak, aby był kompletny, jasny i zgodny z wymaganiami ZUS oraz umożliwiał dalszą obsługę sprawy.
-
-        ### Format Odpowiedzi
-
-        Zawsze zwracaj odpowiedź w formacie **JSON** zgodnie z poniższą strukturą.
-
-        #### Zasady Scoringu Kompletności
-
-        | Wartość | Opis |
-        | :--- | :--- |
-        | **0** | Brak informacji |
-        | **1** | Częściowa informacja (wymaga doprecyzowania) |
-        | **2** | Informacja kompletna i klarowna |
-
-        **Wynik Całościowy (Suma punktów):** 0–18 (9 elementów x 2 punkty)
-
-        * **0–6:** Niski poziom kompletności
-        * **7–12:** Średni poziom kompletności
-        * **13–18:** Wysoki poziom kompletności
-
-        #### Wymagany Format JSON
-
-        ```json
-        {{
-        "ocena_przeslanek": {{
-            "naglosc": {{"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."}},
-            "przyczyna_zewnetrzna": {{"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."}},
-            "uraz": {{"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."}},
-            "zwiazek_z_praca": {{"status": "true/false", "uzasadnienie": "Krótki opis, czy przesłanka jest spełniona na podstawie danych, czy wymaga weryfikacji/doprecyzowania."}}
-        }},
-        "kompletnosc_wniosku": {{
-            "wynik_calkowity": 0,
-            "poziom_kompletnosci": "niski/sredni/wysoki",
-            "braki": [
-                "Wypunktuj wszystkie brakujące informacje (elementy z zakresu kompletności danych, które mają wynik 0)."
-            ],
-            "elementy_do_weryfikacji": [
-                "Wypunktuj elementy, które mają wynik 1 lub wymagają dodatkowych dokumentów (zgodnie z sekcją Wątpliwości merytoryczne)."
-            ]
-        }},
-        "rekomendacje_poprawy": [
-            "Wskaż, jaką dokumentację należy pozyskać lub jaką opinię należy wystąpić (np. Opinia Głównego Lekarza Orzecznika ZUS). Zgodnie z zasadami z sekcji 'Wątpliwości merytoryczne'."
-        ],
-        "pytania_poglebiajace": [
-            "Zadaj 1 do 3 konkretnych pytań. Pytania te muszą odnosić się do treści użytkownika i dążyć do uzupełnienia braków lub doprecyzowania elementu."
-        ]
-        }}
-        ```
-        
-        Dane znajdujące się w formularzu:
-        {data}
+        def _create(timeout):
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+            )
+
+        try:
+            started = time.perf_counter()
+            with self.guard.session(endpoint) as deadline_at:
+                stream = self.guard.retrying(endpoint, _create, deadline_at)
+                for chunk in stream:
+                    if chunk.usage:
+                        TOKEN_USAGE.record(chunk.usage, time.perf_counter() - started)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except LlmError:
+            raise
+        except Exception as e:
+            raise LlmError(f"Error in chat completion: {str(e)}") from e
+
+    def cached_chat(self, messages: List[Dict[str, str]], use_cache: bool = True,
+                    response_format: Optional[dict] = None, validate: Optional[Callable[[str], object]] = None,
+                    endpoint: str = "chat") -> str:
+        """`chat_completion` answered from the response cache when the same messages were seen recently.
+
+        `validate` runs on fresh responses before they are cached and should raise on bad output.
         """
+        key = self._cache_key(messages, response_format=response_format)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        response = self.chat_completion(messages, response_format=response_format, endpoint=endpoint)
+        if validate:
+            validate(response)
+        if use_cache and self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    def stream_chat(self, messages: List[Dict[str, str]], use_cache: bool = False, endpoint: str = "chat") -> Iterator[str]:
+        if not use_cache or self.cache is None:
+            yield from self.chat_completion_stream(messages, endpoint=endpoint)
+            return
+        key = self._cache_key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        deltas = []
+        for delta in self.chat_completion_stream(messages, endpoint=endpoint):
+            deltas.append(delta)
+            yield delta
+        self.cache.set(key, "".join(deltas))
+
+    def find_desc_from_pdf(self, text: str, use_cache: bool = True):
+        return self.cached_chat(self.find_desc_messages(text), use_cache, endpoint="find_desc")
+
+    def user_recommendation(self, data, field_name: str, history: Optional[str] = None, use_cache: bool = True):
+        return self.cached_chat(self.user_recommendation_messages(data, field_name, history), use_cache, endpoint="user_recommendation")
+
+    def worker_recommendation(self, data, attachments: Optional[str] = None, use_cache: bool = True):
+        messages = self.worker_recommendation_messages(data, attachments)
+        return self.cached_chat(messages, use_cache, endpoint="worker_recommendation")
+
+    def zus_assessment(self, text: str, use_cache: bool = True) -> dict:
+        """`find_desc_from_pdf` + `worker_recommendation` in one structured call; raises ValueError on invalid output."""
+        response = self.cached_chat(
+            self.zus_assessment_messages(text),
+            use_cache,
+            response_format=ZUS_ASSESSMENT_RESPONSE_FORMAT,
+            validate=parse_zus_assessment,
+            endpoint="zus_assessment",
+        )
+        return parse_zus_assessment(response)
+
+    def suggested_response(self, **context) -> str:
+        return self.chat_completion(self.suggested_response_messages(**context), endpoint="suggested_response")
+
+
+class AsyncChatGPTClient(ChatPrompts):
+    """
+    Coroutine twin of `ChatGPTClient` for async views.
+
+    `AsyncOpenAI` keeps a pooled keep-alive HTTP connection per instance, so share
+    one instance per event loop (see `request_chat_client`) instead of creating
+    it per request. Like the sync client it honours OPENAI_BASE_URL, which is how
+    it is pointed at a local fake server (`manage.py bench_llm`).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, cache=_DEFAULT_CACHE, guard: Optional[LlmGuard] = None):
+        # Retries, deadlines and concurrency caps are handled by the guard, not the SDK
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.guard = guard or get_llm_guard()
+        self._init_cache(cache)
+
+    async def chat_completion(
+            self,
+            messages: List[Dict[str, str]],
+            model: str = DEFAULT_MODEL,
+            response_format: Optional[dict] = None,
+            endpoint: str = "chat",
+    ) -> str:
+        def _create(timeout):
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout,
+                **({"response_format": response_format} if response_format else {}),
+            )
 
-        return self.simple_chat(prompt)
-
-    def suggested_response(self, *, section_label: str, status_label: str, summary: str,
-                            incident_description: Optional[str] = None,
-                            previous_recommendation: Optional[str] = None,
-                            extra_context: Optional[str] = None) -> str:
-        prompt_lines = [
-            "Jesteś pracownikiem Zakładu Ubezpieczeń Społecznych (ZUS).",
-            "Musisz napisać krótką, uprzejmą odpowiedź do osoby, która zgłosiła wypadek przy pracy.",
-            "Jeśli prosisz o dodatkowe informacje, wskaż konkretnie czego potrzebujesz.",
-            "Używaj języka polskiego, tonu profesjonalnego i wspierającego.",
-            "W wiadomości: (1) podziękuj za przesłane informacje, (2) odnieś się do ocenianej przesłanki,",
-            "(3) poproś o brakujące dane lub poinformuj o kolejnym kroku, (4) zakończ uprzejmą formułą z kontaktem.",
-            "Dane kontekstowe:"
-        ]
+        try:
+            started = time.perf_counter()
+            response = await self.guard.acall(endpoint, _create)
+            TOKEN_USAGE.record(response.usage, time.perf_counter() - started)
+            return response.choices[0].message.content
+        except LlmError:
+            raise
+        except Exception as e:
+            raise LlmError(f"Error in chat completion: {str(e)}") from e
 
-        prompt_lines.append(f"- Nazwa przesłanki: {section_label or 'brak danych'}")
-        prompt_lines.append(f"- Status oceny: {status_label or 'brak danych'}")
-        prompt_lines.append(f"- Podsumowanie oceny: {summary or 'brak danych'}")
-        if incident_description:
-            prompt_lines.append(f"- Opis zdarzenia: {incident_description}")
-        if previous_recommendation:
-            prompt_lines.append(f"- Poprzednia rekomendacja: {previous_recommendation}")
-        if extra_context:
-            prompt_lines.append(f"- Dodatkowe informacje: {extra_context}")
+    async def simple_chat(self, prompt: str) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        return await self.chat_completion(messages)
+
+    async def chat_completion_stream(
+            self,
+            messages: List[Dict[str, str]],
+            model: str = DEFAULT_MODEL,
+            endpoint: str = "chat",
+    ) -> AsyncIterator[str]:
 
-        prompt_lines.append("Zwróć jedną wiadomość gotową do wysłania, w maksymalnie 5-6 zdaniach.")
+        def _create(timeout):
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+            )
 
-        prompt = "\n".join(prompt_lines)
-        return self.simple_chat(prompt)
+        try:
+            started = time.perf_counter()
+            async with self.guard.asession(endpoint) as deadline_at:
+                stream = await self.guard.aretrying(endpoint, _create, deadline_at)
+                async for chunk in stream:
+                    if chunk.usage:
+                        TOKEN_USAGE.record(chunk.usage, time.perf_counter() - started)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except LlmError:
+            raise
+        except Exception as e:
+            raise LlmError(f"Error in chat completion: {str(e)}") from e
+
+    async def cached_chat(self, messages: List[Dict[str, str]], use_cache: bool = True,
+                          response_format: Optional[dict] = None,
+                          validate: Optional[Callable[[str], object]] = None,
+                          endpoint: str = "chat") -> str:
+        key = self._cache_key(messages, response_format=response_format)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        response = await self.chat_completion(messages, response_format=response_format, endpoint=endpoint)
+        if validate:
+            validate(response)
+        if use_cache and self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    async def stream_chat(self, messages: List[Dict[str, str]], use_cache: bool = False, endpoint: str = "chat") -> AsyncIterator[str]:
+        if not use_cache or self.cache is None:
+            async for delta in self.chat_completion_stream(messages, endpoint=endpoint):
+                yield delta
+            return
+        key = self._cache_key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        deltas = []
+        async for delta in self.chat_completion_stream(messages, endpoint=endpoint):
+            deltas.append(delta)
+            yield delta
+        self.cache.set(key, "".join(deltas))
+
+    async def find_desc_from_pdf(self, text: str, use_cache: bool = True):
+        return await self.cached_chat(self.find_desc_messages(text), use_cache, endpoint="find_desc")
+
+    async def user_recommendation(self, data, field_name: str, history: Optional[str] = None, use_cache: bool = True):
+        return await self.cached_chat(self.user_recommendation_messages(data, field_name, history), use_cache, endpoint="user_recommendation")
+
+    async def worker_recommendation(self, data, attachments: Optional[str] = None, use_cache: bool = True):
+        messages = self.worker_recommendation_messages(data, attachments)
+        return await self.cached_chat(messages, use_cache, endpoint="worker_recommendation")
+
+    async def zus_assessment(self, text: str, use_cache: bool = True) -> dict:
+        response = await self.cached_chat(
+            self.zus_assessment_messages(text),
+            use_cache,
+            response_format=ZUS_ASSESSMENT_RESPONSE_FORMAT,
+            validate=parse_zus_assessment,
+            endpoint="zus_assessment",
+        )
+        return parse_zus_assessment(response)
+
+    async def suggested_response(self, **context) -> str:
+        return await self.chat_completion(self.suggested_response_messages(**context), endpoint="suggested_response")
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+@lru_cache(maxsize=None)
+def get_chat_client() -> ChatGPTClient:
+    """Process-wide `ChatGPTClient` (the sync `OpenAI` client is thread-safe and pools its connections)."""
+    return ChatGPTClient()
+
+
+# The pooled connection is bound to the event loop that opened it. Under ASGI there is
+# one loop per process; under WSGI Django runs each async view in a fresh loop.
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncChatGPTClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_chat_client() -> AsyncChatGPTClient:
+    """Return the `AsyncChatGPTClient` shared by every request on the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        client = _ASYNC_CLIENTS[loop] = AsyncChatGPTClient()
+    return client
+
+
+@asynccontextmanager
+async def request_chat_client(shared: bool) -> AsyncIterator[AsyncChatGPTClient]:
+    """`AsyncChatGPTClient` for one request.
+
+    `shared=True` (ASGI: the loop lives as long as the process) yields the loop's
+    pooled client from `get_async_chat_client`. Under WSGI and `runserver` the loop
+    is thrown away after the request, so a pooled client would never be reused nor
+    closed; `shared=False` yields a client of its own and closes it on exit.
+    """
+    if shared:
+        yield get_async_chat_client()
+        return
+    client = AsyncChatGPTClient()
+    try:
+        yield client
+    finally:
+        await client.close()
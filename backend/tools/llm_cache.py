@@ -0,0 +1,75 @@
+"""
+In-memory cache of LLM completions.
+
+Keys are a SHA-256 of the model, the prompt template version and the rendered
+prompt (which already embeds the normalized `DocumentContextSerializer` output,
+field name and history), so re-sending an unchanged form costs no tokens.
+Entries expire after `ttl` seconds and the least recently used entry is dropped
+once `max_entries` is reached.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        if self.max_entries == 0 or value is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+@lru_cache(maxsize=None)
+def get_llm_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured from LLM_CACHE_MAX_ENTRIES / LLM_CACHE_TTL (0 entries disables)."""
+    from django.conf import settings
+
+    max_entries = getattr(settings, "LLM_CACHE_MAX_ENTRIES", 0)
+    if not max_entries:
+        return None
+    return ResponseCache(max_entries, getattr(settings, "LLM_CACHE_TTL", 3600))
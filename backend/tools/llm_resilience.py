@@ -0,0 +1,370 @@
+"""
+Resilience layer for outbound LLM calls.
+
+`LlmGuard` wraps every chat completion with:
+- a per-endpoint concurrency cap (`user_recommendation`, `zus_assessment`, ...), so a
+  slow provider cannot tie up every Django worker; callers wait for a slot only
+  until their deadline;
+- a deadline covering queueing, all attempts and backoff sleeps;
+- retries with full-jitter exponential backoff on 429/5xx, timeouts and connection
+  errors (honouring `Retry-After`);
+- a circuit breaker shared by all endpoints: after `breaker_threshold` consecutive
+  transient failures calls fail fast for `breaker_cooldown` seconds, then a single
+  probe decides whether to close it again.
+
+Everything is counted; `stats()` is exposed on `/api/health/`.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+
+class LlmError(Exception):
+    """An LLM call failed (after retries)."""
+
+
+class LlmUnavailableError(LlmError):
+    """The call was rejected without reaching the provider (breaker open, no free slot, deadline spent)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def allow(self) -> Optional[float]:
+        """None when the call may proceed, otherwise seconds until the breaker may close."""
+        return self.admit()[0]
+
+    def admit(self) -> tuple[Optional[float], bool]:
+        """Like `allow`, plus whether the admitted call is the half-open probe (the caller must settle it)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return None, False
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining, False
+            # Cooldown over: let exactly one probe through
+            if self._probing:
+                return self.cooldown, False
+            self.state = self.HALF_OPEN
+            self._probing = True
+            return None, True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self) -> None:
+        """A probe ended without a verdict (a non-transient error, or it was cancelled); allow another."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+
+class _Endpoint:
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.counters = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "timeouts": 0, "rejected": 0, "cancelled": 0}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.condition:
+            self.counters[name] += amount
+
+
+class LlmGuard:
+    ASYNC_SLOT_POLL = 0.02
+
+    def __init__(
+        self,
+        deadline: float = 60.0,
+        max_retries: int = 2,
+        concurrency: int = 16,
+        endpoint_concurrency: Optional[Dict[str, int]] = None,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.deadline = deadline
+        self.max_retries = max(0, max_retries)
+        self.concurrency = concurrency
+        self.endpoint_concurrency = dict(endpoint_concurrency or {})
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, name: str) -> _Endpoint:
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = self._endpoints[name] = _Endpoint(self.endpoint_concurrency.get(name, self.concurrency))
+            return endpoint
+
+    # --- concurrency slots -------------------------------------------------
+
+    def _try_acquire(self, endpoint: _Endpoint) -> bool:
+        with endpoint.condition:
+            if endpoint.in_flight >= endpoint.limit:
+                return False
+            endpoint.in_flight += 1
+            return True
+
+    def _release(self, endpoint: _Endpoint) -> None:
+        with endpoint.condition:
+            endpoint.in_flight -= 1
+            endpoint.condition.notify()
+
+    def _busy(self, name: str, endpoint: _Endpoint) -> LlmUnavailableError:
+        endpoint.count("rejected")
+        return LlmUnavailableError(f"Too many concurrent LLM calls for '{name}'", retry_after=1.0)
+
+    @contextmanager
+    def limit(self, name: str, deadline_at: float):
+        endpoint = self._endpoint(name)
+        with endpoint.condition:
+            while endpoint.in_flight >= endpoint.limit:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise self._busy(name, endpoint)
+                endpoint.condition.wait(remaining)
+            endpoint.in_flight += 1
+        try:
+            yield
+        finally:
+            self._release(endpoint)
+
+    @asynccontextmanager
+    async def alimit(self, name: str, deadline_at: float):
+        endpoint = self._endpoint(name)
+        # Slots are shared with sync callers and across event loops, so poll instead of awaiting a loop-bound primitive
+        while not self._try_acquire(endpoint):
+            if time.monotonic() >= deadline_at:
+                raise self._busy(name, endpoint)
+            await asyncio.sleep(self.ASYNC_SLOT_POLL)
+        try:
+            yield
+        finally:
+            self._release(endpoint)
+
+    # --- retries + breaker ------------------------------------------------
+
+    def _check_breaker(self, endpoint: _Endpoint) -> bool:
+        """Raise when the breaker rejects the call; True when the call is the half-open probe."""
+        wait, probe = self.breaker.admit()
+        if wait is not None:
+            endpoint.count("rejected")
+            raise LlmUnavailableError("LLM provider circuit is open; failing fast", retry_after=wait)
+        return probe
+
+    def _next_delay(self, exc: BaseException, attempt: int, deadline_at: float) -> Optional[float]:
+        """Backoff before the next attempt, or None when no retry should happen."""
+        if not is_transient(exc) or attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        hinted = _retry_after(exc)
+        if hinted is not None:
+            delay = max(delay, min(hinted, self.backoff_max))
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        return delay
+
+    def _record_failure(self, endpoint: _Endpoint, exc: BaseException, probe: bool) -> None:
+        if isinstance(exc, openai.APITimeoutError):
+            endpoint.count("timeouts")
+        if is_transient(exc):
+            self.breaker.record_failure()
+        elif probe:
+            self.breaker.release_probe()
+
+    def _remaining(self, deadline_at: float) -> float:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise LlmUnavailableError("LLM call deadline exceeded")
+        return remaining
+
+    def retrying(self, name: str, func: Callable[[float], T], deadline_at: float) -> T:
+        """Run `func(timeout_seconds)` with breaker checks and retries until it succeeds or gives up."""
+        endpoint = self._endpoint(name)
+        attempt = 0
+        while True:
+            probe = self._check_breaker(endpoint)
+            try:
+                result = func(self._remaining(deadline_at))
+            except Exception as exc:
+                self._record_failure(endpoint, exc, probe)
+                delay = self._next_delay(exc, attempt, deadline_at)
+                if delay is None:
+                    raise
+                endpoint.count("retries")
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (client disconnected, task cancelled, generator closed): no verdict on the provider
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def aretrying(self, name: str, func: Callable[[float], Awaitable[T]], deadline_at: float) -> T:
+        endpoint = self._endpoint(name)
+        attempt = 0
+        while True:
+            probe = self._check_breaker(endpoint)
+            try:
+                result = await func(self._remaining(deadline_at))
+            except Exception as exc:
+                self._record_failure(endpoint, exc, probe)
+                delay = self._next_delay(exc, attempt, deadline_at)
+                if delay is None:
+                    raise
+                endpoint.count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (client disconnected, task cancelled, generator closed): no verdict on the provider
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    # --- entry points -----------------------------------------------------
+
+    def deadline_at(self) -> float:
+        return time.monotonic() + self.deadline
+
+    @contextmanager
+    def session(self, name: str):
+        """Count the call and hold a concurrency slot for its whole duration (streams included); yields the deadline."""
+        endpoint = self._endpoint(name)
+        deadline_at = self.deadline_at()
+        endpoint.count("calls")
+        try:
+            with self.limit(name, deadline_at):
+                yield deadline_at
+        except Exception:
+            endpoint.count("failed")
+            raise
+        except BaseException:
+            endpoint.count("cancelled")
+            raise
+        endpoint.count("succeeded")
+
+    @asynccontextmanager
+    async def asession(self, name: str):
+        endpoint = self._endpoint(name)
+        deadline_at = self.deadline_at()
+        endpoint.count("calls")
+        try:
+            async with self.alimit(name, deadline_at):
+                yield deadline_at
+        except Exception:
+            endpoint.count("failed")
+            raise
+        except BaseException:
+            endpoint.count("cancelled")
+            raise
+        endpoint.count("succeeded")
+
+    def call(self, name: str, func: Callable[[float], T]) -> T:
+        with self.session(name) as deadline_at:
+            return self.retrying(name, func, deadline_at)
+
+    async def acall(self, name: str, func: Callable[[float], Awaitable[T]]) -> T:
+        async with self.asession(name) as deadline_at:
+            return await self.aretrying(name, func, deadline_at)
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            "breaker": {"state": self.breaker.state, "opened": self.breaker.opened},
+            "endpoints": {
+                name: {**endpoint.counters, "inFlight": endpoint.in_flight, "limit": endpoint.limit}
+                for name, endpoint in endpoints.items()
+            },
+        }
+
+
+def _parse_endpoint_limits(value: str) -> Dict[str, int]:
+    """`"user_recommendation=8,zus_assessment=4"` -> {"user_recommendation": 8, "zus_assessment": 4}."""
+    limits = {}
+    for part in (value or "").split(","):
+        name, _, limit = part.partition("=")
+        if name.strip() and limit.strip().isdigit():
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+@lru_cache(maxsize=None)
+def get_llm_guard() -> LlmGuard:
+    """Process-wide guard configured from the LLM_* settings."""
+    from django.conf import settings
+
+    return LlmGuard(
+        deadline=getattr(settings, "LLM_DEADLINE", 60.0),
+        max_retries=getattr(settings, "LLM_MAX_RETRIES", 2),
+        concurrency=getattr(settings, "LLM_CONCURRENCY", 16),
+        endpoint_concurrency=_parse_endpoint_limits(getattr(settings, "LLM_ENDPOINT_CONCURRENCY", "")),
+        breaker_threshold=getattr(settings, "LLM_BREAKER_THRESHOLD", 5),
+        breaker_cooldown=getattr(settings, "LLM_BREAKER_COOLDOWN", 30.0),
+    )
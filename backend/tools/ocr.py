@@ -5,24 +5,61 @@ Image OCR:
 - `ocr_img(images, lang="pol")` → list of {name, text} for each image input.
 
 PDF OCR (multi‑page scans):
-- `ocr_pdf(pdf, lang="pol", dpi=300)` → dict with per‑page texts and combined text.
+- `ocr_pdf(pdf, lang="pol", dpi=300, workers=None)` → combined text of all pages.
+  Pages are rasterized in order and OCR'd on a bounded thread pool (env OCR_WORKERS).
+
+Mixed PDFs (digital forms, text layers, scans):
+- `extract_pdf_content(pdf, ...)` → per page picks AcroForm values, the native text
+  layer or OCR, and returns the combined text, AcroForm values and the method per page.
+
+OCR cache (tools/ocr_cache.py, settings OCR_CACHE_PATH / OCR_CACHE_MAX_BYTES):
+- results are cached per PDF (SHA-256 of bytes + lang + dpi) and per rendered page.
+
+Tesseract probe:
+- `ensure_tesseract_available(lang)` spawns `tesseract --version` / `--list-langs` once per
+  process and TESSERACT_CMD; pass `refresh=True` (or call `clear_tesseract_probe_cache()`)
+  to re-check after installing language data. `tesseract_probe_stats()` reports timings.
+
+OCR engines (env OCR_ENGINE = auto | tesserocr | pytesseract):
+- `TesserocrEngine` keeps long-lived libtesseract handles per language, so traineddata is
+  loaded once and page images are passed in memory. Used when the optional `tesserocr`
+  package is installed.
+- `PytesseractEngine` runs one `tesseract` subprocess per image (temp files); fallback.
 
 Requirements:
 - Tesseract installed and available on PATH (and language data, e.g. pol/eng).
-- Python packages: Pillow, pytesseract, PyMuPDF (fitz).
+- Python packages: Pillow, pytesseract, PyMuPDF (fitz); optionally tesserocr.
 """
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from io import BytesIO
 from pathlib import Path
-from typing import Iterable, Any
+from typing import Iterable, Iterator, Any, NamedTuple, Optional
 
 from PIL import Image
 import pytesseract
 from pytesseract import TesseractNotFoundError
 import fitz  #
 
+try:
+    import tesserocr  # type: ignore
+except ImportError:  # optional: needs libtesseract headers to build
+    tesserocr = None
+
+from tools.ocr_cache import get_ocr_cache
+
+logger = logging.getLogger(__name__)
+
 
 def _open_image(obj: Any) -> tuple[Image.Image, str]:
     """Open various input types as a PIL Image and return (image, name).
@@ -67,13 +104,14 @@ def ocr_img(images: Iterable[Any], lang: str = "pol") -> list[dict]:
     Returns: List of dicts: [{"name": <filename>, "text": <recognized_text>}]
     """
     # Ensure Tesseract is configured and available before processing
-    ensure_tesseract_available(lang)
+    engine = get_ocr_engine()
+    engine.ensure_available(lang)
 
     results: list[dict] = []
     for obj in images:
         img, name = _open_image(obj)
         try:
-            text = pytesseract.image_to_string(img, lang=lang)
+            text = engine.image_to_string(img, lang)
         finally:
             try:
                 img.close()
@@ -123,70 +161,226 @@ def _pixmap_to_pil(pix: fitz.Pixmap) -> Image.Image:
     return img
 
 
-def ocr_pdf(pdf: Any, lang: str = "pol", dpi: int = 300) -> str:
+def _ocr_worker_count(workers: int | None = None) -> int:
+    """Resolve the OCR pool size: explicit argument, then env OCR_WORKERS, then min(4, CPUs)."""
+    if workers is None:
+        try:
+            workers = int(os.getenv("OCR_WORKERS", ""))
+        except ValueError:
+            workers = min(4, os.cpu_count() or 1)
+    return max(1, workers)
+
+
+def _ocr_image(engine: "OcrEngine", img: Image.Image, lang: str) -> str:
+    """OCR a single page image and release it afterwards (runs on a pool thread)."""
+    try:
+        return engine.image_to_string(img, lang)
+    finally:
+        try:
+            img.close()
+        except Exception:
+            pass
+
+
+def _render_pages(doc: fitz.Document, page_indices: Iterable[int], dpi: int) -> Iterator[tuple[Image.Image, str]]:
+    """Rasterize pages one by one on the calling thread (PyMuPDF documents are not thread-safe).
+
+    Yields ``(image, sha256 of the rendered pixels)``; the digest keys the per-page OCR cache.
+    """
+    # Matrix for desired DPI: zoom = dpi / 72
+    zoom = dpi / 72.0
+    mat = fitz.Matrix(zoom, zoom)
+    for i in page_indices:
+        page = doc.load_page(i)
+        # Render page to pixmap (RGB)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        try:
+            img = _pixmap_to_pil(pix)
+            digest = hashlib.sha256(pix.samples).hexdigest()
+        finally:
+            # PyMuPDF Pixmap auto-frees when out of scope, but be explicit
+            del pix
+        yield img, digest
+
+
+def _ocr_pages(
+    doc: fitz.Document,
+    page_indices: list[int],
+    lang: str,
+    dpi: int,
+    workers: int | None,
+    pdf_sha256: str | None = None,
+) -> list[str]:
+    """OCR the given pages, overlapping rasterization with OCR, and return texts in page order.
+
+    With an OCR cache configured, a whole-document hit (same PDF bytes, lang, dpi and pages)
+    skips rasterization entirely; otherwise pages whose pixels were OCR'd before are reused.
+    """
+    cache = get_ocr_cache()
+    engine = get_ocr_engine()
+    doc_key = None
+    if cache is not None and pdf_sha256:
+        doc_key = cache.document_key(pdf_sha256, engine.cache_id, lang, dpi, page_indices)
+        cached_pages = cache.get_pages(doc_key)
+        if cached_pages is not None:
+            return cached_pages
+
+    worker_count = _ocr_worker_count(workers)
+    texts: list[str] = []
+    # Keep at most one rendered page waiting per worker to bound memory (300 DPI pages are ~25 MB)
+    max_pending = worker_count + 1
+
+    def _collect(entry) -> None:
+        page_key, result = entry
+        if isinstance(result, str):
+            texts.append(result)
+            return
+        text = result.result()
+        if cache is not None:
+            cache.set(page_key, text)
+        texts.append(text)
+
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="ocr") as pool:
+        pending = deque()
+        for img, digest in _render_pages(doc, page_indices, dpi):
+            page_key = cache.page_key(digest, engine.cache_id, lang) if cache is not None else None
+            cached_text = cache.get(page_key) if cache is not None else None
+            if cached_text is not None:
+                img.close()
+                pending.append((page_key, cached_text))
+            else:
+                pending.append((page_key, pool.submit(_ocr_image, engine, img, lang)))
+            if len(pending) >= max_pending:
+                _collect(pending.popleft())
+        while pending:
+            _collect(pending.popleft())
+
+    if doc_key is not None:
+        cache.set_pages(doc_key, texts)
+    return texts
+
+
+def _page_count(doc: fitz.Document) -> int:
+    page_count = getattr(doc, "page_count", None)
+    if page_count is None:
+        # Fallback for very old PyMuPDF, though modern versions have page_count
+        page_count = len(doc)
+
+    if page_count == 0:
+        # Explicit, helpful error instead of silently returning nothing
+        raise ValueError("PDF has no pages (page_count == 0)")
+    return page_count
+
+
+def ocr_pdf(pdf: Any, lang: str = "pol", dpi: int = 300, workers: int | None = None) -> str:
     """OCR a multi‑page scanned PDF and return recognized text.
 
+    Pages are rasterized sequentially while up to ``workers`` Tesseract processes
+    OCR the already rendered ones, so rendering page N+1 overlaps OCR of page N.
+    Page order is preserved in the combined text.
+
     Args:
         pdf: PDF input (Django UploadedFile, file path, bytes, or file‑like).
         lang: Tesseract language code, e.g. 'pol', 'eng', or 'pol+eng'.
         dpi: Rendering DPI for rasterization; 300 is a good default for OCR.
+        workers: Number of concurrent Tesseract calls; defaults to env OCR_WORKERS or min(4, CPUs).
 
     Returns:
-        {
-          "name": <filename>,
-          "pages": [
-             {"index": 0, "text": "..."},
-             {"index": 1, "text": "..."},
-             ...
-          ],
-          "text": "<combined text>"
-        }
+        Combined text of all pages, separated by blank lines.
     """
     # Ensure Tesseract is configured and available before processing
-    ensure_tesseract_available(lang)
+    get_ocr_engine().ensure_available(lang)
 
     data, name = _read_pdf_bytes(pdf)
 
     # Open via PyMuPDF from memory to handle UploadedFile/bytes
     doc = fitz.open(stream=data, filetype="pdf")
     try:
-        # Matrix for desired DPI: zoom = dpi / 72
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        pages: list[dict] = []
-        all_text_parts: list[str] = []
+        page_count = _page_count(doc)
+        pdf_sha256 = hashlib.sha256(data).hexdigest()
+        all_text_parts = _ocr_pages(doc, list(range(page_count)), lang, dpi, workers, pdf_sha256)
+        combined = "\n\n".join(all_text_parts)
+        return combined
+    finally:
+        doc.close()
 
-        page_count = getattr(doc, "page_count", None)
-        if page_count is None:
-            # Fallback for very old PyMuPDF, though modern versions have page_count
-            page_count = len(doc)
 
-        if page_count == 0:
-            # Explicit, helpful error instead of silently returning nothing
-            raise ValueError("PDF has no pages (page_count == 0)")
+# A page whose text layer has fewer characters than this is treated as a scan
+MIN_TEXT_LAYER_CHARS = 50
+
+
+def _widget_values(page: fitz.Page) -> dict[str, str]:
+    values: dict[str, str] = {}
+    for widget in page.widgets() or []:
+        # Forms filled in a PDF viewer keep the template's qualified names
+        # (topmostSubform[0].Page1[0].PESEL[0]); the mapper uses the terminal segment
+        name = (widget.field_name or "").strip().rsplit(".", 1)[-1]
+        value = widget.field_value
+        if not name or value in (None, "", "Off", False):
+            continue
+        values[name] = str(value)
+    return values
+
+
+def extract_pdf_content(
+    pdf: Any,
+    lang: str = "pol",
+    dpi: int = 300,
+    workers: int | None = None,
+    min_text_chars: int = MIN_TEXT_LAYER_CHARS,
+) -> dict:
+    """Extract text from a PDF choosing the cheapest reliable source per page.
+
+    - ``acroform``: the page has filled form widgets; their values are appended to the
+      page text layer (labels) and returned in ``fields``.
+    - ``text``: the page has a native text layer with at least ``min_text_chars`` chars.
+    - ``ocr``: everything else is rasterized and OCR'd (Tesseract is only required then).
+
+    Returns:
+        {
+          "text": "<combined text>",
+          "fields": {<AcroForm field name>: <value>, ...},
+          "pages": [{"index": 0, "method": "acroform", "text": "<page text>"}, ...],
+          "methods": ["acroform", "ocr", ...]
+        }
+    """
+    data, name = _read_pdf_bytes(pdf)
+
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        page_count = _page_count(doc)
+        texts: list[str] = [""] * page_count
+        methods: list[str] = ["ocr"] * page_count
+        fields: dict[str, str] = {}
 
         for i in range(page_count):
             page = doc.load_page(i)
-            # Render page to pixmap (RGB)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            try:
-                img = _pixmap_to_pil(pix)
-                try:
-                    text = pytesseract.image_to_string(img, lang=lang)
-                finally:
-                    try:
-                        img.close()
-                    except Exception:
-                        pass
-            finally:
-                # PyMuPDF Pixmap auto-frees when out of scope, but be explicit
-                del pix
-
-            pages.append({"index": i, "text": text})
-            all_text_parts.append(text)
-
-        combined = "\n\n".join(all_text_parts)
-        return combined
+            native_text = page.get_text("text") or ""
+            values = _widget_values(page)
+            if values:
+                # Names repeat across pages (e.g. Ulica2[0]); as in tools/pdf_import.py the first value wins
+                for field_name, value in values.items():
+                    fields.setdefault(field_name, value)
+                value_lines = "\n".join(f"{field_name}: {value}" for field_name, value in values.items())
+                texts[i] = f"{native_text.strip()}\n{value_lines}".strip()
+                methods[i] = "acroform"
+            elif len(native_text.strip()) >= min_text_chars:
+                texts[i] = native_text
+                methods[i] = "text"
+
+        ocr_indices = [i for i, method in enumerate(methods) if method == "ocr"]
+        if ocr_indices:
+            get_ocr_engine().ensure_available(lang)
+            pdf_sha256 = hashlib.sha256(data).hexdigest()
+            for i, text in zip(ocr_indices, _ocr_pages(doc, ocr_indices, lang, dpi, workers, pdf_sha256)):
+                texts[i] = text
+
+        return {
+            "text": "\n\n".join(texts),
+            "fields": fields,
+            "pages": [{"index": i, "method": method, "text": texts[i]} for i, method in enumerate(methods)],
+            "methods": sorted(set(methods)),
+        }
     finally:
         doc.close()
 
@@ -201,38 +395,255 @@ def _configure_tesseract_from_env() -> None:
         pytesseract.pytesseract.tesseract_cmd = cmd
 
 
-def ensure_tesseract_available(lang: str | None = None) -> None:
+class TesseractProbe(NamedTuple):
+    """Result of probing one Tesseract binary."""
+
+    cmd: str
+    version: str
+    # None when listing languages failed; language validation is then skipped
+    languages: Optional[frozenset[str]]
+    duration: float
+
+
+_PROBE_CACHE: dict[str, TesseractProbe] = {}
+_PROBE_LOCK = threading.Lock()
+_PROBE_STATS = {"probes": 0, "hits": 0, "total_probe_seconds": 0.0, "last_probe_seconds": None}
+
+
+def _probe_tesseract(cmd: str) -> TesseractProbe:
+    started = time.perf_counter()
+    # Raises TesseractNotFoundError if the binary is not callable; failures are never cached
+    version = pytesseract.get_tesseract_version()
+    try:
+        languages: Optional[frozenset[str]] = frozenset(pytesseract.get_languages(config=""))
+    except Exception:
+        languages = None
+    duration = time.perf_counter() - started
+
+    _PROBE_STATS["probes"] += 1
+    _PROBE_STATS["total_probe_seconds"] += duration
+    _PROBE_STATS["last_probe_seconds"] = duration
+    logger.info("Tesseract probe for %s took %.1f ms (version %s)", cmd, duration * 1000, version)
+    return TesseractProbe(cmd=cmd, version=str(version), languages=languages, duration=duration)
+
+
+def clear_tesseract_probe_cache() -> None:
+    with _PROBE_LOCK:
+        _PROBE_CACHE.clear()
+
+
+def tesseract_probe_stats() -> dict:
+    """Counters for the cached probe (reported in /api/health/): real probes, cache hits and probe durations."""
+    with _PROBE_LOCK:
+        last = _PROBE_STATS["last_probe_seconds"]
+        return {
+            "probes": _PROBE_STATS["probes"],
+            "hits": _PROBE_STATS["hits"],
+            "totalProbeMs": round(_PROBE_STATS["total_probe_seconds"] * 1000, 1),
+            "lastProbeMs": round(last * 1000, 1) if last is not None else None,
+            # Binary paths stay out of the (unauthenticated) health payload
+            "cachedBinaries": len(_PROBE_CACHE),
+        }
+
+
+def ensure_tesseract_available(lang: str | None = None, refresh: bool = False) -> None:
     """Validate that the Tesseract binary (and optionally language data) is available.
 
     - Reads env var TESSERACT_CMD and configures pytesseract if set.
-    - Calls pytesseract to get version to ensure binary is callable.
+    - Probes the binary version and installed languages once per process and TESSERACT_CMD;
+      later calls only check the requested languages against the cached set.
     - If `lang` is provided, verifies that each requested language has traineddata installed.
 
+    Args:
+        lang: Tesseract language spec, e.g. 'pol' or 'pol+eng'.
+        refresh: Ignore the cached probe and run the subprocesses again.
+
     Raises:
         TesseractNotFoundError: if the tesseract binary is not found or not executable.
         ValueError: if requested language data is missing.
     """
     _configure_tesseract_from_env()
+    cmd = str(pytesseract.pytesseract.tesseract_cmd)
 
-    # Ensure the binary is callable
-    try:
-        _ = pytesseract.get_tesseract_version()
-    except TesseractNotFoundError:
-        raise
+    with _PROBE_LOCK:
+        probe = None if refresh else _PROBE_CACHE.get(cmd)
+        if probe is None:
+            probe = _probe_tesseract(cmd)
+            _PROBE_CACHE[cmd] = probe
+        else:
+            _PROBE_STATS["hits"] += 1
 
     # Optionally validate language availability
-    if lang:
+    if lang and probe.languages is not None:
+        _check_languages(lang, probe.languages)
+
+
+def _check_languages(lang: str, available: Iterable[str]) -> None:
+    available = set(available)
+    requested = {part.strip() for part in str(lang).split("+") if part.strip()}
+    missing = [l for l in requested if l not in available]
+    if missing:
+        raise ValueError(
+            "Missing Tesseract language data: "
+            + ", ".join(missing)
+            + ". Install the corresponding *.traineddata files (e.g., via your package manager or https://tesseract-ocr.github.io/tessdoc/Data-Files)."
+        )
+
+
+class OcrEngine(ABC):
+    """Interface shared by OCR backends; `ocr_pdf`/`ocr_img` only talk to this."""
+
+    name = "base"
+
+    @abstractmethod
+    def ensure_available(self, lang: str | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def image_to_string(self, img: Image.Image, lang: str) -> str:
+        ...
+
+    def version(self) -> str:
+        return "unknown"
+
+    @cached_property
+    def cache_id(self) -> str:
+        """Engine name and Tesseract version; part of OCR cache keys so engines never share results."""
         try:
-            available = set(pytesseract.get_languages(config=""))
-        except Exception:
-            # If listing languages fails, skip language validation
-            return
+            version = self.version()
+        except Exception:  # an unknown version must not fail OCR
+            version = "unknown"
+        return f"{self.name}-{version}"
+
+    def close(self) -> None:
+        pass
+
+
+class PytesseractEngine(OcrEngine):
+    """One `tesseract` subprocess per image; reloads traineddata on every call."""
+
+    name = "pytesseract"
+
+    def ensure_available(self, lang: str | None = None) -> None:
+        ensure_tesseract_available(lang)
+
+    def image_to_string(self, img: Image.Image, lang: str) -> str:
+        return pytesseract.image_to_string(img, lang=lang)
 
-        requested = {part.strip() for part in str(lang).split("+") if part.strip()}
-        missing = [l for l in requested if l not in available]
-        if missing:
-            raise ValueError(
-                "Missing Tesseract language data: "
-                + ", ".join(missing)
-                + ". Install the corresponding *.traineddata files (e.g., via your package manager or https://tesseract-ocr.github.io/tessdoc/Data-Files)."
-            )
+    def version(self) -> str:
+        return str(pytesseract.get_tesseract_version())
+
+
+# Longest wait for a free tesserocr handle (all busy) before the OCR call fails
+HANDLE_WAIT_SECONDS = float(os.getenv("OCR_HANDLE_WAIT_SECONDS", "300"))
+
+
+class TesserocrEngine(OcrEngine):
+    """Pool of persistent libtesseract handles, one free-list per language.
+
+    Each handle keeps its language model loaded between pages. tesserocr releases
+    the GIL during recognition, so the `ocr_pdf` thread pool runs handles in parallel;
+    at most `size` handles are created per language.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, size: int | None = None):
+        self.size = _ocr_worker_count(size)
+        self._pools: dict[str, "queue.Queue"] = {}
+        self._created: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._languages: Optional[frozenset[str]] = None
+
+    def ensure_available(self, lang: str | None = None) -> None:
+        if self._languages is None:
+            prefix = os.getenv("TESSDATA_PREFIX")
+            _path, languages = tesserocr.get_languages(prefix) if prefix else tesserocr.get_languages()
+            self._languages = frozenset(languages)
+        if lang:
+            _check_languages(lang, self._languages)
+
+    def _acquire(self, lang: str):
+        """`(pool, handle)`; give the handle back with `_release(lang, pool, handle)`."""
+        deadline = time.monotonic() + HANDLE_WAIT_SECONDS
+        while True:
+            with self._lock:
+                pool = self._pools.setdefault(lang, queue.Queue())
+                try:
+                    return pool, pool.get_nowait()
+                except queue.Empty:
+                    pass
+                create = self._created.get(lang, 0) < self.size
+                if create:
+                    # Reserve the slot now; it is given back below if the handle cannot be built
+                    self._created[lang] = self._created.get(lang, 0) + 1
+
+            if create:
+                try:
+                    prefix = os.getenv("TESSDATA_PREFIX")
+                    api = tesserocr.PyTessBaseAPI(path=prefix, lang=lang) if prefix else tesserocr.PyTessBaseAPI(lang=lang)
+                except BaseException:
+                    with self._lock:
+                        if self._pools.get(lang) is pool:
+                            self._created[lang] -= 1
+                    raise
+                return pool, api
+
+            # All handles for this language are busy; wait for one to be released. Wake up now
+            # and then in case a failed build freed a slot (or `close` replaced the pool).
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"Timed out waiting for a tesserocr handle for '{lang}'")
+            try:
+                return pool, pool.get(timeout=min(1.0, remaining))
+            except queue.Empty:
+                continue
+
+    def _release(self, lang: str, pool: "queue.Queue", api) -> None:
+        with self._lock:
+            if self._pools.get(lang) is pool:
+                pool.put(api)
+                return
+        # `close` ran while the handle was in use: its pool is gone, so end the handle
+        api.End()
+
+    def image_to_string(self, img: Image.Image, lang: str) -> str:
+        pool, api = self._acquire(lang)
+        try:
+            api.SetImage(img)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._release(lang, pool, api)
+
+    def version(self) -> str:
+        # e.g. "tesseract 5.3.0\n leptonica-1.82.0 ..."
+        return tesserocr.tesseract_version().split()[1]
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                while not pool.empty():
+                    pool.get_nowait().End()
+            self._pools.clear()
+            self._created.clear()
+
+
+_ENGINE: Optional[OcrEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_ocr_engine() -> OcrEngine:
+    """Return the process-wide OCR engine selected by env OCR_ENGINE (default: auto)."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            choice = os.getenv("OCR_ENGINE", "auto").strip().lower()
+            if choice == "tesserocr" and tesserocr is None:
+                raise ValueError("OCR_ENGINE=tesserocr but the tesserocr package is not installed")
+            if choice in ("auto", "tesserocr") and tesserocr is not None:
+                _ENGINE = TesserocrEngine()
+            else:
+                _ENGINE = PytesseractEngine()
+            logger.info("Using %s OCR engine", _ENGINE.name)
+        return _ENGINE
@@ -0,0 +1,137 @@
+"""
+SQLite-backed cache of OCR results.
+
+Two kinds of entries share one table:
+- `doc:<sha256 of PDF bytes>:<engine>:<lang>:<dpi>:<pages>` → JSON list of page texts, so a
+  repeated upload is answered without rasterizing anything.
+- `page:<sha256 of rendered page pixels>:<engine>:<lang>` → text of one page, so a re-upload with
+  a single changed page re-OCRs only that page.
+
+`<engine>` is the OCR engine and its Tesseract version, so switching engines never
+serves the other engine's text. Entries are evicted least-recently-used once the
+stored text exceeds `max_bytes`. The cache is best-effort: read and write errors
+are logged and OCR simply runs.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+
+class OcrCache:
+    def __init__(self, path: Union[str, Path], max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_accessed ON ocr_cache (accessed)")
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def document_key(pdf_sha256: str, engine: str, lang: str, dpi: int, page_indices: Sequence[int]) -> str:
+        return f"doc:{pdf_sha256}:{engine}:{lang}:{dpi}:{','.join(str(i) for i in page_indices)}"
+
+    @staticmethod
+    def page_key(pixels_sha256: str, engine: str, lang: str) -> str:
+        return f"page:{pixels_sha256}:{engine}:{lang}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached text, or None on a miss or when the cache cannot be read (then OCR runs as usual)."""
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                row = conn.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE ocr_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+                return row[0]
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("OCR cache read failed (%s): %s", self.path, exc)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store text; best-effort, a failed write is logged and dropped."""
+        size = len(value.encode("utf-8"))
+        if self.max_bytes == 0 or size > self.max_bytes:
+            return
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time()),
+                )
+                self._evict(conn)
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("OCR cache write failed (%s): %s", self.path, exc)
+
+    def get_pages(self, key: str) -> Optional[list[str]]:
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_pages(self, key: str, texts: Sequence[str]) -> None:
+        self.set(key, json.dumps(list(texts), ensure_ascii=False))
+
+    def clear(self) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM ocr_cache")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM ocr_cache ORDER BY accessed").fetchall():
+            conn.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Process-wide OCR cache configured from OCR_CACHE_PATH / OCR_CACHE_MAX_BYTES (0 disables).
+
+    None outside Django (`tools.ocr` used as a plain library, e.g. the `ocr/` scripts)
+    and when the settings cannot be read: OCR then runs uncached.
+    """
+    from django.conf import settings
+
+    if not settings.configured:
+        return None
+    try:
+        return _configured_ocr_cache()
+    except Exception as exc:
+        logger.warning("OCR cache disabled, settings could not be read: %s", exc)
+        return None
+
+
+@lru_cache(maxsize=None)
+def _configured_ocr_cache() -> Optional[OcrCache]:
+    from django.conf import settings
+
+    max_bytes = getattr(settings, "OCR_CACHE_MAX_BYTES", 0)
+    if not max_bytes:
+        return None
+    return OcrCache(settings.OCR_CACHE_PATH, max_bytes)
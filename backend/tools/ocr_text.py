@@ -0,0 +1,181 @@
+"""
+Shrink OCR text before it is sent to the LLM.
+
+A scanned ewyp.pdf is mostly the form's own printed labels and instructions
+(~12k characters); only the handwritten/typed answers are new information. The
+printed text is fingerprinted once from the blank template (`tools/ewyp.pdf`) and
+`reduce_ocr_text`:
+
+- collapses whitespace, dotted/underscored leaders and stray OCR symbols and drops
+  lines that are only noise;
+- when the text looks like the template (enough lines match the fingerprint), drops
+  the printed lines and keeps the answers, each with the nearest short label line
+  before it for context;
+- enforces a token budget by cutting whole lines from the end.
+
+Tokens are estimated at `CHARS_PER_TOKEN` characters each; the estimate is only
+used for the budget and for reporting the saving.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Sequence
+
+import fitz  # type: ignore
+
+from tools.text_folding import folded_words
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "ewyp.pdf")
+
+CHARS_PER_TOKEN = 4
+# Share of non-empty lines that must match the template before printed text is dropped
+TEMPLATE_MATCH_RATIO = 0.2
+# A printed line longer than this is an instruction, not a label worth repeating
+LABEL_MAX_WORDS = 8
+TRUNCATION_MARKER = "[...]"
+
+_LEADERS_RE = re.compile(r"[._\-–—~|=•·…]{2,}")
+_STRAY_SYMBOL_RE = re.compile(r"(?<!\S)[^\w\s](?!\S)")
+_SPACES_RE = re.compile(r"[ \t\f\v ]+")
+_NUMBERING_RE = re.compile(r"^\d{1,2}[.)]$")
+
+
+@dataclass(frozen=True)
+class TemplateFingerprint:
+    lines: FrozenSet[str]
+    vocabulary: FrozenSet[str]
+
+
+@dataclass(frozen=True)
+class ReducedText:
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+    def as_dict(self) -> dict:
+        return {"original": self.original_tokens, "sent": self.tokens, "saved": self.saved_tokens}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _fold(line: str) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse spaces: the form used for matching."""
+    return " ".join(folded_words(line))
+
+
+@lru_cache(maxsize=4)
+def _fingerprint(path: str, mtime_ns: int) -> TemplateFingerprint:
+    lines, vocabulary = set(), set()
+    with fitz.open(path) as doc:
+        for page in doc:
+            for line in page.get_text("text").splitlines():
+                folded = _fold(line)
+                if folded:
+                    lines.add(folded)
+                    vocabulary.update(word for word in folded.split() if not word.isdigit())
+    return TemplateFingerprint(frozenset(lines), frozenset(vocabulary))
+
+
+def template_fingerprint(path: str = TEMPLATE_PATH) -> TemplateFingerprint:
+    """Printed lines and words of the blank form; rebuilt when the template file changes."""
+    return _fingerprint(path, os.stat(path).st_mtime_ns)
+
+
+def _clean_line(line: str) -> str:
+    line = _LEADERS_RE.sub(" ", line)
+    line = _STRAY_SYMBOL_RE.sub(" ", line)
+    line = _SPACES_RE.sub(" ", line).strip()
+    visible = line.replace(" ", "")
+    if not visible:
+        return ""
+    alnum = sum(char.isalnum() for char in visible)
+    # Mostly punctuation: checkbox frames, table rules, speckles
+    if alnum == 0 or (alnum / len(visible) < 0.5 and len(visible) > 2):
+        return ""
+    return line
+
+
+def _is_printed(folded: str, fingerprint: TemplateFingerprint) -> bool:
+    """True for text that is part of the blank form rather than an answer."""
+    if folded.isdigit():
+        return False
+    if folded in fingerprint.lines:
+        return True
+    words = folded.split()
+    # Every word printed on the form and no numbers: a label/instruction OCR'd with a different line break
+    return len(words) >= 2 and all(word in fingerprint.vocabulary for word in words)
+
+
+def _keep_answers(lines: List[str], fingerprint: TemplateFingerprint) -> List[str]:
+    kept: List[str] = []
+    label: Optional[str] = None
+    for line in lines:
+        if _NUMBERING_RE.match(line):
+            continue
+        folded = _fold(line)
+        if _is_printed(folded, fingerprint):
+            label = line if len(folded.split()) <= LABEL_MAX_WORDS else None
+            continue
+        if label is not None:
+            kept.append(label)
+            label = None
+        kept.append(line)
+    return kept
+
+
+def _apply_budget(lines: List[str], budget: int) -> List[str]:
+    limit = budget * CHARS_PER_TOKEN - len(TRUNCATION_MARKER) - 1
+    used = 0
+    for index, line in enumerate(lines):
+        used += len(line) + 1
+        if used > limit:
+            return lines[:index] + [TRUNCATION_MARKER]
+    return lines
+
+
+def reduce_ocr_text(text: str, budget: int = 0, fingerprint: Optional[TemplateFingerprint] = None) -> ReducedText:
+    """Drop printed form text and OCR noise from `text` and cap it at `budget` tokens (0 = no cap)."""
+    text = text or ""
+    lines = [cleaned for cleaned in map(_clean_line, text.splitlines()) if cleaned]
+
+    fingerprint = fingerprint or template_fingerprint()
+    if lines:
+        matched = sum(_fold(line) in fingerprint.lines for line in lines)
+        if matched / len(lines) >= TEMPLATE_MATCH_RATIO:
+            lines = _keep_answers(lines, fingerprint)
+
+    if budget > 0:
+        lines = _apply_budget(lines, budget)
+
+    reduced = "\n".join(lines)
+    return ReducedText(reduced, estimate_tokens(text), estimate_tokens(reduced))
+
+
+def reduce_page_texts(texts: Sequence[str], budget: int = 0,
+                      fingerprint: Optional[TemplateFingerprint] = None) -> ReducedText:
+    """`reduce_ocr_text` page by page, then cap the combined answers at `budget` tokens.
+
+    Unfilled form pages reduce to nothing even when long attachments are sent along,
+    which a single pass over the joined text would not detect as form text.
+    """
+    fingerprint = fingerprint or template_fingerprint()
+    lines: List[str] = []
+    for text in texts:
+        reduced = reduce_ocr_text(text, fingerprint=fingerprint)
+        if reduced.text:
+            lines.extend(reduced.text.splitlines())
+    if budget > 0:
+        lines = _apply_budget(lines, budget)
+    reduced = "\n".join(lines)
+    return ReducedText(reduced, sum(estimate_tokens(text or "") for text in texts), estimate_tokens(reduced))
+
@@ -0,0 +1,135 @@
+"""
+Batch rendering of filled ewyp.pdf forms on a process pool.
+
+- `iter_rendered_pdfs(jobs)` renders `PdfJob`s on worker processes and yields
+  `(filename, pdf_bytes)` in submission order.
+- `iter_in_pool(func, items)` is the same ordered, bounded fan-out for any
+  picklable function (used by `tools.pdf_import` to read uploaded forms).
+- `stream_zip(entries)` turns `(filename, bytes)` pairs into ZIP chunks without
+  buffering the whole archive, suitable for `StreamingHttpResponse`.
+
+Field mapping (which needs the ORM) happens in the calling process; workers only
+receive plain dicts, fill the template and optionally redact it.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, TypeVar
+
+TEMPLATE_PATH = Path(__file__).resolve().parent / "ewyp.pdf"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class PdfJob(NamedTuple):
+    basename: str
+    field_data: Dict[str, str]
+    include_anonymized: bool = False
+
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _worker_count() -> int:
+    configured = os.getenv("PDF_BATCH_WORKERS")
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    """Make sure Django apps are loaded in spawned workers (pdf_anonymizer imports models)."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(max_workers=_worker_count(), initializer=_init_worker)
+        return _EXECUTOR
+
+
+def render_pdf_job(job: PdfJob) -> list[tuple[str, bytes]]:
+    """Render one job inside a worker. Imports are local so workers start without the ORM."""
+    from tools.pdf_anonymizer import DEFAULT_REDACTED_FIELDS
+    from tools.pdf_writer import PDFWriter
+
+    writer = PDFWriter()
+    filled = writer.fill_template(TEMPLATE_PATH, job.field_data)
+    rendered = [(f"{job.basename}.pdf", filled.getvalue())]
+    if job.include_anonymized:
+        anonymized = writer.fill_template(TEMPLATE_PATH, job.field_data, redacted_fields=DEFAULT_REDACTED_FIELDS)
+        rendered.append((f"{job.basename}-anon.pdf", anonymized.getvalue()))
+    return rendered
+
+
+def iter_in_pool(func: Callable[[T], R], items: Iterable[T], executor: Optional[Executor] = None) -> Iterator[R]:
+    """`func(item)` for every item on the pool, keeping a bounded number in flight and preserving order."""
+    executor = executor or get_executor()
+    window = max(2, _worker_count() * 2)
+    pending = deque()
+
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_rendered_pdfs(jobs: Iterable[PdfJob], executor: Optional[Executor] = None) -> Iterator[tuple[str, bytes]]:
+    """Render jobs in parallel, preserving order."""
+    for rendered in iter_in_pool(render_pdf_job, jobs, executor):
+        yield from rendered
+
+
+class ChunkBuffer:
+    """Write-only, unseekable sink; zipfile then emits data descriptors instead of seeking back."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk, one chunk per entry plus the central directory."""
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in entries:
+            archive.writestr(filename, data)
+            yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,135 @@
+"""
+Content-addressed, size-bounded cache of rendered PDFs.
+
+Entries live under `<root>/<document_id>/<key>.pdf`, where `key` is a SHA-256 of
+the mapped AcroForm values, the template hash and the anonymization flag. The key
+doubles as the HTTP ETag. Eviction is LRU by file mtime (bumped on every hit)
+once the directory grows past `max_bytes` (down to 90% of it); the directory is only scanned when a
+running size estimate crosses that cap. Writes are best-effort: a failed write
+is logged and the caller still serves the rendered bytes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+EVICT_TO_FRACTION = 0.9
+
+
+class RenderedPdfCache:
+    def __init__(self, root: Union[str, Path], max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        # Upper bound of the cached bytes (invalidations are not subtracted); None until the first scan
+        self._estimated_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(field_data: Dict[str, str], template_sha256: str, anonymized: bool) -> str:
+        payload = json.dumps(field_data, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256()
+        digest.update(template_sha256.encode())
+        digest.update(b"anon" if anonymized else b"full")
+        digest.update(payload.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, document_id: int, key: str) -> Path:
+        return self.root / str(document_id) / f"{key}.pdf"
+
+    def get(self, document_id: int, key: str) -> Optional[BytesIO]:
+        path = self._path(document_id, key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return BytesIO(data)
+
+    def set(self, document_id: int, key: str, data: bytes) -> None:
+        """Store a render. Best-effort: a failed write (e.g. a concurrent `invalidate`) is logged, not raised."""
+        if self.max_bytes == 0 or len(data) > self.max_bytes:
+            return
+
+        path = self._path(document_id, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file first so concurrent readers never see partial PDFs
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    tmp.write(data)
+                os.replace(tmp_name, path)
+            except OSError:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+        except OSError as exc:
+            logger.warning("Could not cache rendered PDF for document %s: %s", document_id, exc)
+            return
+
+        with self._lock:
+            # Only walk the directory once the running estimate says the cap may be exceeded
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += len(data)
+                if self._estimated_bytes <= self.max_bytes:
+                    return
+        self._evict()
+
+    def invalidate(self, document_id: int) -> None:
+        """Drop every cached render of a document (all keys, both anonymization modes)."""
+        shutil.rmtree(self.root / str(document_id), ignore_errors=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._lock:
+            self._estimated_bytes = 0
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.glob("*/*.pdf"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            if total > self.max_bytes:
+                # Trim below the cap so the next writes fit without another scan
+                target = int(self.max_bytes * EVICT_TO_FRACTION)
+                entries.sort()
+                for _mtime, size, path in entries:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    if total <= target:
+                        break
+            self._estimated_bytes = total
+
+
+@lru_cache(maxsize=None)
+def get_rendered_pdf_cache() -> RenderedPdfCache:
+    """Process-wide cache configured from PDF_CACHE_DIR / PDF_CACHE_MAX_BYTES settings."""
+    from django.conf import settings
+
+    return RenderedPdfCache(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_BYTES)
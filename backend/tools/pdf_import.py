@@ -0,0 +1,147 @@
+"""
+Reading filled ewyp.pdf forms for bulk import.
+
+- `iter_form_sources(uploads)` expands uploaded PDFs and ZIP archives of PDFs
+  into `FormSource`s, one per form.
+- `iter_read_forms(sources)` reads their form widgets on the PDF batch process
+  pool (`tools.pdf_batch`) and yields `ReadForm`s in input order.
+
+Widgets are read from each page's /Annots with PyMuPDF rather than through the
+AcroForm field tree: PDFs written by `PDFWriter` keep the filled widgets on
+their pages but no /Fields array, so PyPDF2's `get_form_text_fields()` finds
+nothing in them. Mapping to model fields (which needs the ORM) happens in the
+calling process.
+"""
+from __future__ import annotations
+
+import re
+import zipfile
+from concurrent.futures import Executor
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional
+
+import fitz  # type: ignore
+
+from tools.pdf_batch import iter_in_pool
+
+# Page 5 of ewyp.pdf holds the reporter and the first witness; the witness field names (Ulica2[0], ...)
+# also appear on earlier pages, so that page's values are returned separately as `witness_fields`
+WITNESS_PAGE_INDEX = 4
+_REFERENCE_RE = re.compile(r"(\d+) \d+ R")
+
+
+class FormSource(NamedTuple):
+    filename: str
+    data: bytes
+    error: str = ""
+
+
+class ReadForm(NamedTuple):
+    filename: str
+    fields: Dict[str, str]
+    witness_fields: Dict[str, str]
+    error: str = ""
+
+
+class TooManyFiles(ValueError):
+    pass
+
+
+def _is_pdf_name(name: str) -> bool:
+    return name.lower().endswith(".pdf")
+
+
+def _zip_sources(upload, max_file_bytes: int) -> Iterator[FormSource]:
+    with zipfile.ZipFile(upload) as archive:
+        for member in archive.infolist():
+            path = PurePosixPath(member.filename)
+            # Directories and macOS resource forks are not forms
+            if member.is_dir() or "__MACOSX" in path.parts or path.name.startswith("._"):
+                continue
+            filename = f"{upload.name}/{member.filename}"
+            if not _is_pdf_name(path.name):
+                yield FormSource(filename, b"", "Not a PDF file")
+            elif member.file_size > max_file_bytes:
+                yield FormSource(filename, b"", "File is too large")
+            else:
+                yield FormSource(filename, archive.read(member))
+
+
+def iter_form_sources(uploads: Iterable, max_files: int, max_file_bytes: int) -> Iterator[FormSource]:
+    """PDFs from uploaded files (PDFs or ZIPs of PDFs); raises `TooManyFiles` past `max_files` forms."""
+    count = 0
+    for upload in uploads:
+        if zipfile.is_zipfile(upload):
+            upload.seek(0)
+            sources = _zip_sources(upload, max_file_bytes)
+        elif upload.size > max_file_bytes:
+            sources = [FormSource(upload.name, b"", "File is too large")]
+        else:
+            upload.seek(0)
+            sources = [FormSource(upload.name, upload.read())]
+        for source in sources:
+            count += 1
+            if count > max_files:
+                raise TooManyFiles(f"Too many files: at most {max_files} forms per import")
+            yield source
+
+
+def _key(document, xref: int, key: str) -> Optional[str]:
+    kind, value = document.xref_get_key(xref, key)
+    if kind == "null":
+        return None
+    return value[1:] if kind == "name" else value
+
+
+def _iter_widget_values(document, page_index: int) -> Iterator[tuple[str, str]]:
+    """`(field name, value)` of every widget on a page, read from the raw objects.
+
+    Much faster than `page.widgets()`, which loads the page and builds a Widget
+    object per annotation.
+    """
+    kind, annots = document.xref_get_key(document.page_xref(page_index), "Annots")
+    if kind == "xref":
+        annots = document.xref_object(int(annots.split()[0]))
+    elif kind != "array":
+        return
+    for match in _REFERENCE_RE.finditer(annots):
+        field_xref = int(match.group(1))
+        name = _key(document, field_xref, "T")
+        if name is None:
+            # Widget of a field with several widgets (checkbox pairs): name and value are on the parent
+            kind, parent = document.xref_get_key(field_xref, "Parent")
+            if kind != "xref":
+                continue
+            field_xref = int(parent.split()[0])
+            name = _key(document, field_xref, "T")
+            if name is None:
+                continue
+        yield name, _key(document, field_xref, "V") or ""
+
+
+def read_form(source: FormSource) -> ReadForm:
+    """Widget values of one form by field name (first non-empty value wins). Runs in a pool worker."""
+    if source.error:
+        return ReadForm(source.filename, {}, {}, source.error)
+    fields: Dict[str, str] = {}
+    witness_fields: Dict[str, str] = {}
+    try:
+        with fitz.open(stream=source.data, filetype="pdf") as document:
+            if document.needs_pass:
+                return ReadForm(source.filename, {}, {}, "PDF is password-protected")
+            for page_index in range(document.page_count):
+                for name, value in _iter_widget_values(document, page_index):
+                    if not fields.get(name):
+                        fields[name] = value
+                    if page_index == WITNESS_PAGE_INDEX:
+                        witness_fields[name] = value
+    except (RuntimeError, ValueError):
+        return ReadForm(source.filename, {}, {}, "Not a readable PDF")
+    if not fields:
+        return ReadForm(source.filename, {}, {}, "PDF has no form fields")
+    return ReadForm(source.filename, fields, witness_fields)
+
+
+def iter_read_forms(sources: Iterable[FormSource], executor: Optional[Executor] = None) -> Iterator[ReadForm]:
+    """Read forms in parallel, preserving order."""
+    return iter_in_pool(read_form, sources, executor)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, Any, Union
+from typing import Dict, Any, Optional, Union
 from pathlib import Path
 from datetime import datetime, date, time
 import unicodedata
@@ -297,6 +297,18 @@ PDF_TO_DOCUMENT_FIELD: Dict[str, str] = {
     "Tekst4[0]": "opis_maszyn",
 }
 
+# First witness: field names on the witness page (page 5) -> Witness model field
+PDF_TO_WITNESS_FIELD: Dict[str, str] = {
+    "Imię2[0]": "imie",
+    "Nazwisko2[0]": "nazwisko",
+    "Ulica2[0]": "ulica",
+    "Numerdomu2[0]": "nr_domu",
+    "Numerlokalu2[0]": "nr_lokalu",
+    "Kodpocztowy2[0]": "kod_pocztowy",
+    "Poczta2[0]": "miejscowosc",
+    "Nazwapaństwa2[0]": "nazwa_panstwa",
+}
+
 
 def _parse_date(val: str) -> date | None:
     if not val:
@@ -394,6 +406,23 @@ def map_pdf_fields_to_document_data(fields: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def map_pdf_fields_to_witness_data(fields: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Convert the witness page's field values into Witness data, or None if no witness is named.
+
+    Only pass fields read from the witness page: the same names (Ulica2[0], ...)
+    are used for other addresses on earlier pages.
+    """
+    out: Dict[str, str] = {}
+    for pdf_key, model_field in PDF_TO_WITNESS_FIELD.items():
+        value = fields.get(pdf_key)
+        cleaned = "" if value is None else str(value).strip()
+        if cleaned:
+            out[model_field] = cleaned
+    if not (out.get("imie") or out.get("nazwisko")):
+        return None
+    return out
+
+
 def extract_pdf_form_fields(pdf_path: Union[str, Path]) -> Dict[str, str]:
     """Read AcroForm text field values from a PDF file."""
     reader = PdfReader(str(pdf_path))
@@ -1,37 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
 from PyPDF2 import PdfReader, PdfWriter
-from PyPDF2.generic import NameObject, BooleanObject
+from PyPDF2.generic import (
+    ArrayObject,
+    BooleanObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    TextStringObject,
+)
 from io import BytesIO
 from pathlib import Path
-from typing import Dict, Union
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
 
 
-class PDFWriter:
+class FieldLocation(NamedTuple):
+    """Position of one widget of an AcroForm field inside the template.
+
+    Pages are cloned into a fresh writer for every fill, so object numbers differ
+    per fill; ``(page_index, annot_index)`` stays valid across clones.
+    """
+
+    page_index: int
+    annot_index: int
+    via_parent: bool
+    is_button: bool
+
+
+def build_field_index(reader: PdfReader) -> Dict[str, List[FieldLocation]]:
+    """Map every AcroForm field name (e.g. ``PESEL[0]``) to its widget locations."""
+    index: Dict[str, List[FieldLocation]] = {}
+    for page_index, page in enumerate(reader.pages):
+        annots = page.get("/Annots")
+        if annots is None:
+            continue
+        for annot_index, annot_ref in enumerate(annots.get_object()):
+            annot = annot_ref.get_object()
+            name = annot.get("/T")
+            via_parent = False
+            if name is None and "/Parent" in annot:
+                name = annot["/Parent"].get_object().get("/T")
+                via_parent = True
+            if name is None:
+                continue
+            index.setdefault(str(name), []).append(
+                FieldLocation(page_index, annot_index, via_parent, annot.get("/FT") == "/Btn")
+            )
+    return index
+
+
+@dataclass
+class CachedTemplate:
+    """Parsed PDF template shared by every fill in the current process."""
+
+    path: Path
+    mtime_ns: int
+    size: int
+    sha256: str
+    reader: PdfReader
+    field_index: Dict[str, List[FieldLocation]]
+    # PdfReader resolves objects lazily from a shared stream, so clones must not interleave
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class TemplateCache:
+    """Process-wide cache of parsed PDF templates.
+
+    Entries are keyed by resolved path and revalidated on every lookup with a
+    cheap ``os.stat``. When mtime or size changes the file is re-read; the parsed
+    reader is only rebuilt when the SHA-256 of its contents actually differs.
+    """
+
     def __init__(self):
+        self._entries: Dict[Path, CachedTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_path: Union[str, Path]) -> CachedTemplate:
+        path = Path(template_path).resolve()
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if entry and entry.sha256 == digest:
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                return entry
+
+            reader = PdfReader(BytesIO(data))
+            entry = CachedTemplate(
+                path=path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                sha256=digest,
+                reader=reader,
+                field_index=build_field_index(reader),
+            )
+            self._entries[path] = entry
+            return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
+class PDFWriter:
+    def __init__(self, use_cache: bool = True):
         self.reader = None
         self.writer = PdfWriter()
+        self.use_cache = use_cache
 
-    def fill_template(self, template_path: Union[str, Path], field_data: Dict[str, str]) -> BytesIO:
+    def fill_template(
+        self,
+        template_path: Union[str, Path],
+        field_data: Dict[str, str],
+        redacted_fields: Optional[Iterable[str]] = None,
+        redaction_padding: float = 1.5,
+    ) -> BytesIO:
         """
         Fill PDF template with provided field data
 
         Args:
             template_path: Path to PDF template file
             field_data: Dictionary with field names and values to fill
+            redacted_fields: Field names that must not be filled; their widgets are
+                removed and covered with opaque boxes in the same pass (anonymized render)
+            redaction_padding: Extra margin around each covered widget rectangle
 
         Returns:
             BytesIO object containing filled PDF
         """
         # Reset writer per call to avoid accumulating pages between invocations
         self.writer = PdfWriter()
-        self.reader = PdfReader(str(template_path))
+        field_index = None
+        redacted = {name.strip() for name in (redacted_fields or ())}
+        if redacted:
+            field_data = {name: value for name, value in field_data.items() if name not in redacted}
 
-        # Copy template pages to writer
-        for page in self.reader.pages:
-            self.writer.add_page(page)
+        if self.use_cache:
+            template = TEMPLATE_CACHE.get(template_path)
+            self.reader = template.reader
+            # Pages are cloned into the writer, so the cached reader is never mutated
+            with template.lock:
+                for page in self.reader.pages:
+                    self.writer.add_page(page)
+            field_index = template.field_index
+            # Touch only the widgets that actually receive a value
+            self._fill_indexed_fields(field_index, field_data)
+        else:
+            self.reader = PdfReader(str(template_path))
+            for page in self.reader.pages:
+                self.writer.add_page(page)
 
-        # Update form fields on ALL pages (some forms distribute fields across pages)
-        for page in self.writer.pages:
-            self.writer.update_page_form_field_values(page, field_data)
+            # Update form fields on ALL pages (some forms distribute fields across pages)
+            for page in self.writer.pages:
+                self.writer.update_page_form_field_values(page, field_data)
+
+        if redacted:
+            self._redact_fields(field_index or build_field_index(self.reader), redacted, redaction_padding)
+            # Removed widgets and their appearance streams would still be written otherwise
+            self._drop_unreachable_objects()
 
         # Hint viewers to regenerate appearances, improving visibility of filled values
         try:
@@ -49,6 +189,86 @@ class PDFWriter:
 
         return output
 
+    def _fill_indexed_fields(self, field_index: Dict[str, List[FieldLocation]], field_data: Dict[str, str]) -> None:
+        """Same updates as ``update_page_form_field_values``, without scanning every annotation."""
+        self.writer.set_need_appearances_writer()
+        pages = self.writer.pages
+        for field_name, value in field_data.items():
+            for location in field_index.get(field_name, ()):
+                annot = pages[location.page_index]["/Annots"][location.annot_index].get_object()
+                if location.via_parent:
+                    annot["/Parent"].get_object()[NameObject("/V")] = TextStringObject(value)
+                    continue
+                if location.is_button:
+                    annot[NameObject("/AS")] = NameObject(value)
+                annot[NameObject("/V")] = TextStringObject(value)
+
+    def _redact_fields(self, field_index: Dict[str, List[FieldLocation]], redacted: Iterable[str], padding: float) -> None:
+        """Drop the widgets of redacted fields and paint black boxes over their rectangles."""
+        targets: Dict[int, List[FieldLocation]] = {}
+        for field_name in redacted:
+            for location in field_index.get(field_name, ()):
+                targets.setdefault(location.page_index, []).append(location)
+
+        padding = max(0.0, padding)
+        for page_index, locations in targets.items():
+            page = self.writer.pages[page_index]
+            annots = page["/Annots"].get_object()
+            removed = {location.annot_index for location in locations}
+
+            boxes = []
+            for annot_index in sorted(removed):
+                rect = [float(value) for value in annots[annot_index].get_object()["/Rect"]]
+                x0, x1 = min(rect[0], rect[2]) - padding, max(rect[0], rect[2]) + padding
+                y0, y1 = min(rect[1], rect[3]) - padding, max(rect[1], rect[3]) + padding
+                boxes.append(f"{x0:.2f} {y0:.2f} {x1 - x0:.2f} {y1 - y0:.2f} re f")
+
+            page[NameObject("/Annots")] = ArrayObject(
+                annot for annot_index, annot in enumerate(annots) if annot_index not in removed
+            )
+            # Wrap the original content in q/Q so its graphics state cannot shift the boxes
+            self._append_content(page, b"q\n", b"Q\nq 0 0 0 rg 0 0 0 RG\n" + "\n".join(boxes).encode() + b"\nQ\n")
+
+    def _append_content(self, page, prefix: bytes, suffix: bytes) -> None:
+        streams = []
+        for data in (prefix, suffix):
+            stream = DecodedStreamObject()
+            stream.set_data(data)
+            streams.append(self.writer._add_object(stream.flate_encode()))
+
+        contents = page.get("/Contents")
+        if contents is None:
+            existing = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            existing = list(contents.get_object())
+        else:
+            existing = [contents]
+        page[NameObject("/Contents")] = ArrayObject([streams[0], *existing, streams[1]])
+
+    def _drop_unreachable_objects(self) -> None:
+        """Replace writer objects no longer referenced from the catalog or info dict with null.
+
+        Entries are nulled rather than removed so object numbers (and the xref) stay aligned.
+        """
+        objects = self.writer._objects
+        reachable = set()
+        pending = [self.writer._root, self.writer._info]
+        while pending:
+            obj = pending.pop()
+            if isinstance(obj, IndirectObject):
+                if obj.pdf is not self.writer or obj.idnum in reachable:
+                    continue
+                reachable.add(obj.idnum)
+                pending.append(objects[obj.idnum - 1])
+            elif isinstance(obj, DictionaryObject):
+                pending.extend(obj.values())
+            elif isinstance(obj, ArrayObject):
+                pending.extend(obj)
+
+        for index, obj in enumerate(objects):
+            if index + 1 not in reachable and obj is not None:
+                objects[index] = NullObject()
+
     @staticmethod
     def get_form_fields() -> Dict[str, str]:
         """Get dictionary of form fields from PDF template"""
@@ -0,0 +1,26 @@
+"""
+Diacritic folding for matching Polish text.
+
+`unicodedata` decomposes ą, ę, ó, ś, ż, ... into a base letter plus a combining mark,
+but ł/Ł have no decomposition, so they are mapped explicitly. SQLite's FTS5
+`unicode61` tokenizer has the same gap, which is why search text is folded here
+before it is indexed or queried.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_STROKES = str.maketrans({"ł": "l", "Ł": "L"})
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics: "Łódź, Żółć" -> "lodz, zolc"."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").translate(_STROKES))
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def folded_words(text: str) -> list:
+    """Folded alphanumeric words of `text`: "Łódź, ul. Długa 7" -> ["lodz", "ul", "dluga", "7"]."""
+    return _WORD_RE.findall(fold(text))
@@ -0,0 +1,170 @@
+"""
+Streaming XLSX writer.
+
+An .xlsx file is a ZIP of SpreadsheetML parts. `stream_xlsx` writes the worksheet
+XML row by row into a ZIP entry on an unseekable `ChunkBuffer` and yields the
+compressed bytes as they are produced, so memory stays flat however many rows
+are exported. The workbook parts listing the sheets are written last (ZIP entry
+order is free), which lets rows spill over into further sheets past Excel's
+1,048,576-row limit.
+
+Cells use inline strings (no shared-string table to keep in memory); dates and
+times are stored as serial numbers with a date/time number format.
+"""
+from __future__ import annotations
+
+import re
+import zipfile
+from datetime import date, datetime, time
+from typing import Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+from tools.pdf_batch import ChunkBuffer
+
+MAX_SHEET_ROWS = 1_048_576
+_END = object()
+_EPOCH = date(1899, 12, 30)
+# Characters XML 1.0 does not allow, even escaped
+_ILLEGAL_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "{sheets}</Types>"
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    "<sheets>{sheets}</sheets></workbook>"
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rIdStyles" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "{sheets}</Relationships>"
+)
+_SHEET_REL = (
+    '<Relationship Id="rId{index}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{index}.xml"/>'
+)
+# Cell styles: 0 default, 1 date (built-in format 14), 2 time (21), 3 date and time (22)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    "</styleSheet>"
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+def _time_fraction(value: time) -> float:
+    return (value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6) / 86400
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value!r}</v></c>"
+    if isinstance(value, datetime):
+        serial = (value.date() - _EPOCH).days + _time_fraction(value.time())
+        return f'<c s="3"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{(value - _EPOCH).days}</v></c>'
+    if isinstance(value, time):
+        return f'<c s="2"><v>{_time_fraction(value)!r}</v></c>'
+    text = escape(_ILLEGAL_XML_RE.sub("", str(value)))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+def _row(values: Iterable) -> str:
+    return "<row>" + "".join(_cell(value) for value in values) + "</row>"
+
+
+def stream_xlsx(
+    header: Sequence[str],
+    rows: Iterable[Sequence],
+    sheet_name: str = "Sheet",
+    chunk_rows: int = 1000,
+) -> Iterator[bytes]:
+    """Yield an .xlsx workbook chunk by chunk; `header` is repeated on every sheet."""
+    buffer = ChunkBuffer()
+    header_row = _row(header)
+    rows = iter(rows)
+    # One row of look-ahead: a new sheet is only started when there is a row to put on it
+    upcoming = next(rows, _END)
+    sheet_count = 0
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        while True:
+            sheet_count += 1
+            # Sizes are unknown up front, so allow ZIP64 for sheets past 4 GiB uncompressed
+            with archive.open(f"xl/worksheets/sheet{sheet_count}.xml", "w", force_zip64=True) as sheet:
+                pending = [_SHEET_START, header_row]
+                written = 1
+                while upcoming is not _END and written < MAX_SHEET_ROWS:
+                    pending.append(_row(upcoming))
+                    written += 1
+                    upcoming = next(rows, _END)
+                    if len(pending) >= chunk_rows:
+                        sheet.write("".join(pending).encode("utf-8"))
+                        pending.clear()
+                        yield buffer.drain()
+                pending.append(_SHEET_END)
+                sheet.write("".join(pending).encode("utf-8"))
+            yield buffer.drain()
+            if upcoming is _END:
+                break
+
+        indexes = range(1, sheet_count + 1)
+        names = [sheet_name if index == 1 else f"{sheet_name} {index}" for index in indexes]
+        archive.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(sheets="".join(_SHEET_CONTENT_TYPE.format(index=index) for index in indexes)),
+        )
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            f'<sheet name={quoteattr(name[:31])} sheetId="{index}" r:id="rId{index}"/>'
+            for index, name in zip(indexes, names)
+        )))
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _WORKBOOK_RELS.format(sheets="".join(_SHEET_REL.format(index=index) for index in indexes)),
+        )
+        archive.writestr("xl/styles.xml", _STYLES)
+    yield buffer.drain()
+
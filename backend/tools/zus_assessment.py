@@ -0,0 +1,123 @@
+"""
+Structured output for the single-call ZUS assessment.
+
+`ZUS_ASSESSMENT_SCHEMA` describes one JSON object holding both the form data read
+from OCR text (`dane_formularza`, what `find_desc_from_pdf` returns) and the
+assessment produced by `worker_recommendation`. It is sent as a strict
+`response_format` and the reply is validated against the same schema here, so a
+malformed answer is rejected before it reaches the caseworker.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+_TEXT = {"type": ["string", "null"]}
+_FLAG = {"type": ["boolean", "null"]}
+_TEXT_LIST = {"type": "array", "items": {"type": "string"}}
+
+
+def _object(properties: dict) -> dict:
+    # Strict structured output requires every property to be listed and nothing extra
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+_PREMISE = _object({"status": {"type": "boolean"}, "uzasadnienie": {"type": "string"}})
+
+ZUS_ASSESSMENT_SCHEMA = _object({
+    "dane_formularza": _object({
+        "czy_poszkodowany_jest_osobą_zgłaszającą": _FLAG,
+        "data_wypadku": _TEXT,
+        "godzina_wypadku": _TEXT,
+        "miejsce_wypadku": _TEXT,
+        "planowana_godzina_rozpoczecia_pracy": _TEXT,
+        "planowana_godzina_zakonczenia_pracy": _TEXT,
+        "rodzaj_urazow": _TEXT,
+        "szczegoly_okolicznosci": _TEXT,
+        "czy_udzielona_została_pomoc": _TEXT,
+        "miejsce_udzielenia_pomocy": _TEXT,
+        "organ_postępowania": _TEXT,
+        "czy_wypadku_podczas_uzywania_maszyny": _FLAG,
+        "opis_maszyny": _TEXT,
+        "czy_maszyna_posiada_atest": _FLAG,
+        "czy_maszyna_w_ewidencji": _FLAG,
+        "liczba_świadków": {"type": ["integer", "null"]},
+        "lista_załączników": _TEXT_LIST,
+    }),
+    "ocena_przeslanek": _object({
+        "naglosc": _PREMISE,
+        "przyczyna_zewnetrzna": _PREMISE,
+        "uraz": _PREMISE,
+        "zwiazek_z_praca": _PREMISE,
+    }),
+    "kompletnosc_wniosku": _object({
+        "wynik_calkowity": {"type": "integer"},
+        "poziom_kompletnosci": {"type": "string", "enum": ["niski", "sredni", "wysoki"]},
+        "braki": _TEXT_LIST,
+        "elementy_do_weryfikacji": _TEXT_LIST,
+    }),
+    "rekomendacje_poprawy": _TEXT_LIST,
+    "pytania_poglebiajace": _TEXT_LIST,
+})
+
+ZUS_ASSESSMENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "zus_assessment", "strict": True, "schema": ZUS_ASSESSMENT_SCHEMA},
+}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _matches_type(value: Any, name: str) -> bool:
+    if name == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, _TYPES[name])
+
+
+def validate(value: Any, schema: dict, path: str = "$") -> None:
+    """Check `value` against the subset of JSON Schema used above; raise ValueError on the first mismatch."""
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_matches_type(value, name) for name in types):
+            raise ValueError(f"{path}: expected {'/'.join(types)}, got {type(value).__name__}")
+
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"{path}: {value!r} is not one of {schema['enum']}")
+
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        missing = [name for name in schema.get("required", ()) if name not in value]
+        if missing:
+            raise ValueError(f"{path}: missing {', '.join(missing)}")
+        if schema.get("additionalProperties") is False:
+            extra = [name for name in value if name not in properties]
+            if extra:
+                raise ValueError(f"{path}: unexpected {', '.join(extra)}")
+        for name, item in value.items():
+            if name in properties:
+                validate(item, properties[name], f"{path}.{name}")
+    elif isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{index}]")
+
+
+def parse_zus_assessment(text: str) -> dict:
+    """Decode and validate a structured assessment reply."""
+    try:
+        assessment = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Structured assessment is not valid JSON: {exc}") from exc
+    validate(assessment, ZUS_ASSESSMENT_SCHEMA)
+    return assessment